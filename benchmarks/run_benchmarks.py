@@ -0,0 +1,422 @@
+#!/usr/bin/env python
+"""This script benchmarks the `pyagree` functions.
+
+The benchmarks sweep the number of categories :math:`k`, the number of
+items :math:`N`, the size :math:`T` of the stacks of agreement matrices,
+and the type of the counts. Each benchmark is timed by :mod:`timeit` and
+its minimum and median time per call are stored in a JSON file, which can
+later be used as the baseline of another run to flag the regressions,
+e.g.,
+
+.. code:: bash
+
+    python benchmarks/run_benchmarks.py --save baseline.json
+    python benchmarks/run_benchmarks.py --compare baseline.json
+
+The script does not require anything besides `pyagree` and NumPy.
+
+.. moduleauthor:: Alberto Casagrande <acasagrande@units.it>
+
+"""
+
+import argparse
+import json
+import platform
+import re
+import sys
+import timeit
+from itertools import product
+from os.path import abspath, dirname
+from statistics import median
+
+import numpy
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+import pyagree  # noqa: E402
+from pyagree import inf_theory  # noqa: E402
+
+PROFILES = {
+    'quick': {'k': [2, 10, 100], 'N': [10, 10**3, 10**5], 'T': [1, 100],
+              'dtype': ['int64', 'float64']},
+    'full': {'k': [2, 10, 100, 1000], 'N': [10, 10**3, 10**5, 10**7],
+             'T': [1, 100, 10**4], 'dtype': ['int64', 'float64']}
+}
+
+# the largest number of matrix elements or ratings built by a benchmark
+MAX_ELEMENTS = 10**8
+
+
+def agreement_data(k, num_of_items, rng):
+    r"""Generate the ratings of two raters agreeing on about half the items
+
+    :param k: The number of categories
+    :type k: :class:`int`
+    :param num_of_items: The number of items
+    :type num_of_items: :class:`int`
+    :param rng: A random generator
+    :type rng: :class:`numpy.random.Generator`
+    :returns: The ratings of the two raters
+    :rtype: :class:`tuple`
+    """
+    ratings_a = rng.integers(0, k, num_of_items)
+    ratings_b = numpy.where(rng.random(num_of_items) < 0.5, ratings_a,
+                            rng.integers(0, k, num_of_items))
+
+    return ratings_a, ratings_b
+
+
+def agreement_stack(k, size, dtype, rng):
+    r"""Generate a stack of agreement matrices with a dominant diagonal
+
+    :param k: The number of categories
+    :type k: :class:`int`
+    :param size: The number of matrices :math:`T` or 1 for a single matrix
+    :type size: :class:`int`
+    :param dtype: The type of the counts
+    :type dtype: :class:`str`
+    :param rng: A random generator
+    :type rng: :class:`numpy.random.Generator`
+    :returns: A :math:`k \times k`-matrix or a :math:`T \times k \times
+              k`-stack of matrices
+    :rtype: :class:`numpy.ndarray`
+    """
+    matrices = rng.integers(0, 10, (size, k, k))
+    matrices[:, numpy.arange(k), numpy.arange(k)] += 10*k
+    matrices = matrices.astype(dtype)
+
+    return matrices[0] if size == 1 else matrices
+
+
+def matrix_case(measure):
+    r"""Build a benchmark of a measure on agreement matrices
+
+    :param measure: A measure accepting stacks of agreement matrices
+    :type measure: Callable object
+    :returns: A function mapping the parameters of the benchmark into the
+              function to be timed, or `None` if they are not applicable
+    :rtype: Callable object
+    """
+    def case(k, T, dtype, rng, **_):
+        if T*k*k > MAX_ELEMENTS:
+            return None
+        matrices = agreement_stack(k, T, dtype, rng)
+        return lambda: measure(matrices)
+
+    case.parameters = ('k', 'T', 'dtype')
+
+    return case
+
+
+def ratings_case(function):
+    r"""Build a benchmark of a function on the ratings of two raters
+
+    :param function: A function of the ratings of two raters
+    :type function: Callable object
+    :returns: A function mapping the parameters of the benchmark into the
+              function to be timed, or `None` if they are not applicable
+    :rtype: Callable object
+    """
+    def case(k, N, rng, **_):
+        if N < k:
+            return None
+        ratings_a, ratings_b = agreement_data(k, N, rng)
+        labels = numpy.arange(k)
+        return lambda: function(ratings_a, ratings_b, labels=labels)
+
+    case.parameters = ('k', 'N')
+
+    return case
+
+
+def fleiss_case(k, N, dtype, rng, **_):
+    r"""Build a benchmark of Fleiss's :math:`\kappa` on 5 raters
+
+    :returns: The function to be timed, or `None`
+    :rtype: Callable object
+    """
+    if N*k > MAX_ELEMENTS:
+        return None
+    ratings = rng.integers(0, k, (N, 5))
+    classifications = pyagree.classification_matrix_from_ratings(
+        ratings, labels=numpy.arange(k)).astype(dtype)
+    return lambda: pyagree.fleiss_kappa(classifications)
+
+
+fleiss_case.parameters = ('k', 'N', 'dtype')
+
+
+def krippendorff_case(k, N, rng, **_):
+    r"""Build a benchmark of Krippendorff's :math:`\alpha` on 10 raters
+    rating, on average, 3 items each
+
+    :returns: The function to be timed, or `None`
+    :rtype: Callable object
+    """
+    if 10*N > MAX_ELEMENTS:
+        return None
+    ratings = rng.integers(0, k, (N, 10)).astype(float)
+    ratings[rng.random((N, 10)) < 0.7] = numpy.nan
+    return lambda: pyagree.krippendorff_alpha(ratings)
+
+
+krippendorff_case.parameters = ('k', 'N')
+
+
+def pairwise_case(k, N, rng, **_):
+    r"""Build a benchmark of the agreement among all the pairs of 50 raters
+
+    :returns: The function to be timed, or `None`
+    :rtype: Callable object
+    """
+    if N < k or 50*N*k > MAX_ELEMENTS:
+        return None
+    ratings = rng.integers(0, k, (N, 50))
+    return lambda: pyagree.pairwise_agreement(ratings, pyagree.ia_c)
+
+
+pairwise_case.parameters = ('k', 'N')
+
+
+def grouped_case(k, N, rng, **_):
+    r"""Build a benchmark of Cohen's :math:`\kappa` within 100 groups
+
+    :returns: The function to be timed, or `None`
+    :rtype: Callable object
+    """
+    if N < k or 100*k*k > MAX_ELEMENTS:
+        return None
+    groups = rng.integers(0, 100, N)
+    ratings_a, ratings_b = agreement_data(k, N, rng)
+    return lambda: pyagree.grouped_agreement(groups, ratings_a, ratings_b)
+
+
+grouped_case.parameters = ('k', 'N')
+
+
+def bootstrap_case(k, T, rng, **_):
+    r"""Build a benchmark of the bootstrap of :math:`\text{IA}_{C}` on
+    :math:`T` resamples
+
+    :returns: The function to be timed, or `None`
+    :rtype: Callable object
+    """
+    if T*k*k > MAX_ELEMENTS:
+        return None
+    matrix = agreement_stack(k, 1, 'int64', rng)
+    return lambda: pyagree.bootstrap_replicates(matrix, pyagree.ia_c, T,
+                                                seed=0)
+
+
+bootstrap_case.parameters = ('k', 'T')
+
+
+def monitor_case(k, N, rng, **_):
+    r"""Build a benchmark of a sliding-window monitor on :math:`N` events
+
+    :returns: The function to be timed, or `None`
+    :rtype: Callable object
+    """
+    if N > 10**5:
+        return None
+    ratings_a, ratings_b = agreement_data(k, N, rng)
+    pairs = list(zip(ratings_a.tolist(), ratings_b.tolist()))
+
+    def run():
+        monitor = pyagree.AgreementMonitor(range(k), 1000)
+        for rating_a, rating_b in pairs:
+            monitor.add(rating_a, rating_b)
+            monitor.ia_c() if k > 1 and len(monitor) > 1 else None
+
+    return run
+
+
+monitor_case.parameters = ('k', 'N')
+
+
+def ia_c_state_case(k, N, rng, **_):
+    r"""Build a benchmark of :math:`N` updates of an
+    :class:`pyagree.IAcState` each followed by an evaluation
+
+    :returns: The function to be timed, or `None`
+    :rtype: Callable object
+    """
+    if k < 2 or N > 10**5:
+        return None
+    ratings_a, ratings_b = agreement_data(k, N, rng)
+    pairs = list(zip(ratings_a.tolist(), ratings_b.tolist()))
+    matrix = agreement_stack(k, 1, 'int64', rng)
+
+    def run():
+        state = pyagree.IAcState.from_matrix(matrix)
+        for row, col in pairs:
+            state.update(row, col)
+            state.value()
+
+    return run
+
+
+ia_c_state_case.parameters = ('k', 'N')
+
+
+def independence_case(k, T, rng, **_):
+    r"""Build a benchmark of an independence test on :math:`T` samples
+
+    :returns: The function to be timed, or `None`
+    :rtype: Callable object
+    """
+    if T*k*k > MAX_ELEMENTS or T < 100:
+        return None
+    matrix = agreement_stack(k, 1, 'int64', rng)
+    return lambda: pyagree.independence_test(matrix, num_of_samples=T,
+                                             exact=False, seed=0)
+
+
+independence_case.parameters = ('k', 'T')
+
+CASES = {
+    'bennett_s': matrix_case(pyagree.bennett_s),
+    'bangdiwala_b': matrix_case(pyagree.bangdiwala_b),
+    'cohen_kappa': matrix_case(pyagree.cohen_kappa),
+    'scott_pi': matrix_case(pyagree.scott_pi),
+    'weighted_kappa': matrix_case(pyagree.weighted_kappa),
+    'ia_c': matrix_case(pyagree.ia_c),
+    'mutual_information': matrix_case(inf_theory.mutual_information),
+    'normalized_mutual_information':
+        matrix_case(inf_theory.normalized_mutual_information),
+    'agreement_report': matrix_case(pyagree.agreement_report),
+    'agreement_matrix_from_ratings':
+        ratings_case(pyagree.agreement_matrix_from_ratings),
+    'cohen_kappa_from_ratings':
+        ratings_case(pyagree.cohen_kappa_from_ratings),
+    'ia_c_from_ratings': ratings_case(pyagree.ia_c_from_ratings),
+    'scott_pi_from_ratings': ratings_case(pyagree.scott_pi_from_ratings),
+    'fleiss_kappa': fleiss_case,
+    'krippendorff_alpha': krippendorff_case,
+    'pairwise_agreement': pairwise_case,
+    'grouped_agreement': grouped_case,
+    'bootstrap_replicates': bootstrap_case,
+    'independence_test': independence_case,
+    'AgreementMonitor': monitor_case,
+    'IAcState': ia_c_state_case,
+}
+
+
+def time_function(function, repeat):
+    r"""Time a function
+
+    :param function: The function to be timed
+    :type function: Callable object
+    :param repeat: The number of timing rounds
+    :type repeat: :class:`int`
+    :returns: The minimum and the median time per call in seconds
+    :rtype: :class:`dict`
+    """
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    times = [time/number for time in timer.repeat(repeat, number)]
+
+    return {'min': min(times), 'median': median(times)}
+
+
+def run_benchmarks(profile, pattern, repeat):
+    r"""Run the benchmarks
+
+    :param profile: The parameter values to be swept
+    :type profile: :class:`dict`
+    :param pattern: A regular expression selecting the benchmark keys
+    :type pattern: :class:`str`
+    :param repeat: The number of timing rounds
+    :type repeat: :class:`int`
+    :returns: The dictionary mapping the benchmark keys into their times
+    :rtype: :class:`dict`
+    """
+    results = {}
+    for name, case in CASES.items():
+        grids = [profile[parameter] for parameter in case.parameters]
+        for values in product(*grids):
+            parameters = dict(zip(case.parameters, values))
+            key = '{}[{}]'.format(name, ','.join('{}={}'.format(*item)
+                                                 for item in
+                                                 parameters.items()))
+            if not re.search(pattern, key):
+                continue
+
+            function = case(rng=numpy.random.default_rng(0), **parameters)
+            if function is None:
+                continue
+
+            results[key] = time_function(function, repeat)
+            print('{:<60} {:>12.3e} s'.format(key, results[key]['median']),
+                  flush=True)
+
+    return results
+
+
+def find_regressions(results, baseline, tolerance):
+    r"""Compare some results to a baseline
+
+    :param results: The dictionary of the benchmark times
+    :type results: :class:`dict`
+    :param baseline: The dictionary of the baseline times
+    :type baseline: :class:`dict`
+    :param tolerance: The admitted relative slowdown
+    :type tolerance: :class:`float`
+    :returns: The list of the keys, the baseline medians, and the current
+              medians of the benchmarks slower than the baseline by more
+              than tolerance
+    :rtype: :class:`list`
+    """
+    regressions = []
+    for key, times in results.items():
+        if key in baseline and \
+                times['median'] > (1+tolerance)*baseline[key]['median']:
+            regressions.append((key, baseline[key]['median'],
+                                times['median']))
+
+    return regressions
+
+
+def main():
+    r"""Run the benchmarks from the command line
+    """
+    parser = argparse.ArgumentParser(description='Benchmark pyagree.')
+    parser.add_argument('--profile', choices=sorted(PROFILES),
+                        default='quick', help='the parameter sweep')
+    parser.add_argument('--filter', default='',
+                        help='a regular expression selecting the benchmarks')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='the number of timing rounds')
+    parser.add_argument('--save', help='the JSON file storing the results')
+    parser.add_argument('--compare', help='the JSON file of the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='the admitted relative slowdown')
+    args = parser.parse_args()
+
+    results = run_benchmarks(PROFILES[args.profile], args.filter,
+                             args.repeat)
+
+    if args.save:
+        with open(args.save, 'w') as output:
+            json.dump({'machine': {'python': platform.python_version(),
+                                   'numpy': numpy.__version__,
+                                   'pyagree': pyagree.__version__,
+                                   'platform': platform.platform()},
+                       'results': results}, output, indent=2,
+                      sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)['results']
+
+        regressions = find_regressions(results, baseline, args.tolerance)
+        for key, before, after in regressions:
+            print('REGRESSION {:<49} {:>10.3e} s -> {:>10.3e} s '
+                  '(x{:.2f})'.format(key, before, after, after/before))
+
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
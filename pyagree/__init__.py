@@ -17,5 +17,18 @@ __status__ = "Development"
 
 from .inf_agreement import *
 from .standard import *
+from .table import *
+from .ratings import *
+from .report import *
+from .accumulator import *
+from .bootstrap import *
+from .significance import *
+from .pairwise import *
+from .monitor import *
+from .grouped import *
+from .profiling import *
+from .parallel import *
+from .cache import *
+from .dichotomous import *
 
 NAME = "pyagree"
@@ -0,0 +1,11 @@
+"""This file runs the `pyagree` command-line tool as `python -m pyagree`.
+
+.. moduleauthor:: Alberto Casagrande <acasagrande@units.it>
+
+"""
+
+import sys
+
+from .cli import main
+
+sys.exit(main())
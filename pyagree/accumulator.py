@@ -0,0 +1,490 @@
+"""This file contains the implementation of a streaming accumulator for the
+   agreement matrix of two raters.
+
+.. moduleauthor:: Alberto Casagrande <acasagrande@units.it>
+
+"""
+
+from copy import copy
+from itertools import islice
+
+from numpy import asarray, unique, concatenate, bincount, zeros, ix_
+from numpy import result_type, cumsum, ones, array, where, argsort
+from numpy import any as np_any
+
+from .table import AgreementTable
+from .report import agreement_report
+from .standard import bennett_s, bangdiwala_b, cohen_kappa, scott_pi
+from .standard import yule_y, fleiss_kappa_from_statistics
+from .inf_agreement import ia_c
+
+
+class AgreementAccumulator:
+    r"""A mergeable accumulator for the agreement matrix of two raters
+
+    An agreement accumulator collects the ratings of two raters chunk by
+    chunk and stores exclusively the agreement matrix of the ratings
+    collected so far. Hence, its memory footprint depends on the number of
+    labels :math:`k`, i.e., it is :math:`O(k^2)`, but not on the number of
+    ratings. Accumulators fed by different processes can be combined by
+    :meth:`merge` and all the agreement measures can be evaluated at any
+    time.
+
+    Whenever labels is `None`, the labels are collected from the ratings
+    as they occur, they are sorted by their first occurrence, and the
+    agreement matrix grows accordingly. Otherwise, the labels and their
+    order are fixed and any other label in the ratings raises a
+    :class:`ValueError`. Since Bennett, Alpert and
+    Goldstein's :math:`S` and :math:`\text{IA}_{C}` depend on the number
+    of categories, the labels should be fixed whenever some of them may
+    not be used by the raters.
+
+    :param labels: The sequence of labels
+    :type labels: Iterable object
+    :raises: :class:`ValueError`
+    """
+
+    __slots__ = ('_labels', '_index', '_fixed', '_counts', '_table')
+
+    def __init__(self, labels=None):
+        self._labels = []
+        self._index = {}
+        self._fixed = False
+        self._counts = zeros((0, 0), dtype=int)
+        self._table = None
+
+        if labels is not None:
+            labels = list(labels)
+            self._encode_labels(labels)
+            if len(self._labels) != len(labels):
+                raise ValueError("The labels are not pairwise different")
+
+            self._fixed = True
+
+    @property
+    def labels(self):
+        r"""The labels of the rows and columns of the agreement matrix
+
+        :rtype: :class:`list`
+        """
+        return list(self._labels)
+
+    @property
+    def agreement_matrix(self):
+        r"""The agreement matrix of the ratings collected so far
+
+        :rtype: :class:`numpy.ndarray`
+        """
+        return self._counts.copy()
+
+    def _encode_labels(self, labels):
+        r"""Map some labels to their indices and register the new ones
+
+        :param labels: A list of labels
+        :type labels: :class:`list`
+        :returns: The list of the indices of labels
+        :rtype: :class:`list`
+        :raises: :class:`ValueError`
+        """
+        indices = []
+        for label in labels:
+            if label not in self._index:
+                if self._fixed:
+                    raise ValueError("The label {} is not ".format(label) +
+                                     "among the accumulator labels")
+                self._index[label] = len(self._labels)
+                self._labels.append(label)
+
+            indices.append(self._index[label])
+
+        k = len(self._labels)
+        if k > self._counts.shape[0]:
+            counts = zeros((k, k), dtype=self._counts.dtype)
+            old_k = self._counts.shape[0]
+            counts[:old_k, :old_k] = self._counts
+            self._counts = counts
+
+        return indices
+
+    def _add(self, indices, counts):
+        r"""Add some counts to the agreement matrix
+
+        :param indices: The indices of the labels of the rows and columns
+                        of counts
+        :type indices: :class:`list`
+        :param counts: A square matrix of counts
+        :type counts: :class:`numpy.ndarray`
+        """
+        dtype = result_type(self._counts, counts)
+        if dtype != self._counts.dtype:
+            self._counts = self._counts.astype(dtype)
+
+        self._counts[ix_(indices, indices)] += counts
+        self._table = None
+
+    def update(self, ratings_a, ratings_b, weights=None):
+        r"""Collect a chunk of ratings
+
+        The chunk is reduced to its agreement matrix by a single
+        :func:`numpy.bincount` and the result is added to the agreement
+        matrix of the accumulator.
+
+        :param ratings_a: The ratings of the first rater
+        :type ratings_a: :class:`numpy.ndarray`
+        :param ratings_b: The ratings of the second rater
+        :type ratings_b: :class:`numpy.ndarray`
+        :param weights: The weights of the items
+        :type weights: :class:`numpy.ndarray`
+        :returns: The accumulator itself
+        :rtype: :class:`AgreementAccumulator`
+        :raises: :class:`ValueError`
+        """
+        ratings_a = asarray(ratings_a)
+        ratings_b = asarray(ratings_b)
+
+        if ratings_a.ndim != 1 or ratings_a.shape != ratings_b.shape:
+            raise ValueError("The ratings must be two sequences having " +
+                             "the same length")
+
+        if weights is not None:
+            weights = asarray(weights)
+            if weights.shape != ratings_a.shape:
+                raise ValueError("The weights and the ratings must have " +
+                                 "the same length")
+
+        values, first, codes = unique(concatenate((ratings_a, ratings_b)),
+                                      return_index=True, return_inverse=True)
+        k = len(values)
+        codes_a = codes[:len(ratings_a)]
+        codes_b = codes[len(ratings_a):]
+
+        counts = bincount(codes_a*k+codes_b, weights=weights,
+                          minlength=k*k).reshape(k, k)
+
+        # register the new labels by their first occurrence in the chunk,
+        # where the rating of the first rater precedes that of the second
+        positions = where(first < len(ratings_a), 2*first,
+                          2*(first-len(ratings_a))+1)
+        order = argsort(positions, kind='stable')
+        indices = zeros(k, dtype=int)
+        indices[order] = self._encode_labels(values[order].tolist())
+
+        self._add(indices.tolist(), counts)
+
+        return self
+
+    def merge(self, accumulator):
+        r"""Add the ratings collected by another accumulator
+
+        :param accumulator: An agreement accumulator
+        :type accumulator: :class:`AgreementAccumulator`
+        :returns: The accumulator itself
+        :rtype: :class:`AgreementAccumulator`
+        :raises: :class:`ValueError`
+        """
+        self._add(self._encode_labels(accumulator.labels),
+                  accumulator._counts)
+
+        return self
+
+    def table(self):
+        r"""Build the agreement table of the ratings collected so far
+
+        The table is cached until new ratings are collected, so that the
+        measures evaluated in the meantime share its statistics.
+
+        :returns: The agreement table of the collected ratings
+        :rtype: :class:`pyagree.AgreementTable`
+        :raises: :class:`ValueError`
+        """
+        if self._table is None:
+            self._table = AgreementTable(self._counts.copy())
+
+        return self._table
+
+    def report(self):
+        r"""Evaluate all the applicable agreement measures
+
+        See :func:`pyagree.agreement_report`.
+
+        :returns: A dictionary mapping the names of the applicable measures
+                  into their values on the collected ratings
+        :rtype: :class:`dict`
+        :raises: :class:`ValueError`
+        """
+        return agreement_report(self.table())
+
+    def bennett_s(self):
+        r"""Evaluate Bennett, Alpert and Goldstein's :math:`S`
+
+        :returns: The Bennett, Alpert and Goldstein's :math:`S` of the
+                  collected ratings
+        :rtype: :class:`float`
+        :raises: :class:`ValueError`
+        """
+        return bennett_s(self.table())
+
+    def bangdiwala_b(self):
+        r"""Evaluate Bangdiwala's :math:`B`
+
+        :returns: The Bangdiwala's :math:`B` of the collected ratings
+        :rtype: :class:`float`
+        :raises: :class:`ValueError`
+        """
+        return bangdiwala_b(self.table())
+
+    def cohen_kappa(self):
+        r"""Evaluate Cohen's :math:`\kappa`
+
+        :returns: The Cohen's :math:`\kappa` of the collected ratings
+        :rtype: :class:`float`
+        :raises: :class:`ValueError`
+        """
+        return cohen_kappa(self.table())
+
+    def scott_pi(self):
+        r"""Evaluate Scott's :math:`\pi`
+
+        :returns: The Scott's :math:`\pi` of the collected ratings
+        :rtype: :class:`float`
+        :raises: :class:`ValueError`
+        """
+        return scott_pi(self.table())
+
+    def yule_y(self):
+        r"""Evaluate Yule's :math:`Y`
+
+        :returns: The Yule's :math:`Y` of the collected ratings
+        :rtype: :class:`float`
+        :raises: :class:`ValueError`
+        """
+        return yule_y(self.table())
+
+    def fleiss_kappa(self):
+        r"""Evaluate Fleiss's :math:`\kappa`
+
+        On two raters, Fleiss's :math:`\kappa` coincides with Scott's
+        :math:`\pi` and, thus, it is evaluated directly on the agreement
+        matrix.
+
+        :returns: The Fleiss's :math:`\kappa` of the collected ratings
+        :rtype: :class:`float`
+        :raises: :class:`ValueError`
+        """
+        return scott_pi(self.table())
+
+    def ia_c(self):
+        r"""Evaluate *extension-by-continuity of Information Agreement*
+
+        :returns: The extension-by-continuity of Information Agreement of
+                  the collected ratings
+        :rtype: :class:`float`
+        :raises: :class:`ValueError`
+        """
+        return ia_c(self.table())
+
+
+class FleissAccumulator:
+    r"""An accumulator for the sufficient statistics of Fleiss's
+    :math:`\kappa`
+
+    A Fleiss accumulator collects long-format ratings, i.e., pairs of an
+    item and of the label assigned to it by one rater, chunk by chunk and
+    stores exclusively the sufficient statistics of Fleiss's
+    :math:`\kappa` (see :func:`pyagree.fleiss_kappa_from_statistics`):
+    the totals of the categories, the sum of the squared elements of the
+    classification matrix, the number of items, and the number of raters.
+    Hence, the :math:`N \times k`-classification matrix is never built.
+
+    The ratings of each item must be contiguous in the stream, even
+    though they can be split among consecutive chunks: the accumulator
+    keeps the counts of the last item of the last chunk until the ratings
+    of a different item are collected. Since the items whose ratings have
+    been collected are not stored, non-contiguous ratings of an item are
+    detected only inside a chunk and, otherwise, they are collected as
+    the ratings of different items, so that any stream not grouped by
+    item must be sorted first. Every item must be rated by the same
+    number of raters.
+    """
+
+    __slots__ = ('_index', '_category_totals', '_sum_of_squares',
+                 '_dataset_size', '_num_of_raters', '_pending_item',
+                 '_pending_codes', '_pending_counts')
+
+    def __init__(self):
+        self._index = {}
+        self._category_totals = zeros(0, dtype=int)
+        self._sum_of_squares = 0
+        self._dataset_size = 0
+        self._num_of_raters = None
+        self._pending_item = None
+        self._pending_codes = zeros(0, dtype=int)
+        self._pending_counts = zeros(0, dtype=int)
+
+    def _encode(self, labels):
+        r"""Encode some labels as category indices
+
+        :param labels: An array of labels
+        :type labels: :class:`numpy.ndarray`
+        :returns: The array of the category indices of labels
+        :rtype: :class:`numpy.ndarray`
+        """
+        values, codes = unique(labels, return_inverse=True)
+
+        indices = []
+        for value in values.tolist():
+            if value not in self._index:
+                self._index[value] = len(self._index)
+            indices.append(self._index[value])
+
+        return array(indices, dtype=int)[codes]
+
+    def _collect(self, codes, counts, raters):
+        r"""Collect the counts of some complete items
+
+        :param codes: The category indices of the counts
+        :type codes: :class:`numpy.ndarray`
+        :param counts: The numbers of raters that chose the categories
+        :type counts: :class:`numpy.ndarray`
+        :param raters: The numbers of raters of the items
+        :type raters: :class:`numpy.ndarray`
+        :raises: :class:`ValueError`
+        """
+        if len(raters) == 0:
+            return
+
+        if self._num_of_raters is None:
+            self._num_of_raters = raters[0]
+
+        if np_any(raters != self._num_of_raters):
+            raise ValueError("The items have not been rated by the same " +
+                             "number of raters")
+
+        totals = bincount(codes, weights=counts, minlength=len(self._index))
+        totals = totals.astype(int)
+        totals[:len(self._category_totals)] += self._category_totals
+
+        self._category_totals = totals
+        self._sum_of_squares += int((counts**2).sum())
+        self._dataset_size += len(raters)
+
+    def update(self, items, labels):
+        r"""Collect a chunk of long-format ratings
+
+        The :math:`i`-th rating of the chunk is the label labels[i] given
+        to the item items[i] by one rater.
+
+        :param items: The items of the ratings
+        :type items: :class:`numpy.ndarray`
+        :param labels: The labels of the ratings
+        :type labels: :class:`numpy.ndarray`
+        :returns: The accumulator itself
+        :rtype: :class:`FleissAccumulator`
+        :raises: :class:`ValueError`
+        """
+        items = asarray(items)
+        labels = asarray(labels)
+
+        if items.ndim != 1 or items.shape != labels.shape:
+            raise ValueError("The items and the labels must be two " +
+                             "sequences having the same length")
+
+        if len(items) == 0:
+            return self
+
+        codes = self._encode(labels)
+        counts = ones(len(items), dtype=int)
+
+        if self._pending_item is not None:
+            pending = len(self._pending_codes)
+            items = concatenate(([self._pending_item]*pending, items))
+            codes = concatenate((self._pending_codes, codes))
+            counts = concatenate((self._pending_counts, counts))
+
+        runs = concatenate(([0], cumsum(items[1:] != items[:-1])))
+        num_of_runs = runs[-1]+1
+
+        if len(unique(items)) != num_of_runs:
+            raise ValueError("The ratings of each item must be contiguous")
+
+        num_of_categories = len(self._index)
+        keys, inverse = unique(runs*num_of_categories+codes,
+                               return_inverse=True)
+        counts = bincount(inverse, weights=counts).astype(int)
+        key_runs = keys//num_of_categories
+        key_codes = keys % num_of_categories
+
+        complete = key_runs < num_of_runs-1
+        self._collect(key_codes[complete], counts[complete],
+                      bincount(key_runs[complete], weights=counts[complete],
+                               minlength=num_of_runs-1).astype(int))
+
+        self._pending_item = items[-1]
+        self._pending_codes = key_codes[~complete]
+        self._pending_counts = counts[~complete]
+
+        return self
+
+    def statistics(self):
+        r"""Return the sufficient statistics of the collected ratings
+
+        :returns: The totals of the categories, the sum of the squared
+                  elements of the classification matrix, the number of
+                  items, and the number of raters
+        :rtype: :class:`tuple`
+        :raises: :class:`ValueError`
+        """
+        closed = copy(self)
+        if self._pending_item is not None:
+            closed._collect(self._pending_codes, self._pending_counts,
+                            self._pending_counts.sum(keepdims=True))
+
+        return (closed._category_totals, closed._sum_of_squares,
+                closed._dataset_size, closed._num_of_raters)
+
+    def fleiss_kappa(self):
+        r"""Evaluate Fleiss's :math:`\kappa`
+
+        :returns: The Fleiss's :math:`\kappa` of the collected ratings
+        :rtype: :class:`float`
+        :raises: :class:`ValueError`
+        """
+        category_totals, sum_of_squares, dataset_size, num_of_raters = \
+            self.statistics()
+
+        if dataset_size == 0:
+            raise ValueError("No rating has been collected")
+
+        return fleiss_kappa_from_statistics(category_totals, sum_of_squares,
+                                            dataset_size, num_of_raters)
+
+
+def fleiss_kappa_from_triples(triples, chunk_size=65536):
+    r"""Evaluate Fleiss's :math:`\kappa` from long-format ratings
+
+    Compute the :ref:`FleissKappa_theory` of a stream of
+    (item, rater, label) triples by collecting them in chunks of
+    chunk_size triples by using a :class:`FleissAccumulator`. The raters
+    are not required by Fleiss's :math:`\kappa`, which depends exclusively
+    on how many raters chose each label for each item, and they are
+    ignored. The triples of each item must be contiguous in the stream.
+
+    :param triples: An iterable object of (item, rater, label) triples
+    :type triples: Iterable object
+    :param chunk_size: The number of triples per chunk
+    :type chunk_size: :class:`int`
+    :returns: The Fleiss's :math:`\kappa` of the ratings
+    :rtype: :class:`float`
+    :raises: :class:`ValueError`
+    """
+    accumulator = FleissAccumulator()
+
+    triples = iter(triples)
+    chunk = list(islice(triples, chunk_size))
+    while chunk:
+        items, _, labels = zip(*chunk)
+        accumulator.update(items, labels)
+
+        chunk = list(islice(triples, chunk_size))
+
+    return accumulator.fleiss_kappa()
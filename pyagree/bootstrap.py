@@ -0,0 +1,522 @@
+"""This file contains the implementation of the bootstrap confidence
+   intervals of the agreement measures.
+
+.. moduleauthor:: Alberto Casagrande <acasagrande@units.it>
+
+"""
+
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from math import erf, sqrt
+
+from numpy import asarray, concatenate, quantile, isfinite, repeat, arange
+from numpy import errstate, ones, stack, multiply
+from numpy import any as np_any
+from numpy.random import default_rng, SeedSequence
+
+from .common import _wide_type
+from .table import AgreementTable
+from .standard import cohen_kappa, fleiss_kappa
+from .standard import fleiss_kappa_from_statistics
+
+ConfidenceInterval = namedtuple('ConfidenceInterval',
+                                ['estimate', 'lower', 'upper'])
+ConfidenceInterval.__doc__ = r"""A confidence interval of a measure
+
+:param estimate: The value of the measure on the observed data
+:param lower: The lower bound of the interval
+:param upper: The upper bound of the interval
+"""
+
+
+def _normal_cdf(value):
+    r"""Evaluate the cumulative distribution function of the standard normal
+
+    :param value: A real value
+    :type value: :class:`float`
+    :returns: The probability of a standard normal being below value
+    :rtype: :class:`float`
+    """
+    return 0.5*(1+erf(value/sqrt(2)))
+
+
+def _normal_ppf(probability):
+    r"""Evaluate the quantile function of the standard normal
+
+    The quantile is found by bisection on :func:`_normal_cdf`.
+
+    :param probability: A probability in the open interval :math:`(0,1)`
+    :type probability: :class:`float`
+    :returns: The value below which a standard normal falls with
+              probability probability
+    :rtype: :class:`float`
+    """
+    lower, upper = -40.0, 40.0
+    for _ in range(100):
+        middle = (lower+upper)/2
+        if _normal_cdf(middle) < probability:
+            lower = middle
+        else:
+            upper = middle
+
+    return (lower+upper)/2
+
+
+def _seed_sequences(seed, num_of_samples, batch_size):
+    r"""Split a seed in one independent seed sequence per batch of samples
+
+    The samples are split in batches of batch_size samples, so that the
+    random streams depend on seed and batch_size, but not on the number
+    of processes sharing the batches.
+
+    :param seed: A seed
+    :type seed: :class:`int` or :class:`numpy.random.SeedSequence`
+    :param num_of_samples: The number of samples
+    :type num_of_samples: :class:`int`
+    :param batch_size: The number of samples per batch
+    :type batch_size: :class:`int`
+    :returns: The list of the pairs of the batch sizes and seed sequences
+    :rtype: :class:`list`
+    :raises: :class:`ValueError`
+    """
+    if num_of_samples < 1:
+        raise ValueError("At least one sample is required")
+
+    if batch_size < 1:
+        raise ValueError("The batches must contain at least one sample")
+
+    if not isinstance(seed, SeedSequence):
+        seed = SeedSequence(seed)
+
+    sizes = [batch_size]*(num_of_samples//batch_size)
+    if num_of_samples % batch_size:
+        sizes.append(num_of_samples % batch_size)
+
+    return list(zip(sizes, seed.spawn(len(sizes))))
+
+
+def _map_batches(function, batches, n_jobs):
+    r"""Apply a function to some batches and concatenate the results
+
+    :param function: A function mapping a batch into an array
+    :type function: Callable object
+    :param batches: A list of tuples of arguments of function
+    :type batches: :class:`list`
+    :param n_jobs: The number of worker processes or `None` to process
+                   the batches in the calling process
+    :type n_jobs: :class:`int`
+    :returns: The concatenation of the results of function on batches
+    :rtype: :class:`numpy.ndarray`
+    """
+    if n_jobs is None or n_jobs < 2 or len(batches) < 2:
+        results = [function(*batch) for batch in batches]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            results = list(executor.map(function, *zip(*batches)))
+
+    if len(results) == 0:
+        return asarray([])
+
+    return concatenate(results)
+
+
+def bootstrap_tables(agreement_matrix, num_of_samples, seed=None):
+    r"""Resample an agreement matrix
+
+    Draw num_of_samples multinomial resamples of agreement_matrix, i.e.,
+    the agreement matrices of num_of_samples samples, drawn with
+    replacement, of the items summarized by agreement_matrix, in a single
+    call.
+
+    :param agreement_matrix: An :math:`n \times n`-agreement matrix of
+                             integer counts
+    :type agreement_matrix: :class:`numpy.ndarray`
+    :param num_of_samples: The number of resamples :math:`B`
+    :type num_of_samples: :class:`int`
+    :param seed: A seed or a random generator
+    :type seed: :class:`int`, :class:`numpy.random.SeedSequence`, or
+                :class:`numpy.random.Generator`
+    :returns: The :math:`B \times n \times n`-array of the resamples
+    :rtype: :class:`numpy.ndarray`
+    :raises: :class:`ValueError`
+    """
+    agreement_matrix = AgreementTable(agreement_matrix).matrix
+    if agreement_matrix.ndim > 2:
+        raise ValueError("A single agreement matrix is required")
+
+    total = agreement_matrix.sum()
+    if total != int(total):
+        raise ValueError("The matrix does not contain integer counts")
+
+    rng = default_rng(seed)
+    resamples = rng.multinomial(int(total), (agreement_matrix/total).ravel(),
+                                size=num_of_samples)
+
+    return resamples.reshape((num_of_samples,)+agreement_matrix.shape)
+
+
+def _bootstrap_batch(measure, agreement_matrix, num_of_samples, seed):
+    r"""Evaluate a measure on a batch of resamples of an agreement matrix
+
+    :param measure: A measure accepting stacks of agreement matrices
+    :type measure: Callable object
+    :param agreement_matrix: An agreement matrix
+    :type agreement_matrix: :class:`numpy.ndarray`
+    :param num_of_samples: The number of resamples
+    :type num_of_samples: :class:`int`
+    :param seed: A seed sequence
+    :type seed: :class:`numpy.random.SeedSequence`
+    :returns: The array of the measure values on the resamples
+    :rtype: :class:`numpy.ndarray`
+    """
+    return measure(bootstrap_tables(agreement_matrix, num_of_samples, seed))
+
+
+def bootstrap_replicates(agreement_matrix, measure=cohen_kappa,
+                         num_of_samples=2000, seed=None, n_jobs=None,
+                         batch_size=1000):
+    r"""Evaluate a measure on bootstrap resamples of an agreement matrix
+
+    Draw num_of_samples multinomial resamples of agreement_matrix (see
+    :func:`bootstrap_tables`) in batches of batch_size resamples and
+    evaluate measure on each batch at once. Each batch has its own random
+    stream spawned from seed, so the result only depends on seed and
+    batch_size. Whenever n_jobs is greater than 1, the batches are shared
+    among n_jobs worker processes; in this case, measure must be
+    picklable, e.g., a function of this package.
+
+    :param agreement_matrix: An :math:`n \times n`-agreement matrix of
+                             integer counts
+    :type agreement_matrix: :class:`numpy.ndarray`
+    :param measure: A measure accepting stacks of agreement matrices
+    :type measure: Callable object
+    :param num_of_samples: The number of resamples :math:`B`
+    :type num_of_samples: :class:`int`
+    :param seed: A seed
+    :type seed: :class:`int` or :class:`numpy.random.SeedSequence`
+    :param n_jobs: The number of worker processes
+    :type n_jobs: :class:`int`
+    :param batch_size: The number of resamples per batch
+    :type batch_size: :class:`int`
+    :returns: The :math:`B`-array of the measure values on the resamples
+    :rtype: :class:`numpy.ndarray`
+    :raises: :class:`ValueError`
+    """
+    agreement_matrix = AgreementTable(agreement_matrix).matrix
+
+    batches = [(measure, agreement_matrix, size, batch_seed)
+               for size, batch_seed in _seed_sequences(seed, num_of_samples,
+                                                       batch_size)]
+
+    return _map_batches(_bootstrap_batch, batches, n_jobs)
+
+
+def _jackknife_values(measure, agreement_matrix, batch_size):
+    r"""Evaluate a measure on the leave-one-out agreement matrices
+
+    Removing one item from the data summarized by an agreement matrix
+    decreases by one one of its non-null elements. Hence, the
+    leave-one-out matrices are as many as the non-null elements and each
+    of them stands for as many items as the value of the element.
+
+    :param measure: A measure accepting stacks of agreement matrices
+    :type measure: Callable object
+    :param agreement_matrix: An agreement matrix
+    :type agreement_matrix: :class:`numpy.ndarray`
+    :param batch_size: The number of matrices per evaluated stack
+    :type batch_size: :class:`int`
+    :returns: The values of measure on the leave-one-out matrices and the
+              numbers of items that they stand for
+    :rtype: :class:`tuple`
+    """
+    cells = agreement_matrix.ravel().nonzero()[0]
+
+    values = []
+    for begin in range(0, len(cells), batch_size):
+        batch = cells[begin:begin+batch_size]
+        stack = repeat(agreement_matrix.ravel()[None, :], len(batch), axis=0)
+        stack[arange(len(batch)), batch] -= 1
+
+        values.append(measure(stack.reshape((len(batch),) +
+                                            agreement_matrix.shape)))
+
+    return concatenate(values), agreement_matrix.ravel()[cells]
+
+
+def confidence_interval(estimate, replicates, confidence=0.95,
+                        method='percentile', jackknife=None):
+    r"""Evaluate a bootstrap confidence interval
+
+    Compute the confidence interval of a measure from its value estimate
+    on the observed data and its values replicates on bootstrap
+    resamples. The non-finite replicates, i.e., those of the resamples out
+    of the measure domain, are ignored.
+
+    The method can be either `'percentile'` or `'bca'`, i.e.,
+    bias-corrected and accelerated. The latter requires jackknife: the
+    pair of the array of the measure values on the leave-one-out data and
+    the array of their multiplicities.
+
+    :param estimate: The value of the measure on the observed data
+    :type estimate: :class:`float`
+    :param replicates: The values of the measure on the resamples
+    :type replicates: :class:`numpy.ndarray`
+    :param confidence: The confidence level
+    :type confidence: :class:`float`
+    :param method: The interval method
+    :type method: :class:`str`
+    :param jackknife: The leave-one-out values and their multiplicities
+    :type jackknife: :class:`tuple`
+    :returns: The confidence interval
+    :rtype: :class:`ConfidenceInterval`
+    :raises: :class:`ValueError`
+    """
+    if not 0 < confidence < 1:
+        raise ValueError("The confidence level must be in (0,1)")
+
+    replicates = asarray(replicates)
+    replicates = replicates[isfinite(replicates)]
+    if len(replicates) == 0:
+        raise ValueError("No resample is in the measure domain")
+
+    alpha = (1-confidence)/2
+    probabilities = [alpha, 1-alpha]
+
+    if method == 'bca':
+        if jackknife is None:
+            raise ValueError("BCa intervals require the jackknife values")
+
+        proportion = (replicates < estimate).mean()
+        if proportion in (0, 1):
+            raise ValueError("The bias correction of the BCa interval " +
+                             "is not finite")
+        bias = _normal_ppf(proportion)
+
+        values, weights = asarray(jackknife[0]), asarray(jackknife[1])
+        finite = isfinite(values)
+        values, weights = values[finite], weights[finite]
+
+        deviations = (values*weights).sum()/weights.sum()-values
+        with errstate(divide='ignore', invalid='ignore'):
+            acceleration = ((weights*deviations**3).sum() /
+                            (6*(weights*deviations**2).sum()**1.5))
+        if not isfinite(acceleration):
+            acceleration = 0
+
+        adjusted = []
+        for probability in probabilities:
+            z_value = bias+_normal_ppf(probability)
+            adjusted.append(_normal_cdf(bias+z_value /
+                                        (1-acceleration*z_value)))
+        probabilities = adjusted
+    elif method != 'percentile':
+        raise ValueError("Unknown interval method {}".format(method))
+
+    lower, upper = quantile(replicates, probabilities)
+
+    return ConfidenceInterval(estimate, lower, upper)
+
+
+def bootstrap_interval(agreement_matrix, measure=cohen_kappa,
+                       num_of_samples=2000, confidence=0.95,
+                       method='percentile', seed=None, n_jobs=None,
+                       batch_size=1000):
+    r"""Evaluate the bootstrap confidence interval of a measure
+
+    Compute the confidence interval of measure on agreement_matrix from
+    num_of_samples multinomial resamples of agreement_matrix (see
+    :func:`bootstrap_replicates`). The method can be either
+    `'percentile'` or `'bca'` (see :func:`confidence_interval`); in the
+    latter case, the jackknife values are computed on the leave-one-out
+    agreement matrices, which are at most as many as the elements of
+    agreement_matrix.
+
+    :param agreement_matrix: An :math:`n \times n`-agreement matrix of
+                             integer counts
+    :type agreement_matrix: :class:`numpy.ndarray`
+    :param measure: A measure accepting stacks of agreement matrices
+    :type measure: Callable object
+    :param num_of_samples: The number of resamples :math:`B`
+    :type num_of_samples: :class:`int`
+    :param confidence: The confidence level
+    :type confidence: :class:`float`
+    :param method: The interval method
+    :type method: :class:`str`
+    :param seed: A seed
+    :type seed: :class:`int` or :class:`numpy.random.SeedSequence`
+    :param n_jobs: The number of worker processes
+    :type n_jobs: :class:`int`
+    :param batch_size: The number of resamples per batch
+    :type batch_size: :class:`int`
+    :returns: The confidence interval
+    :rtype: :class:`ConfidenceInterval`
+    :raises: :class:`ValueError`
+    """
+    table = AgreementTable(agreement_matrix)
+    if table.is_stack:
+        raise ValueError("A single agreement matrix is required")
+
+    estimate = measure(table)
+    replicates = bootstrap_replicates(table.matrix, measure, num_of_samples,
+                                      seed, n_jobs, batch_size)
+
+    jackknife = None
+    if method == 'bca':
+        jackknife = _jackknife_values(measure, table.matrix, batch_size)
+
+    return confidence_interval(estimate, replicates, confidence, method,
+                               jackknife)
+
+
+def _fleiss_kappa_bootstrap_task(classification_matrix, num_of_raters,
+                                 batches):
+    r"""Evaluate Fleiss's :math:`\kappa` on some batches of row resamples
+
+    For every batch, a :math:`b \times N`-array of resampled row indices
+    is drawn and the sufficient statistics of Fleiss's :math:`\kappa` on
+    the resampled classification matrices are reduced from the per-row
+    statistics by gathers and sums. Hence, the resampled matrices are
+    never built.
+
+    :param classification_matrix: An :math:`N \times k`-classification
+                                  matrix
+    :type classification_matrix: :class:`numpy.ndarray`
+    :param num_of_raters: The number of raters :math:`n`
+    :type num_of_raters: :class:`int`
+    :param batches: A list of pairs of batch sizes and seed sequences
+    :type batches: :class:`list`
+    :returns: The array of the Fleiss's :math:`\kappa` of the resamples
+    :rtype: :class:`numpy.ndarray`
+    """
+    dataset_size = classification_matrix.shape[0]
+    squares = multiply(classification_matrix, classification_matrix,
+                       dtype=_wide_type(classification_matrix)).sum(axis=1)
+    columns = classification_matrix.T.copy()
+
+    results = []
+    for num_of_samples, seed in batches:
+        rng = default_rng(seed)
+        indices = rng.integers(0, dataset_size,
+                               size=(num_of_samples, dataset_size))
+
+        category_totals = stack([column[indices].sum(axis=1)
+                                 for column in columns], axis=-1)
+
+        results.append(fleiss_kappa_from_statistics(
+            category_totals, squares[indices].sum(axis=1), dataset_size,
+            num_of_raters))
+
+    return concatenate(results)
+
+
+def fleiss_kappa_bootstrap_replicates(classification_matrix,
+                                      num_of_samples=2000, seed=None,
+                                      n_jobs=None, batch_size=None):
+    r"""Evaluate Fleiss's :math:`\kappa` on item-level bootstrap resamples
+
+    Draw num_of_samples resamples of the rows of classification_matrix,
+    i.e., of the rated items, in batches of batch_size resamples and
+    evaluate Fleiss's :math:`\kappa` on each of them. Every batch is a
+    :math:`b \times N`-array of row indices whose statistics are reduced
+    without building the resampled matrices and without looping over the
+    resamples. Whenever batch_size is `None`, it is chosen so that every
+    index array has about :math:`2^{24}` elements. Each batch has its own
+    random stream spawned from seed and, whenever n_jobs is greater than
+    1, the batches are shared among n_jobs worker processes.
+
+    :param classification_matrix: An :math:`N \times k`-classification
+                                  matrix
+    :type classification_matrix: :class:`numpy.ndarray`
+    :param num_of_samples: The number of resamples :math:`B`
+    :type num_of_samples: :class:`int`
+    :param seed: A seed
+    :type seed: :class:`int` or :class:`numpy.random.SeedSequence`
+    :param n_jobs: The number of worker processes
+    :type n_jobs: :class:`int`
+    :param batch_size: The number of resamples per batch
+    :type batch_size: :class:`int`
+    :returns: The :math:`B`-array of the Fleiss's :math:`\kappa` of the
+              resamples
+    :rtype: :class:`numpy.ndarray`
+    :raises: :class:`ValueError`
+    """
+    classification_matrix = asarray(classification_matrix)
+
+    if np_any(classification_matrix < 0):
+        raise ValueError("The matrix contains some negative values")
+
+    num_of_raters = classification_matrix[0, :].sum()
+
+    if batch_size is None:
+        batch_size = max(1, 2**24//classification_matrix.shape[0])
+
+    batches = _seed_sequences(seed, num_of_samples, batch_size)
+
+    # the matrix is sent once per task rather than once per batch
+    num_of_tasks = 1 if n_jobs is None else max(1, n_jobs)
+    task_size = max(1, -(-len(batches)//num_of_tasks))
+    tasks = [(classification_matrix, num_of_raters,
+              batches[begin:begin+task_size])
+             for begin in range(0, len(batches), task_size)]
+
+    return _map_batches(_fleiss_kappa_bootstrap_task, tasks, n_jobs)
+
+
+def fleiss_kappa_bootstrap_interval(classification_matrix,
+                                    num_of_samples=2000, confidence=0.95,
+                                    method='percentile', seed=None,
+                                    n_jobs=None, batch_size=None):
+    r"""Evaluate the item-level bootstrap confidence interval of Fleiss's
+    :math:`\kappa`
+
+    Compute the confidence interval of Fleiss's :math:`\kappa` on
+    classification_matrix from num_of_samples resamples of its rows (see
+    :func:`fleiss_kappa_bootstrap_replicates`). The method can be either
+    `'percentile'` or `'bca'` (see :func:`confidence_interval`); in the
+    latter case, the jackknife values are evaluated on all the
+    leave-one-row-out matrices at once by subtracting the per-row
+    statistics from the overall ones.
+
+    :param classification_matrix: An :math:`N \times k`-classification
+                                  matrix
+    :type classification_matrix: :class:`numpy.ndarray`
+    :param num_of_samples: The number of resamples :math:`B`
+    :type num_of_samples: :class:`int`
+    :param confidence: The confidence level
+    :type confidence: :class:`float`
+    :param method: The interval method
+    :type method: :class:`str`
+    :param seed: A seed
+    :type seed: :class:`int` or :class:`numpy.random.SeedSequence`
+    :param n_jobs: The number of worker processes
+    :type n_jobs: :class:`int`
+    :param batch_size: The number of resamples per batch
+    :type batch_size: :class:`int`
+    :returns: The confidence interval
+    :rtype: :class:`ConfidenceInterval`
+    :raises: :class:`ValueError`
+    """
+    classification_matrix = asarray(classification_matrix)
+
+    estimate = fleiss_kappa(classification_matrix)
+    replicates = fleiss_kappa_bootstrap_replicates(classification_matrix,
+                                                   num_of_samples, seed,
+                                                   n_jobs, batch_size)
+
+    jackknife = None
+    if method == 'bca':
+        dataset_size = classification_matrix.shape[0]
+        squares = multiply(classification_matrix, classification_matrix,
+                           dtype=_wide_type(classification_matrix))
+        squares = squares.sum(axis=1)
+
+        with errstate(divide='ignore', invalid='ignore'):
+            values = fleiss_kappa_from_statistics(
+                classification_matrix.sum(axis=0)-classification_matrix,
+                squares.sum()-squares, dataset_size-1,
+                classification_matrix[0, :].sum())
+
+        jackknife = (values, ones(dataset_size))
+
+    return confidence_interval(estimate, replicates, confidence, method,
+                               jackknife)
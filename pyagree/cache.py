@@ -0,0 +1,242 @@
+"""This file contains the implementation of a content-addressed cache of the
+   agreement measure values.
+
+.. moduleauthor:: Alberto Casagrande <acasagrande@units.it>
+
+"""
+
+from collections import namedtuple, OrderedDict
+from functools import wraps
+from hashlib import blake2b
+from threading import Lock
+
+from numpy import ndarray, ascontiguousarray, asarray, lexsort
+
+from .common import as_count_array
+from .table import AgreementTable
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'max_size', 'size'])
+CacheInfo.__doc__ = r"""The statistics of a measure cache
+
+:param hits: The number of evaluations answered by the cache
+:param misses: The number of evaluations performed by the measures
+:param max_size: The maximum number of cached values
+:param size: The number of cached values
+"""
+
+
+def _array_key(array):
+    r"""Build the content-addressed key of an array
+
+    :param array: An array
+    :type array: :class:`numpy.ndarray`
+    :returns: The digest of the bytes, the shape, and the type of array
+    :rtype: :class:`tuple`
+    """
+    array = ascontiguousarray(array)
+
+    return (blake2b(array, digest_size=16).hexdigest(), array.shape,
+            array.dtype.str)
+
+
+def _matrix_key(agreement_matrix):
+    r"""Build the content-addressed key of an agreement matrix
+
+    :param agreement_matrix: An agreement matrix, a stack of them, or an
+                             agreement table
+    :type agreement_matrix: :class:`numpy.ndarray` or
+                            :class:`pyagree.AgreementTable`
+    :returns: A key which only depends on the elements of agreement_matrix
+    :rtype: :class:`tuple`
+    """
+    if isinstance(agreement_matrix, dict) or \
+            hasattr(agreement_matrix, 'tocoo'):
+        agreement_matrix = AgreementTable(agreement_matrix)
+
+    if isinstance(agreement_matrix, AgreementTable):
+        if agreement_matrix.is_sparse:
+            # the cells are sorted, so that the key does not depend on
+            # the order in which they have been given
+            rows, cols, values = agreement_matrix.cells
+            nonnull = values != 0
+            rows, cols, values = rows[nonnull], cols[nonnull], values[nonnull]
+            order = lexsort((cols, rows))
+
+            return ('sparse', agreement_matrix.size) + \
+                tuple(_array_key(cells[order])
+                      for cells in (rows, cols, values))
+
+        agreement_matrix = agreement_matrix.matrix
+
+    return _array_key(as_count_array(agreement_matrix))
+
+
+def _parameter_key(value):
+    r"""Build a hashable key of a measure parameter
+
+    Lists and tuples are keyed as the arrays they represent, so that
+    equal sequences share their key.
+
+    :param value: The value of a parameter
+    :returns: The key of the array value or value itself
+    """
+    if isinstance(value, (list, tuple)):
+        try:
+            array = asarray(value)
+        except ValueError:
+            return value
+
+        if array.dtype.kind != 'O':
+            value = array
+
+    if isinstance(value, ndarray):
+        return ('array', ) + _array_key(value)
+
+    return value
+
+
+class MeasureCache:
+    r"""A bounded LRU cache of the agreement measure values
+
+    A measure cache stores the values of the measures on the agreement
+    matrices they have been evaluated on, so that the evaluation of a
+    measure on a matrix whose value is cached does not evaluate the
+    measure again. The values are addressed by the measure, by its other
+    positional and keyword parameters, and by a digest of the elements,
+    the shape, and the type of the matrix, so that equal matrices share
+    their cached values even when they are different objects. Whenever
+    the cache stores max_size values, the least recently used one is
+    evicted.
+
+    The values that are arrays, i.e., the values on stacks of agreement
+    matrices, are cached and returned read-only. The evaluations raising
+    a :class:`ValueError` and those whose parameters are not hashable,
+    even as arrays, are not cached.
+
+    :param max_size: The maximum number of cached values
+    :type max_size: :class:`int`
+    :raises: :class:`ValueError`
+    """
+
+    def __init__(self, max_size=1024):
+        if max_size < 1:
+            raise ValueError("The cache must contain at least one value")
+
+        self._max_size = max_size
+        self._values = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._lock = Lock()
+
+    def evaluate(self, measure, agreement_matrix, *arguments, **parameters):
+        r"""Evaluate a measure on an agreement matrix through the cache
+
+        :param measure: An agreement measure
+        :type measure: Callable object
+        :param agreement_matrix: An agreement matrix, a stack of them, or
+                                 an agreement table
+        :type agreement_matrix: :class:`numpy.ndarray` or
+                                :class:`pyagree.AgreementTable`
+        :param arguments: The other positional parameters of measure
+        :param parameters: The keyword parameters of measure
+        :returns: The value of measure on agreement_matrix
+        :rtype: :class:`float` or :class:`numpy.ndarray`
+        :raises: :class:`ValueError`
+        """
+        key = (measure, _matrix_key(agreement_matrix),
+               tuple(_parameter_key(value) for value in arguments),
+               tuple(sorted((name, _parameter_key(value))
+                            for name, value in parameters.items())))
+
+        try:
+            hash(key)
+        except TypeError:
+            # the parameters cannot be keyed: evaluate without caching
+            value = measure(agreement_matrix, *arguments, **parameters)
+            with self._lock:
+                self._misses += 1
+
+            return value
+
+        with self._lock:
+            if key in self._values:
+                self._values.move_to_end(key)
+                self._hits += 1
+                return self._values[key]
+
+        value = measure(agreement_matrix, *arguments, **parameters)
+        if isinstance(value, ndarray):
+            value.flags.writeable = False
+
+        with self._lock:
+            self._misses += 1
+            self._values[key] = value
+            self._values.move_to_end(key)
+            while len(self._values) > self._max_size:
+                self._values.popitem(last=False)
+
+        return value
+
+    def cached(self, measure):
+        r"""Wrap a measure so that it is evaluated through the cache
+
+        :param measure: An agreement measure
+        :type measure: Callable object
+        :returns: A function evaluating measure through the cache
+        :rtype: Callable object
+        """
+        @wraps(measure)
+        def wrapper(agreement_matrix, *arguments, **parameters):
+            return self.evaluate(measure, agreement_matrix, *arguments,
+                                 **parameters)
+
+        return wrapper
+
+    def invalidate(self, agreement_matrix=None, measure=None):
+        r"""Remove some values from the cache
+
+        Remove the cached values of measure on agreement_matrix. Whenever
+        agreement_matrix is `None`, the values of measure on all the
+        matrices are removed and, whenever measure is `None`, the values
+        of all the measures are removed.
+
+        :param agreement_matrix: An agreement matrix, a stack of them, or
+                                 an agreement table
+        :type agreement_matrix: :class:`numpy.ndarray` or
+                                :class:`pyagree.AgreementTable`
+        :param measure: An agreement measure
+        :type measure: Callable object
+        :returns: The number of removed values
+        :rtype: :class:`int`
+        """
+        matrix_key = None
+        if agreement_matrix is not None:
+            matrix_key = _matrix_key(agreement_matrix)
+
+        with self._lock:
+            removed = [key for key in self._values
+                       if (measure is None or key[0] is measure) and
+                       (matrix_key is None or key[1] == matrix_key)]
+            for key in removed:
+                del self._values[key]
+
+        return len(removed)
+
+    def cache_clear(self):
+        r"""Remove all the values from the cache and reset its statistics
+        """
+        with self._lock:
+            self._values.clear()
+            self._hits = 0
+            self._misses = 0
+
+    def cache_info(self):
+        r"""Return the statistics of the cache
+
+        :returns: The numbers of hits and misses, the maximum size, and
+                  the current size of the cache
+        :rtype: :class:`CacheInfo`
+        """
+        with self._lock:
+            return CacheInfo(self._hits, self._misses, self._max_size,
+                             len(self._values))
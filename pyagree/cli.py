@@ -0,0 +1,397 @@
+"""This file contains the implementation of the `pyagree` command-line tool.
+
+.. moduleauthor:: Alberto Casagrande <acasagrande@units.it>
+
+"""
+
+import argparse
+import csv
+import json
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice, count
+from math import isnan
+
+from numpy import asarray, concatenate, zeros, repeat
+
+from .accumulator import AgreementAccumulator, FleissAccumulator
+from .table import AgreementTable
+from .standard import bennett_s, bangdiwala_b, cohen_kappa, scott_pi
+from .standard import yule_y
+from .inf_agreement import ia_c
+
+MEASURES = ('bennett_s', 'bangdiwala_b', 'cohen_kappa', 'scott_pi', 'yule_y',
+            'ia_c', 'fleiss_kappa')
+
+# on two raters, Fleiss's kappa coincides with Scott's pi
+_TABLE_MEASURES = {'bennett_s': bennett_s, 'bangdiwala_b': bangdiwala_b,
+                   'cohen_kappa': cohen_kappa, 'scott_pi': scott_pi,
+                   'yule_y': yule_y, 'ia_c': ia_c, 'fleiss_kappa': scott_pi}
+
+
+def _open_input(path):
+    r"""Open an input file or the standard input
+
+    :param path: The path of the file or `'-'` for the standard input
+    :type path: :class:`str`
+    :returns: The text stream of the file
+    :rtype: File object
+    """
+    if path == '-':
+        return sys.stdin
+
+    return open(path, newline='')
+
+
+def _default_delimiter(path):
+    r"""Guess the delimiter of a file from its extension
+
+    :param path: The path of a file
+    :type path: :class:`str`
+    :returns: A tab for `.tsv` and `.tab` files and a comma otherwise
+    :rtype: :class:`str`
+    """
+    return '\t' if path.lower().endswith(('.tsv', '.tab')) else ','
+
+
+def _chunks(rows, chunk_size):
+    r"""Split an iterable of rows in lists of chunk_size rows
+
+    :param rows: An iterable object of rows
+    :type rows: Iterable object
+    :param chunk_size: The number of rows per chunk
+    :type chunk_size: :class:`int`
+    :returns: A generator of the lists of rows
+    :rtype: Generator
+    """
+    chunk = list(islice(rows, chunk_size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(rows, chunk_size))
+
+
+def _evaluate(measures, function):
+    r"""Evaluate some measures and map the out-of-domain ones to nan
+
+    :param measures: The names of the measures
+    :type measures: :class:`list`
+    :param function: A function mapping a measure name into its value
+    :type function: Callable object
+    :returns: A dictionary mapping the names into the values
+    :rtype: :class:`dict`
+    """
+    values = {}
+    for measure in measures:
+        try:
+            values[measure] = float(function(measure))
+        except ValueError:
+            values[measure] = float('nan')
+
+    return values
+
+
+def score_ratings(stream, measures, raters=None, labels=None,
+                  delimiter=',', chunk_size=65536):
+    r"""Evaluate some measures on a stream of ratings
+
+    The stream contains a delimited table whose first row names the
+    raters and whose other rows are the items: the element in the
+    column of a rater is the label given by it to the item, and empty
+    elements are missing ratings. The rows are read in chunks of
+    chunk_size rows and reduced to their counts chunk by chunk, so that
+    the memory footprint does not depend on the number of items.
+
+    The measures on two raters are evaluated on the first two columns in
+    raters, skipping the items that any of them did not rate, while
+    Fleiss's :math:`\kappa` is evaluated on all the columns in raters,
+    skipping the items that any of them did not rate. By default, raters
+    contains all the columns.
+
+    :param stream: A text stream
+    :type stream: File object
+    :param measures: The names of the measures
+    :type measures: :class:`list`
+    :param raters: The names of the selected rater columns
+    :type raters: :class:`list`
+    :param labels: The sequence of labels
+    :type labels: Iterable object
+    :param delimiter: The delimiter of the columns
+    :type delimiter: :class:`str`
+    :param chunk_size: The number of rows per chunk
+    :type chunk_size: :class:`int`
+    :returns: A dictionary mapping the names of the measures into their
+              values
+    :rtype: :class:`dict`
+    :raises: :class:`ValueError`
+    """
+    reader = csv.reader(stream, delimiter=delimiter)
+    header = next(reader, None)
+    if header is None:
+        raise ValueError("The ratings have no header")
+
+    if raters is None:
+        raters = header
+    missing = [rater for rater in raters if rater not in header]
+    if missing:
+        raise ValueError("Unknown raters {}".format(', '.join(missing)))
+
+    columns = [header.index(rater) for rater in raters]
+    pairwise = [measure for measure in measures if measure != 'fleiss_kappa']
+    if pairwise and len(columns) < 2:
+        raise ValueError("The measures on two raters require two raters")
+
+    pairs = AgreementAccumulator(labels)
+    fleiss = FleissAccumulator()
+
+    items = count()
+    for chunk in _chunks(reader, chunk_size):
+        ratings = asarray([[row[column] if column < len(row) else ''
+                            for column in columns] for row in chunk],
+                          dtype=str)
+
+        if pairwise:
+            rated = (ratings[:, 0] != '') & (ratings[:, 1] != '')
+            pairs.update(ratings[rated, 0], ratings[rated, 1])
+
+        if 'fleiss_kappa' in measures:
+            # Fleiss's kappa requires the same number of ratings per item
+            complete = (ratings != '').all(axis=1)
+            item_ids = asarray([next(items) for _ in chunk])[complete]
+            fleiss.update(repeat(item_ids, len(columns)),
+                          ratings[complete].ravel())
+
+    def measure_value(measure):
+        if measure == 'fleiss_kappa':
+            return fleiss.fleiss_kappa()
+
+        return getattr(pairs, measure)()
+
+    return _evaluate(measures, measure_value)
+
+
+def _is_numeric(row):
+    r"""Test whether all the elements of a row are numbers
+
+    :param row: A row of a delimited table
+    :type row: :class:`list`
+    :returns: `True` if and only if all the elements of row are numbers
+    :rtype: :class:`bool`
+    """
+    try:
+        for element in row:
+            float(element)
+    except ValueError:
+        return False
+
+    return len(row) > 0
+
+
+def score_table(stream, measures, delimiter=',', chunk_size=65536,
+                header=None):
+    r"""Evaluate some measures on a stream of an agreement matrix
+
+    The stream contains a delimited :math:`n \times n`-agreement matrix,
+    one row per line, which may be preceded by a header naming the
+    labels. Whenever header is `None`, the first row is a header if
+    either it contains an element which is not a number or the stream
+    contains :math:`n+1` rows of :math:`n` elements. The rows are read in
+    chunks of chunk_size rows. On two raters, Fleiss's :math:`\kappa`
+    coincides with Scott's :math:`\pi`.
+
+    :param stream: A text stream
+    :type stream: File object
+    :param measures: The names of the measures
+    :type measures: :class:`list`
+    :param delimiter: The delimiter of the columns
+    :type delimiter: :class:`str`
+    :param chunk_size: The number of rows per chunk
+    :type chunk_size: :class:`int`
+    :param header: Whether the first row is a header or `None` to detect
+                   it
+    :type header: :class:`bool`
+    :returns: A dictionary mapping the names of the measures into their
+              values
+    :rtype: :class:`dict`
+    :raises: :class:`ValueError`
+    """
+    reader = csv.reader(stream, delimiter=delimiter)
+
+    blocks = []
+    for index, chunk in enumerate(_chunks(reader, chunk_size)):
+        if index == 0 and (header is True or
+                           (header is None and not _is_numeric(chunk[0]))):
+            chunk = chunk[1:]
+            header = True
+        if chunk:
+            blocks.append(asarray(chunk, dtype=float))
+
+    matrix = concatenate(blocks) if blocks else zeros((0, 0))
+
+    # a numeric header makes an n x n-matrix an (n+1) x n-matrix
+    if header is None and matrix.shape[0] == matrix.shape[1]+1:
+        matrix = matrix[1:]
+    if (matrix == matrix.astype(int)).all():
+        matrix = matrix.astype(int)
+
+    table = AgreementTable(matrix)
+
+    return _evaluate(measures,
+                     lambda measure: _TABLE_MEASURES[measure](table))
+
+
+def score_file(path, input_format='ratings', measures=MEASURES,
+               raters=None, labels=None, delimiter=None, chunk_size=65536,
+               header=None):
+    r"""Evaluate some measures on a file of ratings or an agreement matrix
+
+    See :func:`score_ratings` and :func:`score_table`.
+
+    :param path: The path of the file or `'-'` for the standard input
+    :type path: :class:`str`
+    :param input_format: Either `'ratings'` or `'table'`
+    :type input_format: :class:`str`
+    :param measures: The names of the measures
+    :type measures: :class:`list`
+    :param raters: The names of the selected rater columns
+    :type raters: :class:`list`
+    :param labels: The sequence of labels
+    :type labels: Iterable object
+    :param delimiter: The delimiter of the columns or `None` to guess it
+                      from the file extension
+    :type delimiter: :class:`str`
+    :param chunk_size: The number of rows per chunk
+    :type chunk_size: :class:`int`
+    :param header: Whether the first row of an agreement matrix file is a
+                   header or `None` to detect it
+    :type header: :class:`bool`
+    :returns: A dictionary mapping `'file'` into path and the names of
+              the measures into their values
+    :rtype: :class:`dict`
+    :raises: :class:`ValueError`
+    """
+    unknown = [measure for measure in measures if measure not in MEASURES]
+    if unknown:
+        raise ValueError("Unknown measures {}".format(', '.join(unknown)))
+
+    if delimiter is None:
+        delimiter = _default_delimiter(path)
+
+    stream = _open_input(path)
+    try:
+        if input_format == 'table':
+            values = score_table(stream, measures, delimiter, chunk_size,
+                                 header)
+        elif input_format == 'ratings':
+            values = score_ratings(stream, measures, raters, labels,
+                                   delimiter, chunk_size)
+        else:
+            raise ValueError("Unknown input format {}".format(input_format))
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+    result = {'file': path}
+    result.update(values)
+
+    return result
+
+
+def _write_results(results, measures, output_format, output):
+    r"""Write the results of the files in JSON Lines or CSV format
+
+    :param results: The dictionaries returned by :func:`score_file`
+    :type results: :class:`list`
+    :param measures: The names of the measures
+    :type measures: :class:`list`
+    :param output_format: Either `'json'` or `'csv'`
+    :type output_format: :class:`str`
+    :param output: The output stream
+    :type output: File object
+    """
+    if output_format == 'json':
+        for result in results:
+            json.dump({key: (None if isinstance(value, float) and
+                             isnan(value) else value)
+                       for key, value in result.items()}, output)
+            output.write('\n')
+        return
+
+    writer = csv.writer(output, lineterminator='\n')
+    writer.writerow(['file'] + list(measures))
+    for result in results:
+        writer.writerow([result['file']] +
+                        [repr(result[measure]) for measure in measures])
+
+
+def _split(value):
+    r"""Split a comma-separated command-line value
+
+    :param value: A comma-separated list
+    :type value: :class:`str`
+    :returns: The list of the values
+    :rtype: :class:`list`
+    """
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def main(argv=None):
+    r"""Run the `pyagree` command-line tool
+
+    :param argv: The command-line arguments or `None` for `sys.argv`
+    :type argv: :class:`list`
+    :returns: The exit status
+    :rtype: :class:`int`
+    """
+    parser = argparse.ArgumentParser(
+        prog='pyagree',
+        description='Evaluate inter-rater agreement measures on delimited '
+                    'files of ratings or of agreement matrices.')
+    parser.add_argument('files', nargs='+',
+                        help="the input files, or '-' for the standard input")
+    parser.add_argument('-i', '--input', choices=('ratings', 'table'),
+                        default='ratings',
+                        help='whether the files contain ratings, one column '
+                             'per rater, or agreement matrices')
+    parser.add_argument('-m', '--measures', type=_split,
+                        default=list(MEASURES),
+                        help='a comma-separated list among ' +
+                             ', '.join(MEASURES))
+    parser.add_argument('-r', '--raters', type=_split,
+                        help='a comma-separated list of the rater columns')
+    parser.add_argument('-l', '--labels', type=_split,
+                        help='a comma-separated list of all the labels')
+    parser.add_argument('-d', '--delimiter',
+                        help='the column delimiter (default: tab for .tsv '
+                             'files and comma otherwise)')
+    parser.add_argument('-c', '--chunk-size', type=int, default=65536,
+                        help='the number of rows per chunk')
+    parser.add_argument('--header', dest='header', action='store_const',
+                        const=True,
+                        help='the agreement matrices have a header '
+                             '(default: detect it)')
+    parser.add_argument('--no-header', dest='header', action='store_const',
+                        const=False,
+                        help='the agreement matrices have no header')
+    parser.add_argument('-f', '--format', choices=('json', 'csv'),
+                        default='json', help='the output format')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='the number of worker processes')
+    args = parser.parse_args(argv)
+
+    parameters = (args.input, args.measures, args.raters, args.labels,
+                  args.delimiter, args.chunk_size, args.header)
+    try:
+        if args.jobs > 1 and len(args.files) > 1 and '-' not in args.files:
+            with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+                results = list(executor.map(
+                    score_file, args.files,
+                    *[[parameter]*len(args.files)
+                      for parameter in parameters]))
+        else:
+            results = [score_file(path, *parameters) for path in args.files]
+    except (ValueError, OSError) as error:
+        parser.exit(1, 'pyagree: error: {}\n'.format(error))
+
+    _write_results(results, args.measures, args.format, sys.stdout)
+
+    return 0
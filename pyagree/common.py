@@ -5,9 +5,14 @@
 
 """
 
+from concurrent.futures import ThreadPoolExecutor
+
+from numpy import where, nan, asarray, ndarray, int64, float64
 from numpy import any as np_any
 from numpy import all as np_all
 
+from .profiling import profiled
+
 
 def count_nonnull_rows(matrix):
     r"""Evaluate the number of non-null rows in a matrix.
@@ -91,6 +96,139 @@ def item_iter(matrix):
             yield elem
 
 
+def as_count_array(values):
+    r"""Access some counts as an array without copying them
+
+    Return values itself whenever it is a :class:`numpy.ndarray`, a
+    :class:`numpy.ndarray` view of values whenever values is an instance
+    of one of its subclasses, e.g., a :class:`numpy.matrix`, an array
+    sharing the memory of values whenever values supports the buffer
+    protocol, e.g., it is a :class:`memoryview`, possibly read-only, or an
+    :class:`array.array`, and a new array otherwise,
+    e.g., for nested lists. In all the cases, the type of the elements,
+    integer types included, is preserved.
+
+    :param values: Some counts
+    :type values: :class:`numpy.ndarray`, buffer object, or nested
+                  sequences
+    :returns: An array of the counts in values
+    :rtype: :class:`numpy.ndarray`
+    """
+    if type(values) is ndarray:
+        return values
+
+    if isinstance(values, ndarray):
+        return asarray(values)
+
+    try:
+        return asarray(memoryview(values))
+    except TypeError:
+        return asarray(values)
+
+
+def _thread_map(function, arguments, n_jobs):
+    r"""Apply a function to some arguments, possibly on a thread pool
+
+    The results are returned in the order of the arguments, so that any
+    later merge of them does not depend on the scheduling of the threads.
+
+    :param function: A function of one argument
+    :type function: Callable object
+    :param arguments: The list of the arguments
+    :type arguments: :class:`list`
+    :param n_jobs: The number of threads or `None` to apply function in
+                   the calling thread
+    :type n_jobs: :class:`int`
+    :returns: The list of the results of function on arguments
+    :rtype: :class:`list`
+    """
+    if n_jobs is None or n_jobs < 2 or len(arguments) < 2:
+        return [function(argument) for argument in arguments]
+
+    with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+        return list(executor.map(function, arguments))
+
+
+def _may_be_negative(matrix):
+    r"""Test whether the type of the elements of a matrix admits negatives
+
+    :param matrix: A matrix
+    :type matrix: :class:`numpy.ndarray`
+    :returns: `False` if the elements of matrix are unsigned integers or
+              Booleans and `True` otherwise
+    :rtype: :class:`bool`
+    """
+    return matrix.dtype.kind not in 'ub'
+
+
+def _wide_type(matrix):
+    r"""Select a type to compute the products of the elements of a matrix
+
+    The products of compact integer elements, e.g., of type `uint8`,
+    overflow their type, hence, they must be computed in a wider one.
+
+    :param matrix: A matrix
+    :type matrix: :class:`numpy.ndarray`
+    :returns: :class:`numpy.int64` if the elements of matrix are integers
+              or Booleans and :class:`numpy.float64` otherwise
+    :rtype: :class:`type`
+    """
+    return int64 if matrix.dtype.kind in 'iub' else float64
+
+
+def _small_matrix_rows(agreement_matrix, validate):
+    r"""Access a small agreement matrix as lists of Python numbers
+
+    On small matrices, the fixed costs of the NumPy calls and of the
+    agreement tables exceed those of the arithmetic, hence, the measures
+    evaluate the matrices having at most 64 elements in plain Python.
+    Only validated plain 2-dimensional numeric arrays are considered, so
+    that the stacks, the agreement tables, the trusted matrices, and the
+    other objects are evaluated as usual.
+
+    :param agreement_matrix: An agreement matrix
+    :param validate: Whether agreement_matrix must be validated
+    :type validate: :class:`bool`
+    :returns: The list of the rows of agreement_matrix, if it is a small
+              validated array, and `None` otherwise
+    :rtype: :class:`list`
+    :raises: :class:`ValueError`
+    """
+    if type(agreement_matrix) is not ndarray or not validate or \
+            agreement_matrix.ndim != 2 or agreement_matrix.size > 64 or \
+            agreement_matrix.dtype.kind not in 'iubf':
+        return None
+
+    if agreement_matrix.shape[0] != agreement_matrix.shape[1]:
+        raise ValueError("Non-squared matrix")
+
+    rows = agreement_matrix.tolist()
+    if any(value < 0 for row in rows for value in row):
+        raise ValueError("The matrix contains some negative values")
+
+    if not any(value != 0 for row in rows for value in row):
+        raise ValueError("The matrix is null")
+
+    return rows
+
+
+def _small_statistics(rows):
+    r"""Evaluate the sufficient statistics of a small agreement matrix
+
+    :param rows: The list of the rows of an agreement matrix
+    :type rows: :class:`list`
+    :returns: The total, the diagonal, the row sums, and the column sums
+              of the matrix
+    :rtype: :class:`tuple`
+    """
+    row_sums = [sum(row) for row in rows]
+    col_sums = [sum(column) for column in zip(*rows)]
+    diagonal = [row[i] for i, row in enumerate(rows)]
+
+    return sum(row_sums), diagonal, row_sums, col_sums
+
+
+@profiled()
 def test_agreement_matrix(matrix):
     r"""Test whether a matrix is an agreement matrix
 
@@ -103,11 +241,60 @@ def test_agreement_matrix(matrix):
     :type matrix: :class:`numpy.ndarray`
     :raises: :class:`ValueError`
     """
-    if matrix.shape[0] != matrix.shape[1]:
+    if matrix.ndim < 2 or matrix.shape[0] != matrix.shape[1]:
         raise ValueError("Non-squared matrix")
 
-    if np_any(matrix < 0):
+    if _may_be_negative(matrix) and np_any(matrix < 0):
         raise ValueError("The matrix contains some negative values")
 
     if np_all(matrix == 0):
         raise ValueError("The matrix is null")
+
+
+@profiled()
+def test_agreement_matrices(matrices):
+    r"""Test whether an array is a stack of agreement matrices
+
+    Test whether the last two dimensions of the array matrices have the
+    same size and whether matrices contains some negative values. In such
+    cases, raise an opportune :class:`ValueError`. Differently from
+    :func:`test_agreement_matrix`, null matrices are admitted in the
+    stack: the measures evaluate them as :data:`numpy.nan`.
+
+    :param matrices: A stack of matrices
+    :type matrices: :class:`numpy.ndarray`
+    :raises: :class:`ValueError`
+    """
+    if matrices.shape[-2] != matrices.shape[-1]:
+        raise ValueError("Non-squared matrices")
+
+    if _may_be_negative(matrices) and np_any(matrices < 0):
+        raise ValueError("The matrices contain some negative values")
+
+
+def restrict_to_domain(values, domain, message):
+    r"""Restrict the values of a measure to its domain
+
+    Whenever values is a scalar, return it if domain holds and raise a
+    :class:`ValueError` whose message is message otherwise. Whenever
+    values is an array, i.e., it contains the values of a measure on a
+    stack of matrices, replace by :data:`numpy.nan` all the values whose
+    corresponding element in domain does not hold.
+
+    :param values: The value, or the array of values, of a measure
+    :type values: :class:`float` or :class:`numpy.ndarray`
+    :param domain: Whether the matrices belong to the measure domain
+    :type domain: :class:`bool` or :class:`numpy.ndarray`
+    :param message: The message of the raised exception
+    :type message: :class:`str`
+    :returns: values restricted to the measure domain
+    :rtype: :class:`float` or :class:`numpy.ndarray`
+    :raises: :class:`ValueError`
+    """
+    if getattr(values, 'ndim', 0) == 0:
+        if not domain:
+            raise ValueError(message)
+
+        return values
+
+    return where(domain, values, nan)
@@ -0,0 +1,362 @@
+"""This file contains the closed-form agreement measures of dichotomous
+   ratings, i.e., of :math:`2 \\times 2`-agreement matrices stored by
+   columns.
+
+.. moduleauthor:: Alberto Casagrande <acasagrande@units.it>
+
+"""
+
+from math import sqrt as math_sqrt, log2 as math_log2
+from numbers import Real
+
+from numpy import asarray, errstate, where, nan, sqrt, log2, maximum
+from numpy import minimum
+from numpy import any as np_any
+
+from .inf_theory import _xlogx
+
+
+def _as_columns(a, b, c, d):
+    r"""Validate the elements of some :math:`2 \times 2`-agreement matrices
+
+    Four scalars are returned as they are, so that the measures on a
+    single matrix never involve NumPy, while four sequences are returned
+    as floating point arrays.
+
+    :param a: The elements in position :math:`(0, 0)`
+    :type a: :class:`int` or :class:`numpy.ndarray`
+    :param b: The elements in position :math:`(0, 1)`
+    :type b: :class:`int` or :class:`numpy.ndarray`
+    :param c: The elements in position :math:`(1, 0)`
+    :type c: :class:`int` or :class:`numpy.ndarray`
+    :param d: The elements in position :math:`(1, 1)`
+    :type d: :class:`int` or :class:`numpy.ndarray`
+    :returns: Whether the elements are scalars and the four elements
+    :rtype: :class:`tuple`
+    :raises: :class:`ValueError`
+    """
+    if all(isinstance(value, Real) for value in (a, b, c, d)):
+        if a < 0 or b < 0 or c < 0 or d < 0:
+            raise ValueError("The matrix contains some negative values")
+
+        if a+b+c+d == 0:
+            raise ValueError("The matrix is null")
+
+        return True, a, b, c, d
+
+    columns = [asarray(column, dtype=float) for column in (a, b, c, d)]
+
+    if any(column.shape != columns[0].shape for column in columns):
+        raise ValueError("The columns must have the same shape")
+
+    if any(np_any(column < 0) for column in columns):
+        raise ValueError("The matrices contain some negative values")
+
+    return (False, ) + tuple(columns)
+
+
+def _divide(numerator, denominator, scalar, message):
+    r"""Divide the numerators of a measure by its denominators
+
+    :param numerator: The numerators of the measure
+    :type numerator: :class:`float` or :class:`numpy.ndarray`
+    :param denominator: The denominators of the measure
+    :type denominator: :class:`float` or :class:`numpy.ndarray`
+    :param scalar: Whether the measure is evaluated on a single matrix
+    :type scalar: :class:`bool`
+    :param message: The message of the exception raised whenever a single
+                    matrix is out of the measure domain
+    :type message: :class:`str`
+    :returns: The ratios of the numerators and the denominators, where
+              the null denominators give :data:`numpy.nan`
+    :rtype: :class:`float` or :class:`numpy.ndarray`
+    :raises: :class:`ValueError`
+    """
+    if scalar:
+        if denominator == 0:
+            raise ValueError(message)
+
+        return numerator/denominator
+
+    with errstate(divide='ignore', invalid='ignore'):
+        return where(denominator != 0, numerator/denominator, nan)
+
+
+def dichotomous_bennett_s(a, b, c, d):
+    r"""Evaluate Bennett, Alpert and Goldstein's :math:`S` of dichotomous
+    ratings
+
+    Compute the :ref:`BennettS_theory` of the agreement matrices
+    :math:`\begin{bmatrix} a & b\\ c & d \end{bmatrix}` in the closed
+    form :math:`(a+d-b-c)/(a+b+c+d)`.
+
+    Whenever a, b, c, and d are scalars, the measure is evaluated on a
+    single matrix without NumPy and out-of-domain matrices raise a
+    :class:`ValueError`. Otherwise, they are the :math:`T`-arrays of the
+    elements of :math:`T` matrices, the :math:`T`-array of the results is
+    returned, and the matrices out of the measure domain, null matrices
+    included, are evaluated as :data:`numpy.nan`.
+
+    :param a: The elements in position :math:`(0, 0)`
+    :type a: :class:`int` or :class:`numpy.ndarray`
+    :param b: The elements in position :math:`(0, 1)`
+    :type b: :class:`int` or :class:`numpy.ndarray`
+    :param c: The elements in position :math:`(1, 0)`
+    :type c: :class:`int` or :class:`numpy.ndarray`
+    :param d: The elements in position :math:`(1, 1)`
+    :type d: :class:`int` or :class:`numpy.ndarray`
+    :returns: The Bennett, Alpert and Goldstein's :math:`S` of the matrices
+    :rtype: :class:`float` or :class:`numpy.ndarray`
+    :raises: :class:`ValueError`
+    """
+    scalar, a, b, c, d = _as_columns(a, b, c, d)
+
+    return _divide(a+d-b-c, a+b+c+d, scalar, "The matrix is null")
+
+
+def dichotomous_bangdiwala_b(a, b, c, d):
+    r"""Evaluate Bangdiwala's :math:`B` of dichotomous ratings
+
+    Compute the :ref:`BangdiwalaB_theory` of the agreement matrices
+    :math:`\begin{bmatrix} a & b\\ c & d \end{bmatrix}` in the closed
+    form :math:`(a^2+d^2)/((a+b)(a+c)+(c+d)(b+d))` (see
+    :func:`dichotomous_bennett_s` for the meaning of the parameters).
+
+    :param a: The elements in position :math:`(0, 0)`
+    :type a: :class:`int` or :class:`numpy.ndarray`
+    :param b: The elements in position :math:`(0, 1)`
+    :type b: :class:`int` or :class:`numpy.ndarray`
+    :param c: The elements in position :math:`(1, 0)`
+    :type c: :class:`int` or :class:`numpy.ndarray`
+    :param d: The elements in position :math:`(1, 1)`
+    :type d: :class:`int` or :class:`numpy.ndarray`
+    :returns: The Bangdiwala's :math:`B` of the matrices
+    :rtype: :class:`float` or :class:`numpy.ndarray`
+    :raises: :class:`ValueError`
+    """
+    scalar, a, b, c, d = _as_columns(a, b, c, d)
+
+    return _divide(a*a+d*d, (a+b)*(a+c)+(c+d)*(b+d), scalar,
+                   "This matrix is out of the domain of Bangdiwala's B")
+
+
+def dichotomous_cohen_kappa(a, b, c, d):
+    r"""Evaluate Cohen's :math:`\kappa` of dichotomous ratings
+
+    Compute :ref:`CohenKappa_theory` of the agreement matrices
+    :math:`\begin{bmatrix} a & b\\ c & d \end{bmatrix}` in the closed
+    form :math:`2(ad-bc)/((a+b)(b+d)+(a+c)(c+d))` (see
+    :func:`dichotomous_bennett_s` for the meaning of the parameters).
+
+    :param a: The elements in position :math:`(0, 0)`
+    :type a: :class:`int` or :class:`numpy.ndarray`
+    :param b: The elements in position :math:`(0, 1)`
+    :type b: :class:`int` or :class:`numpy.ndarray`
+    :param c: The elements in position :math:`(1, 0)`
+    :type c: :class:`int` or :class:`numpy.ndarray`
+    :param d: The elements in position :math:`(1, 1)`
+    :type d: :class:`int` or :class:`numpy.ndarray`
+    :returns: The Cohen's :math:`\kappa` of the matrices
+    :rtype: :class:`float` or :class:`numpy.ndarray`
+    :raises: :class:`ValueError`
+    """
+    scalar, a, b, c, d = _as_columns(a, b, c, d)
+
+    return _divide(2*(a*d-b*c), (a+b)*(b+d)+(a+c)*(c+d), scalar,
+                   "The agreement probability by chance of the matrix is 1")
+
+
+def dichotomous_scott_pi(a, b, c, d):
+    r"""Evaluate Scott's :math:`\pi` of dichotomous ratings
+
+    Compute the :ref:`ScottPi_theory` of the agreement matrices
+    :math:`\begin{bmatrix} a & b\\ c & d \end{bmatrix}` in the closed
+    form :math:`(4(ad-bc)-(b-c)^2)/((2a+b+c)(2d+b+c))` (see
+    :func:`dichotomous_bennett_s` for the meaning of the parameters).
+
+    :param a: The elements in position :math:`(0, 0)`
+    :type a: :class:`int` or :class:`numpy.ndarray`
+    :param b: The elements in position :math:`(0, 1)`
+    :type b: :class:`int` or :class:`numpy.ndarray`
+    :param c: The elements in position :math:`(1, 0)`
+    :type c: :class:`int` or :class:`numpy.ndarray`
+    :param d: The elements in position :math:`(1, 1)`
+    :type d: :class:`int` or :class:`numpy.ndarray`
+    :returns: The Scott's :math:`\pi` of the matrices
+    :rtype: :class:`float` or :class:`numpy.ndarray`
+    :raises: :class:`ValueError`
+    """
+    scalar, a, b, c, d = _as_columns(a, b, c, d)
+
+    return _divide(4*(a*d-b*c)-(b-c)*(b-c), (2*a+b+c)*(2*d+b+c), scalar,
+                   "The sum of the squared joint proportions of the " +
+                   "matrix is 1")
+
+
+def dichotomous_yule_y(a, b, c, d):
+    r"""Evaluate Yule's :math:`Y` of dichotomous ratings
+
+    Compute the :ref:`YuleY_theory` of the agreement matrices
+    :math:`\begin{bmatrix} a & b\\ c & d \end{bmatrix}` in the closed
+    form :math:`(\sqrt{ad}-\sqrt{bc})/(\sqrt{ad}+\sqrt{bc})` (see
+    :func:`dichotomous_bennett_s` for the meaning of the parameters). The
+    matrices whose :math:`b` or :math:`c` is 0 are out of the measure
+    domain.
+
+    :param a: The elements in position :math:`(0, 0)`
+    :type a: :class:`int` or :class:`numpy.ndarray`
+    :param b: The elements in position :math:`(0, 1)`
+    :type b: :class:`int` or :class:`numpy.ndarray`
+    :param c: The elements in position :math:`(1, 0)`
+    :type c: :class:`int` or :class:`numpy.ndarray`
+    :param d: The elements in position :math:`(1, 1)`
+    :type d: :class:`int` or :class:`numpy.ndarray`
+    :returns: The Yule's :math:`Y` of the matrices
+    :rtype: :class:`float` or :class:`numpy.ndarray`
+    :raises: :class:`ValueError`
+    """
+    scalar, a, b, c, d = _as_columns(a, b, c, d)
+
+    square_root = math_sqrt if scalar else sqrt
+    sqrt_ad = square_root(a*d)
+    sqrt_bc = square_root(b*c)
+
+    # the matrices having b*c = 0 get a null denominator
+    return _divide(sqrt_ad-sqrt_bc, (sqrt_ad+sqrt_bc)*(b*c != 0), scalar,
+                   "Some elements outside the main diagonal are 0")
+
+
+def _scalar_ia_c(a, b, c, d):
+    r"""Evaluate :math:`\text{IA}_{C}` of a single dichotomous matrix
+
+    :param a: The element in position :math:`(0, 0)`
+    :type a: :class:`int`
+    :param b: The element in position :math:`(0, 1)`
+    :type b: :class:`int`
+    :param c: The element in position :math:`(1, 0)`
+    :type c: :class:`int`
+    :param d: The element in position :math:`(1, 1)`
+    :type d: :class:`int`
+    :returns: The extension-by-continuity of Information Agreement of the
+              matrix
+    :rtype: :class:`float`
+    """
+    rows = (a+b, c+d)
+    cols = (a+c, b+d)
+
+    # an entropy is 0 if and only if a single sum is not null
+    if 0 in cols:
+        return (2-rows.count(0))/2
+
+    if 0 in rows:
+        return (2-cols.count(0))/2
+
+    total = a+b+c+d
+    log_total = math_log2(total)
+    h_x = log_total-(_xlogx(cols[0])+_xlogx(cols[1]))/total
+    h_y = log_total-(_xlogx(rows[0])+_xlogx(rows[1]))/total
+    h_xy = log_total-(_xlogx(a)+_xlogx(b)+_xlogx(c)+_xlogx(d))/total
+
+    return 1+(max(h_x, h_y)-h_xy)/min(h_x, h_y)
+
+
+def _xlogx_array(values):
+    r"""Evaluate :math:`x*\log_2{x}` extended by continuity in 0 on an array
+
+    :param values: An array of non-negative numbers
+    :type values: :class:`numpy.ndarray`
+    :returns: The array of the values of :math:`x*\log_2{x}` on values
+    :rtype: :class:`numpy.ndarray`
+    """
+    with errstate(divide='ignore', invalid='ignore'):
+        return where(values > 0, values*log2(values), 0.0)
+
+
+def dichotomous_ia_c(a, b, c, d):
+    r"""Evaluate *extension-by-continuity of Information Agreement* of
+    dichotomous ratings
+
+    Compute the :ref:`IAc_theory` (:math:`\text{IA}_{C}`) of the
+    agreement matrices :math:`\begin{bmatrix} a & b\\ c & d \end{bmatrix}`
+    from the closed-form entropies of their marginals and elements (see
+    :func:`dichotomous_bennett_s` for the meaning of the parameters).
+
+    :param a: The elements in position :math:`(0, 0)`
+    :type a: :class:`int` or :class:`numpy.ndarray`
+    :param b: The elements in position :math:`(0, 1)`
+    :type b: :class:`int` or :class:`numpy.ndarray`
+    :param c: The elements in position :math:`(1, 0)`
+    :type c: :class:`int` or :class:`numpy.ndarray`
+    :param d: The elements in position :math:`(1, 1)`
+    :type d: :class:`int` or :class:`numpy.ndarray`
+    :returns: The extension-by-continuity of Information Agreement of the
+              matrices
+    :rtype: :class:`float` or :class:`numpy.ndarray`
+    :raises: :class:`ValueError`
+    """
+    scalar, a, b, c, d = _as_columns(a, b, c, d)
+
+    if scalar:
+        return _scalar_ia_c(a, b, c, d)
+
+    row_0, row_1, col_0, col_1 = a+b, c+d, a+c, b+d
+    total = row_0+row_1
+
+    with errstate(divide='ignore', invalid='ignore'):
+        log_total = log2(total)
+        h_x = log_total-(_xlogx_array(col_0)+_xlogx_array(col_1))/total
+        h_y = log_total-(_xlogx_array(row_0)+_xlogx_array(row_1))/total
+        h_xy = log_total-(_xlogx_array(a)+_xlogx_array(b) +
+                          _xlogx_array(c)+_xlogx_array(d))/total
+
+        results = 1+(maximum(h_x, h_y)-h_xy)/minimum(h_x, h_y)
+
+    null_rows = (row_0 == 0)*1+(row_1 == 0)
+    null_cols = (col_0 == 0)*1+(col_1 == 0)
+
+    results = where(null_rows > 0, (2-null_cols)/2, results)
+    results = where(null_cols > 0, (2-null_rows)/2, results)
+
+    return where(total == 0, nan, results)
+
+
+def dichotomous_report(a, b, c, d):
+    r"""Evaluate all the agreement measures of dichotomous ratings
+
+    The result is a dictionary mapping the names of the measures, as
+    in :func:`pyagree.agreement_report`, into their values on the
+    agreement matrices :math:`\begin{bmatrix} a & b\\ c & d \end{bmatrix}`
+    (see :func:`dichotomous_bennett_s` for the meaning of the
+    parameters). The matrices out of the domain of a measure are
+    evaluated as :data:`numpy.nan`, even when a single matrix is given.
+
+    :param a: The elements in position :math:`(0, 0)`
+    :type a: :class:`int` or :class:`numpy.ndarray`
+    :param b: The elements in position :math:`(0, 1)`
+    :type b: :class:`int` or :class:`numpy.ndarray`
+    :param c: The elements in position :math:`(1, 0)`
+    :type c: :class:`int` or :class:`numpy.ndarray`
+    :param d: The elements in position :math:`(1, 1)`
+    :type d: :class:`int` or :class:`numpy.ndarray`
+    :returns: A dictionary mapping the names of the measures into their
+              values on the matrices
+    :rtype: :class:`dict`
+    :raises: :class:`ValueError`
+    """
+    scalar, a, b, c, d = _as_columns(a, b, c, d)
+
+    measures = {'bennett_s': dichotomous_bennett_s,
+                'bangdiwala_b': dichotomous_bangdiwala_b,
+                'cohen_kappa': dichotomous_cohen_kappa,
+                'scott_pi': dichotomous_scott_pi,
+                'ia_c': dichotomous_ia_c,
+                'yule_y': dichotomous_yule_y}
+
+    report = {}
+    for name, measure in measures.items():
+        try:
+            report[name] = measure(a, b, c, d)
+        except ValueError:
+            report[name] = nan
+
+    return report
@@ -0,0 +1,117 @@
+"""This file contains the functions which evaluate the agreement of two
+   raters within the groups of a dataset.
+
+.. moduleauthor:: Alberto Casagrande <acasagrande@units.it>
+
+"""
+
+from collections import namedtuple
+
+from numpy import asarray, unique, bincount, isnan
+
+from .ratings import _encode_ratings
+from .standard import cohen_kappa
+
+GroupedAgreement = namedtuple('GroupedAgreement',
+                              ['groups', 'values', 'errors'])
+GroupedAgreement.__doc__ = r"""The values of a measure on some groups
+
+:param groups: The sorted group identifiers
+:param values: The values of the measure on the groups
+:param errors: Whether the agreement matrices of the groups are out of the
+               measure domain
+"""
+
+
+def grouped_agreement_matrices(groups, ratings_a, ratings_b, labels=None,
+                               weights=None):
+    r"""Build the agreement matrices of two raters within some groups
+
+    Build the :math:`G \times n \times n`-stack of the agreement matrices of
+    the ratings ratings_a and ratings_b restricted to the items of each of
+    the :math:`G` groups in groups, i.e., groups[i] is the group of the
+    :math:`i`-th item (see :func:`pyagree.agreement_matrix_from_ratings`).
+    The groups are sorted and the whole stack is built by a single
+    :func:`numpy.bincount` over the combined group and label indices.
+
+    The meaning of labels and weights is the same as in
+    :func:`pyagree.agreement_matrix_from_ratings`, but all the groups
+    share the same labels.
+
+    :param groups: The group identifiers of the items
+    :type groups: :class:`numpy.ndarray`
+    :param ratings_a: The ratings of the first rater
+    :type ratings_a: :class:`numpy.ndarray`
+    :param ratings_b: The ratings of the second rater
+    :type ratings_b: :class:`numpy.ndarray`
+    :param labels: The sequence of labels or a label vocabulary
+    :type labels: Iterable object or :class:`pyagree.LabelVocabulary`
+    :param weights: The weights of the items
+    :type weights: :class:`numpy.ndarray`
+    :returns: The sorted group identifiers and the stack of the agreement
+              matrices of the groups
+    :rtype: :class:`tuple`
+    :raises: :class:`ValueError`
+    """
+    groups = asarray(groups)
+    ratings_a = asarray(ratings_a)
+    ratings_b = asarray(ratings_b)
+
+    if groups.ndim != 1 or groups.shape != ratings_a.shape or \
+            ratings_a.shape != ratings_b.shape:
+        raise ValueError("The groups and the ratings must be three " +
+                         "sequences having the same length")
+
+    if weights is not None:
+        weights = asarray(weights)
+        if weights.shape != ratings_a.shape:
+            raise ValueError("The weights and the ratings must have the " +
+                             "same length")
+
+    group_ids, group_codes = unique(groups, return_inverse=True)
+    (codes_a, codes_b), k = _encode_ratings([ratings_a, ratings_b], labels)
+
+    num_of_groups = len(group_ids)
+    matrices = bincount((group_codes*k+codes_a)*k+codes_b, weights=weights,
+                        minlength=num_of_groups*k*k)
+
+    return group_ids, matrices.reshape(num_of_groups, k, k)
+
+
+def grouped_agreement(groups, ratings_a, ratings_b, measure=cohen_kappa,
+                      labels=None, weights=None):
+    r"""Evaluate an agreement measure within some groups
+
+    Evaluate measure on the agreement matrices of the ratings ratings_a
+    and ratings_b within each of the groups in groups (see
+    :func:`grouped_agreement_matrices`). All the matrices are evaluated
+    at once as a stack, so measure must accept stacks of agreement
+    matrices, e.g., :func:`pyagree.cohen_kappa`, :func:`pyagree.scott_pi`,
+    or :func:`pyagree.ia_c`. The groups whose agreement matrix is out of
+    the measure domain are evaluated as :data:`numpy.nan` and flagged in
+    the errors of the result.
+
+    :param groups: The group identifiers of the items
+    :type groups: :class:`numpy.ndarray`
+    :param ratings_a: The ratings of the first rater
+    :type ratings_a: :class:`numpy.ndarray`
+    :param ratings_b: The ratings of the second rater
+    :type ratings_b: :class:`numpy.ndarray`
+    :param measure: A measure accepting stacks of agreement matrices
+    :type measure: Callable object
+    :param labels: The sequence of labels or a label vocabulary
+    :type labels: Iterable object or :class:`pyagree.LabelVocabulary`
+    :param weights: The weights of the items
+    :type weights: :class:`numpy.ndarray`
+    :returns: The sorted group identifiers, the values of measure on the
+              groups, and the error flags of the groups
+    :rtype: :class:`GroupedAgreement`
+    :raises: :class:`ValueError`
+    """
+    group_ids, matrices = grouped_agreement_matrices(groups, ratings_a,
+                                                     ratings_b, labels,
+                                                     weights)
+
+    values = asarray(measure(matrices), dtype=float)
+
+    return GroupedAgreement(group_ids, values, isnan(values))
@@ -5,11 +5,16 @@
 
 """
 
-from numpy import matrix
+from math import log2
 
-from .common import test_agreement_matrix, count_nonnull_rows
-from .common import count_nonnull_cols
-from .inf_theory import p_x, p_y, p_xy, entropy
+from numpy import errstate, where, minimum, maximum, nan, zeros, asarray
+from numpy import log2 as np_log2
+
+from .common import _small_matrix_rows, _small_statistics
+from .table import as_agreement_table
+from .ratings import agreement_matrix_from_ratings
+from .inf_theory import _xlogx
+from .profiling import profiled
 
 
 def refine(values):
@@ -29,40 +34,371 @@ def refine(values):
             yield value
 
 
-def ia_c(agreement_matrix):
+def _ia_c_stack(table):
+    r"""Evaluate *extension-by-continuity of Information Agreement* of a stack
+
+    :param table: An agreement table wrapping a stack of agreement matrices
+    :type table: :class:`pyagree.AgreementTable`
+    :returns: The array of the measure values
+    :rtype: :class:`numpy.ndarray`
+    """
+    k = table.size
+
+    h_xf = table.col_entropy
+    h_yf = table.row_entropy
+    h_xyf = table.cell_entropy
+
+    with errstate(divide='ignore', invalid='ignore'):
+        results = 1+(maximum(h_xf, h_yf)-h_xyf)/minimum(h_xf, h_yf)
+
+    results = where(h_yf == 0, (k-(table.col_sums == 0).sum(axis=-1))/k,
+                    results)
+    results = where(h_xf == 0, (k-(table.row_sums == 0).sum(axis=-1))/k,
+                    results)
+
+    return where(table.total == 0, nan, results)
+
+
+def _small_ia_c(rows):
+    r"""Evaluate *extension-by-continuity of Information Agreement* of a
+    small agreement matrix in plain Python
+
+    :param rows: The list of the rows of a validated agreement matrix
+    :type rows: :class:`list`
+    :returns: The measure value
+    :rtype: :class:`float`
+    :raises: :class:`ValueError`
+    """
+    k = len(rows)
+    if k < 2:
+        raise ValueError("The matrix has less than 2 rows and columns")
+
+    total, _, row_sums, col_sums = _small_statistics(rows)
+
+    def entropy(counts):
+        return -sum(_xlogx(count/total) for count in counts)
+
+    h_xf = entropy(col_sums)
+    h_yf = entropy(row_sums)
+
+    if h_xf == 0:
+        return (k-row_sums.count(0))/k
+
+    if h_yf == 0:
+        return (k-col_sums.count(0))/k
+
+    h_xyf = entropy(value for row in rows for value in row)
+    if h_xf < h_yf:
+        return 1+(h_yf-h_xyf)/h_xf
+
+    return 1+(h_xf-h_xyf)/h_yf
+
+
+@profiled()
+def ia_c(agreement_matrix, validate=True):
     r"""Evaluate *extension-by-continuity of Information Agreement*
 
     Compute the :ref:`IAc_theory` (:math:`\text{IA}_{C}`) of
     agreement_matrix.
 
-    :param agreement_matrix: An agreement matrix
-    :type agreement_matrix: :class:`numpy.ndarray`
+    Whenever agreement_matrix is a :math:`T \times n \times n`-array,
+    i.e., a stack of :math:`T` agreement matrices, the measure is
+    evaluated on all of them at once by using array-native entropies and
+    the :math:`T`-array of the results is returned. Null matrices are
+    evaluated as :data:`numpy.nan`.
+
+    :param agreement_matrix: An agreement matrix or a stack of them
+    :type agreement_matrix: :class:`numpy.ndarray` or
+                            :class:`pyagree.AgreementTable`
+    :param validate: Whether agreement_matrix must be validated
+    :type validate: :class:`bool`
     :returns: The extension-by-continuity of Information Agreement of
               agreement_matrix
-    :rtype: :class:`float`
+    :rtype: :class:`float` or :class:`numpy.ndarray`
     :raises: :class:`ValueError`
     """
-    if isinstance(agreement_matrix, list):
-        agreement_matrix = matrix(agreement_matrix)
+    rows = _small_matrix_rows(agreement_matrix, validate)
+    if rows is not None:
+        return _small_ia_c(rows)
 
-    test_agreement_matrix(agreement_matrix)
+    table = as_agreement_table(agreement_matrix, validate=validate)
 
-    if agreement_matrix.shape[0] < 2:
+    if table.size < 2:
         raise ValueError("The matrix has less than 2 rows and columns")
 
-    h_xf = entropy(refine(p_x(agreement_matrix)))
-    h_yf = entropy(refine(p_y(agreement_matrix)))
+    if table.is_stack:
+        return _ia_c_stack(table)
+
+    k = table.size
+
+    h_xf = table.col_entropy
+    h_yf = table.row_entropy
 
     if h_xf == 0:
-        return (agreement_matrix.shape[0] -
-                count_nonnull_rows(agreement_matrix))/agreement_matrix.shape[0]
+        return (k-(table.row_sums == 0).sum())/k
 
     if h_yf == 0:
-        return (agreement_matrix.shape[0] -
-                count_nonnull_cols(agreement_matrix))/agreement_matrix.shape[0]
+        return (k-(table.col_sums == 0).sum())/k
 
-    h_xyf = entropy(refine(p_xy(agreement_matrix)))
+    h_xyf = table.cell_entropy
     if h_xf < h_yf:
         return 1+(h_yf-h_xyf)/h_xf
 
     return 1+(h_xf-h_xyf)/h_yf
+
+
+def ia_c_from_ratings(ratings_a, ratings_b, labels=None, weights=None):
+    r"""Evaluate *extension-by-continuity of Information Agreement* from
+    the ratings of two raters
+
+    Compute the :ref:`IAc_theory` (:math:`\text{IA}_{C}`) of the agreement
+    matrix of the ratings ratings_a and ratings_b (see
+    :func:`pyagree.agreement_matrix_from_ratings`).
+
+    Since :math:`\text{IA}_{C}` depends on the number of categories,
+    labels should list all the categories whenever some of them may not be
+    used by the raters.
+
+    :param ratings_a: The ratings of the first rater
+    :type ratings_a: :class:`numpy.ndarray`
+    :param ratings_b: The ratings of the second rater
+    :type ratings_b: :class:`numpy.ndarray`
+    :param labels: The sequence of labels or a label vocabulary
+    :type labels: Iterable object or :class:`pyagree.LabelVocabulary`
+    :param weights: The weights of the items
+    :type weights: :class:`numpy.ndarray`
+    :returns: The extension-by-continuity of Information Agreement of the
+              ratings
+    :rtype: :class:`float`
+    :raises: :class:`ValueError`
+    """
+
+    return ia_c(agreement_matrix_from_ratings(ratings_a, ratings_b, labels,
+                                              weights))
+
+
+def _sum_xlogx(counts):
+    r"""Evaluate the sum of :math:`x*\log_2{x}` over some counts
+
+    :param counts: An array of non-negative counts
+    :type counts: :class:`numpy.ndarray`
+    :returns: The sum of :math:`x*\log_2{x}` over the non-null counts
+    :rtype: :class:`float`
+    """
+    counts = asarray(counts, dtype=float)
+    counts = counts[counts > 0]
+
+    return float((counts*np_log2(counts)).sum())
+
+
+class IAcState:
+    r"""An incremental state for
+    *extension-by-continuity of Information Agreement*
+
+    An :math:`\text{IA}_{C}` state stores an agreement matrix :math:`A`
+    of size :math:`n` together with the statistics that
+    :math:`\text{IA}_{C}` requires and it supports the increments and
+    decrements of the elements of :math:`A`. Since, for a vector of
+    counts :math:`v` summing up to :math:`N`,
+
+    .. math::
+
+       H(v/N) = \log_2{N}-\frac{1}{N}\sum_{i} v_i*\log_2{v_i},
+
+    the row, column, and cell entropies of :math:`A` only depend on
+    :math:`N` and on the sums of :math:`v*\log_2{v}` over the row sums,
+    the column sums, and the elements of :math:`A`, respectively. The
+    state maintains these sums and the numbers of null rows and columns,
+    which identify the matrices having a null row or column entropy.
+    Hence, both :meth:`update` and :meth:`value` take constant time. The
+    elements of :math:`A` are stored in a dictionary, so the memory
+    footprint is linear in :math:`n` and in the number of non-null
+    elements.
+
+    The sums are updated by floating point additions and subtractions,
+    so :meth:`value` may drift from :func:`ia_c` by a rounding error
+    which grows with the number of updates.
+
+    :param size: The number of rows and columns :math:`n` of the matrix
+    :type size: :class:`int`
+    :raises: :class:`ValueError`
+    """
+
+    __slots__ = ('_counts', '_row_sums', '_col_sums', '_total',
+                 '_row_terms', '_col_terms', '_cell_terms', '_null_rows',
+                 '_null_cols')
+
+    def __init__(self, size):
+        if size < 2:
+            raise ValueError("The matrix has less than 2 rows and columns")
+
+        self._counts = {}
+        self._row_sums = [0]*size
+        self._col_sums = [0]*size
+        self._total = 0
+        self._row_terms = 0.0
+        self._col_terms = 0.0
+        self._cell_terms = 0.0
+        self._null_rows = size
+        self._null_cols = size
+
+    @classmethod
+    def from_matrix(cls, agreement_matrix):
+        r"""Build the state of an agreement matrix
+
+        The statistics are evaluated at once on the table of
+        agreement_matrix, in time linear in its size and in the number of
+        its non-null elements.
+
+        :param agreement_matrix: An agreement matrix of integer counts
+        :type agreement_matrix: :class:`numpy.ndarray`, :class:`dict`,
+                                or :class:`pyagree.AgreementTable`
+        :returns: The state of agreement_matrix
+        :rtype: :class:`IAcState`
+        :raises: :class:`ValueError`
+        """
+        table = as_agreement_table(agreement_matrix)
+        if table.is_stack:
+            raise ValueError("A single agreement matrix is required")
+
+        state = cls(table.size)
+
+        rows, cols, values = table.cells
+        state._counts = dict(zip(zip(rows.tolist(), cols.tolist()),
+                                 values.tolist()))
+        state._row_sums = table.row_sums.tolist()
+        state._col_sums = table.col_sums.tolist()
+        state._total = int(table.total)
+        state._row_terms = _sum_xlogx(table.row_sums)
+        state._col_terms = _sum_xlogx(table.col_sums)
+        state._cell_terms = _sum_xlogx(values)
+        state._null_rows = state._row_sums.count(0)
+        state._null_cols = state._col_sums.count(0)
+
+        return state
+
+    @property
+    def size(self):
+        r"""The number of rows and columns of the agreement matrix
+
+        :rtype: :class:`int`
+        """
+        return len(self._row_sums)
+
+    @property
+    def total(self):
+        r"""The sum of all the elements of the agreement matrix
+
+        :rtype: :class:`int`
+        """
+        return self._total
+
+    @property
+    def agreement_matrix(self):
+        r"""The agreement matrix of the state
+
+        :rtype: :class:`numpy.ndarray`
+        """
+        matrix = zeros((self.size, self.size), dtype=int)
+        for (row, col), count in self._counts.items():
+            matrix[row, col] = count
+
+        return matrix
+
+    def update(self, row, col, delta=1):
+        r"""Add delta to an element of the agreement matrix
+
+        :param row: The row of the element
+        :type row: :class:`int`
+        :param col: The column of the element
+        :type col: :class:`int`
+        :param delta: The integer increment, possibly negative
+        :type delta: :class:`int`
+        :returns: The state itself
+        :rtype: :class:`IAcState`
+        :raises: :class:`ValueError`
+        """
+        if not (0 <= row < self.size and 0 <= col < self.size):
+            raise ValueError("The element is out of the matrix")
+
+        count = self._counts.get((row, col), 0)
+        if count+delta < 0:
+            raise ValueError("The matrix cannot contain negative values")
+
+        if count+delta == 0:
+            self._counts.pop((row, col), None)
+        else:
+            self._counts[row, col] = count+delta
+        self._cell_terms += _xlogx(count+delta)-_xlogx(count)
+
+        row_sum = self._row_sums[row]
+        self._row_sums[row] = row_sum+delta
+        self._row_terms += _xlogx(row_sum+delta)-_xlogx(row_sum)
+        self._null_rows += (row_sum+delta == 0)-(row_sum == 0)
+
+        col_sum = self._col_sums[col]
+        self._col_sums[col] = col_sum+delta
+        self._col_terms += _xlogx(col_sum+delta)-_xlogx(col_sum)
+        self._null_cols += (col_sum+delta == 0)-(col_sum == 0)
+
+        self._total += delta
+
+        return self
+
+    def value(self):
+        r"""Evaluate *extension-by-continuity of Information Agreement*
+
+        :returns: The extension-by-continuity of Information Agreement of
+                  the agreement matrix
+        :rtype: :class:`float`
+        :raises: :class:`ValueError`
+        """
+        if self._total == 0:
+            raise ValueError("The matrix is null")
+
+        k = self.size
+
+        # an entropy is 0 if and only if a single sum is not null
+        if self._null_cols == k-1:
+            return (k-self._null_rows)/k
+
+        if self._null_rows == k-1:
+            return (k-self._null_cols)/k
+
+        log_total = log2(self._total)
+        h_xf = log_total-self._col_terms/self._total
+        h_yf = log_total-self._row_terms/self._total
+        h_xyf = log_total-self._cell_terms/self._total
+
+        if h_xf < h_yf:
+            return 1+(h_yf-h_xyf)/h_xf
+
+        return 1+(h_xf-h_xyf)/h_yf
+
+    def leave_one_out(self):
+        r"""Evaluate the measure on the leave-one-out agreement matrices
+
+        Removing one item from the data summarized by the agreement matrix
+        decreases by one one of its non-null elements. Every such matrix
+        is evaluated by a decrement, an evaluation, and an increment of
+        the state, i.e., in constant time.
+
+        :returns: The rows and the columns of the non-null elements and
+                  the values of the measure on the matrices obtained by
+                  decreasing them by one
+        :rtype: :class:`tuple`
+        """
+        cells = sorted(self._counts)
+        values = []
+        for row, col in cells:
+            self.update(row, col, -1)
+            try:
+                values.append(self.value())
+            except ValueError:
+                values.append(nan)
+            self.update(row, col, 1)
+
+        rows = asarray([row for row, _ in cells], dtype=int)
+        cols = asarray([col for _, col in cells], dtype=int)
+
+        return rows, cols, asarray(values, dtype=float)
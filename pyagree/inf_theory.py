@@ -5,9 +5,12 @@
 
 """
 
-from math import log
+from math import log, log2 as math_log2
+
+from numpy import asarray, log2, zeros, errstate, minimum, maximum, sqrt
 
 from .common import col_sums_iter, row_sums_iter
+from .profiling import profiled
 
 
 def p_x(matrix):
@@ -82,6 +85,7 @@ def p_xy(matrix):
             yield matrix[row_idx, col_idx]/sum_m
 
 
+@profiled()
 def entropy(values):
     r"""Evaluate the entropy of an iterable
 
@@ -101,3 +105,254 @@ def entropy(values):
     """
 
     return -sum(value*log(value, 2) for value in values)
+
+
+def _xlogx(value):
+    r"""Evaluate :math:`x*\log_2{x}` extended by continuity in 0
+
+    :param value: A non-negative number
+    :type value: :class:`int`
+    :returns: :math:`x*\log_2{x}` if value is positive and 0 otherwise
+    :rtype: :class:`float`
+    """
+    return value*math_log2(value) if value > 0 else 0.0
+
+
+@profiled()
+def entropy_array(probabilities, axis=-1):
+    r"""Evaluate the entropies of an array of probabilities along an axis
+
+    Compute the
+    `entropy <https://en.wikipedia.org/wiki/Entropy_(information_theory)>`_
+    of the probability distributions stored along the axis axis of the
+    array probabilities, i.e.,
+
+    .. math::
+
+       H(\text{P}) \stackrel{\tiny\text{def}}{=}
+       -\sum_{v \in \text{P}, v \neq 0} v*\log_2{v}
+
+    The null probabilities are masked out before the logarithms are
+    evaluated and, thus, they do not contribute to the entropies.
+
+    :param probabilities: An array of probabilities
+    :type probabilities:  :class:`numpy.ndarray`
+    :param axis: The axis, or the tuple of axes, along which the
+                 distributions are stored
+    :type axis: :class:`int` or :class:`tuple`
+    :returns: The array of the entropies of the distributions in
+              probabilities
+    :rtype: :class:`numpy.ndarray`
+    """
+
+    probabilities = asarray(probabilities, dtype=float)
+
+    terms = zeros(probabilities.shape)
+    non_null = probabilities > 0
+    values = probabilities[non_null]
+    terms[non_null] = values*log2(values)
+
+    return -terms.sum(axis=axis)
+
+
+def _distributions(matrices):
+    r"""Normalize some matrices by their totals
+
+    :param matrices: A :math:`\ldots \times n \times m`-array
+    :type matrices: :class:`numpy.ndarray`
+    :returns: The array of the normalized matrices
+    :rtype: :class:`numpy.ndarray`
+    :raises: :class:`ValueError`
+    """
+    matrices = asarray(matrices, dtype=float)
+    if matrices.ndim < 2:
+        raise ValueError("The array must have at least two dimensions")
+
+    with errstate(divide='ignore', invalid='ignore'):
+        return matrices/matrices.sum(axis=(-2, -1), keepdims=True)
+
+
+@profiled()
+def p_x_array(matrices):
+    r"""Evaluate the probability distributions of the columns of matrices
+
+    Compute the array counterpart of :func:`p_x` on the matrices stored
+    along the last two axes of matrices, i.e., an array of shape
+    :math:`\ldots \times m` for an array of shape
+    :math:`\ldots \times n \times m`. The distributions of null matrices
+    consist of :data:`numpy.nan`.
+
+    :param matrices: A matrix or an array of matrices
+    :type matrices: :class:`numpy.ndarray`
+    :returns: The probability distributions of the columns of matrices
+    :rtype: :class:`numpy.ndarray`
+    :raises: :class:`ValueError`
+    """
+
+    return _distributions(matrices).sum(axis=-2)
+
+
+@profiled()
+def p_y_array(matrices):
+    r"""Evaluate the probability distributions of the rows of matrices
+
+    Compute the array counterpart of :func:`p_y` on the matrices stored
+    along the last two axes of matrices (see :func:`p_x_array`).
+
+    :param matrices: A matrix or an array of matrices
+    :type matrices: :class:`numpy.ndarray`
+    :returns: The probability distributions of the rows of matrices
+    :rtype: :class:`numpy.ndarray`
+    :raises: :class:`ValueError`
+    """
+
+    return _distributions(matrices).sum(axis=-1)
+
+
+@profiled()
+def p_xy_array(matrices):
+    r"""Evaluate the probability distributions of the elements of matrices
+
+    Compute the array counterpart of :func:`p_xy` on the matrices stored
+    along the last two axes of matrices (see :func:`p_x_array`). The
+    distributions keep the shape of the matrices.
+
+    :param matrices: A matrix or an array of matrices
+    :type matrices: :class:`numpy.ndarray`
+    :returns: The probability distributions of the elements of matrices
+    :rtype: :class:`numpy.ndarray`
+    :raises: :class:`ValueError`
+    """
+
+    return _distributions(matrices)
+
+
+def _entropies(matrices):
+    r"""Evaluate the column, row, and joint entropies of some matrices
+
+    :param matrices: A matrix or an array of matrices
+    :type matrices: :class:`numpy.ndarray`
+    :returns: The entropies :math:`H(X)`, :math:`H(Y)`, and
+              :math:`H(X,Y)` of matrices
+    :rtype: :class:`tuple`
+    :raises: :class:`ValueError`
+    """
+    p_xys = _distributions(matrices)
+
+    return (entropy_array(p_xys.sum(axis=-2)),
+            entropy_array(p_xys.sum(axis=-1)),
+            entropy_array(p_xys, axis=(-2, -1)))
+
+
+@profiled()
+def joint_entropy(matrices):
+    r"""Evaluate the joint entropies of some matrices
+
+    Compute the entropy :math:`H(X,Y)` of the distribution of the elements
+    of every matrix stored along the last two axes of matrices, i.e.,
+    the entropy of :func:`p_xy_array`. The matrices can contain either
+    probabilities or counts, e.g., they can be agreement matrices, since
+    they are normalized by their totals. The entropies of null matrices
+    are 0.
+
+    :param matrices: A matrix or an array of matrices
+    :type matrices: :class:`numpy.ndarray`
+    :returns: The joint entropies of matrices
+    :rtype: :class:`float` or :class:`numpy.ndarray`
+    :raises: :class:`ValueError`
+    """
+
+    return entropy_array(_distributions(matrices), axis=(-2, -1))
+
+
+@profiled()
+def conditional_entropy(matrices, given='y'):
+    r"""Evaluate the conditional entropies of some matrices
+
+    Compute either :math:`H(X|Y)=H(X,Y)-H(Y)`, when given is `'y'`, or
+    :math:`H(Y|X)=H(X,Y)-H(X)`, when given is `'x'`, for every matrix
+    stored along the last two axes of matrices, where :math:`X` and
+    :math:`Y` are distributed as the columns and the rows of the
+    matrix, respectively (see :func:`joint_entropy`).
+
+    :param matrices: A matrix or an array of matrices
+    :type matrices: :class:`numpy.ndarray`
+    :param given: The conditioning variable, either `'x'` or `'y'`
+    :type given: :class:`str`
+    :returns: The conditional entropies of matrices
+    :rtype: :class:`float` or :class:`numpy.ndarray`
+    :raises: :class:`ValueError`
+    """
+
+    if given not in ('x', 'y'):
+        raise ValueError("The conditioning variable must be either 'x' " +
+                         "or 'y'")
+
+    h_x, h_y, h_xy = _entropies(matrices)
+
+    return h_xy-(h_y if given == 'y' else h_x)
+
+
+@profiled()
+def mutual_information(matrices):
+    r"""Evaluate the mutual information of some matrices
+
+    Compute :math:`I(X;Y)=H(X)+H(Y)-H(X,Y)` for every matrix stored
+    along the last two axes of matrices, where :math:`X` and :math:`Y`
+    are distributed as the columns and the rows of the matrix,
+    respectively (see :func:`joint_entropy`).
+
+    :param matrices: A matrix or an array of matrices
+    :type matrices: :class:`numpy.ndarray`
+    :returns: The mutual information of matrices
+    :rtype: :class:`float` or :class:`numpy.ndarray`
+    :raises: :class:`ValueError`
+    """
+
+    h_x, h_y, h_xy = _entropies(matrices)
+
+    return h_x+h_y-h_xy
+
+
+@profiled()
+def normalized_mutual_information(matrices, method='arithmetic'):
+    r"""Evaluate the normalized mutual information of some matrices
+
+    Compute the ratio between the mutual information :math:`I(X;Y)` of
+    every matrix stored along the last two axes of matrices (see
+    :func:`mutual_information`) and a normalizer chosen by method:
+    `'arithmetic'` for :math:`(H(X)+H(Y))/2`, `'geometric'` for
+    :math:`\sqrt{H(X)*H(Y)}`, `'min'` for :math:`\min(H(X),H(Y))`,
+    `'max'` for :math:`\max(H(X),H(Y))`, and `'joint'` for
+    :math:`H(X,Y)`. Whenever the normalizer is 0, the normalized mutual
+    information is :data:`numpy.nan`.
+
+    On the matrices having non-null row and column entropies, the `'min'`
+    variant coincides with :func:`pyagree.ia_c`.
+
+    :param matrices: A matrix or an array of matrices
+    :type matrices: :class:`numpy.ndarray`
+    :param method: The normalizer
+    :type method: :class:`str`
+    :returns: The normalized mutual information of matrices
+    :rtype: :class:`float` or :class:`numpy.ndarray`
+    :raises: :class:`ValueError`
+    """
+
+    h_x, h_y, h_xy = _entropies(matrices)
+
+    if method == 'arithmetic':
+        normalizer = (h_x+h_y)/2
+    elif method == 'geometric':
+        normalizer = sqrt(h_x*h_y)
+    elif method == 'min':
+        normalizer = minimum(h_x, h_y)
+    elif method == 'max':
+        normalizer = maximum(h_x, h_y)
+    elif method == 'joint':
+        normalizer = h_xy
+    else:
+        raise ValueError("Unknown normalization method {}".format(method))
+
+    with errstate(divide='ignore', invalid='ignore'):
+        return (h_x+h_y-h_xy)/normalizer
@@ -0,0 +1,227 @@
+"""This file contains the implementation of a sliding-window monitor for the
+   agreement of two raters.
+
+.. moduleauthor:: Alberto Casagrande <acasagrande@units.it>
+
+"""
+
+from collections import deque
+
+from numpy import zeros
+
+from .inf_agreement import IAcState
+
+
+class AgreementMonitor:
+    r"""A sliding-window monitor for the agreement of two raters
+
+    An agreement monitor collects the ratings of two raters one pair at a
+    time and keeps the agreement matrix of the last window pairs: adding
+    a pair to a full window evicts the oldest one. Together with the
+    matrix, the monitor maintains the row and column sums, the diagonal
+    total, the sums :math:`\sum_{i} A_{i\cdot}*A_{\cdot{}i}` and
+    :math:`\sum_{i} (A_{i\cdot}+A_{\cdot{}i})^2`, and an
+    :class:`pyagree.IAcState` of the matrix. Each of these quantities
+    only changes in a constant number of terms when a pair is added or
+    evicted, so both operations take constant time and so does the
+    evaluation of Cohen's :math:`\kappa`, Scott's :math:`\pi`, and
+    :math:`\text{IA}_{C}`.
+
+    The monitored :math:`\text{IA}_{C}` may drift from the value of
+    :func:`pyagree.ia_c` on :attr:`agreement_matrix` by a rounding error
+    which grows with the number of updates (see
+    :class:`pyagree.IAcState`).
+
+    :param labels: The sequence of labels
+    :type labels: Iterable object
+    :param window: The number of rating pairs in the window
+    :type window: :class:`int`
+    :raises: :class:`ValueError`
+    """
+
+    __slots__ = ('_labels', '_index', '_window', '_pairs', '_row_sums',
+                 '_col_sums', '_diagonal', '_margin_products',
+                 '_joint_squares', '_ia_c_state')
+
+    def __init__(self, labels, window):
+        self._labels = list(labels)
+        self._index = {label: i for i, label in enumerate(self._labels)}
+
+        if len(self._index) != len(self._labels):
+            raise ValueError("The labels are not pairwise different")
+
+        if window < 1:
+            raise ValueError("The window must contain at least one pair")
+
+        k = len(self._labels)
+
+        self._window = window
+        self._pairs = deque()
+        self._row_sums = [0]*k
+        self._col_sums = [0]*k
+        self._diagonal = 0
+        self._margin_products = 0
+        self._joint_squares = 0
+        self._ia_c_state = IAcState(k) if k > 1 else None
+
+    @property
+    def labels(self):
+        r"""The labels of the rows and columns of the agreement matrix
+
+        :rtype: :class:`list`
+        """
+        return list(self._labels)
+
+    @property
+    def window(self):
+        r"""The maximum number of rating pairs in the window
+
+        :rtype: :class:`int`
+        """
+        return self._window
+
+    @property
+    def agreement_matrix(self):
+        r"""The agreement matrix of the rating pairs in the window
+
+        :rtype: :class:`numpy.ndarray`
+        """
+        matrix = zeros((len(self._labels), len(self._labels)), dtype=int)
+        for row, col in self._pairs:
+            matrix[row, col] += 1
+
+        return matrix
+
+    def __len__(self):
+        return len(self._pairs)
+
+    def _update(self, row, col, delta):
+        r"""Add delta to an element of the agreement matrix
+
+        :param row: The row of the element
+        :type row: :class:`int`
+        :param col: The column of the element
+        :type col: :class:`int`
+        :param delta: Either 1 or -1
+        :type delta: :class:`int`
+        """
+        if self._ia_c_state is not None:
+            self._ia_c_state.update(row, col, delta)
+
+        if row == col:
+            self._diagonal += delta
+
+        # the margin of the row changes first and that of the column then
+        self._margin_products += delta*self._col_sums[row]
+        self._joint_squares += delta*(2*(self._row_sums[row] +
+                                         self._col_sums[row])+delta)
+        self._row_sums[row] += delta
+
+        self._margin_products += delta*self._row_sums[col]
+        self._joint_squares += delta*(2*(self._row_sums[col] +
+                                         self._col_sums[col])+delta)
+        self._col_sums[col] += delta
+
+    def add(self, rating_a, rating_b):
+        r"""Add a rating pair to the window
+
+        Whenever the window is full, its oldest pair is evicted.
+
+        :param rating_a: The rating of the first rater
+        :param rating_b: The rating of the second rater
+        :returns: The monitor itself
+        :rtype: :class:`AgreementMonitor`
+        :raises: :class:`ValueError`
+        """
+        try:
+            pair = (self._index[rating_a], self._index[rating_b])
+        except KeyError as error:
+            raise ValueError("The label {} is not ".format(error.args[0]) +
+                             "among the monitor labels") from None
+
+        if len(self._pairs) == self._window:
+            self.evict()
+
+        self._pairs.append(pair)
+        self._update(pair[0], pair[1], 1)
+
+        return self
+
+    def evict(self):
+        r"""Evict the oldest rating pair from the window
+
+        :returns: The monitor itself
+        :rtype: :class:`AgreementMonitor`
+        :raises: :class:`ValueError`
+        """
+        if len(self._pairs) == 0:
+            raise ValueError("The window is empty")
+
+        row, col = self._pairs.popleft()
+        self._update(row, col, -1)
+
+        return self
+
+    def _total(self):
+        r"""Return the number of rating pairs in a non-empty window
+
+        :returns: The number of rating pairs in the window
+        :rtype: :class:`int`
+        :raises: :class:`ValueError`
+        """
+        if len(self._pairs) == 0:
+            raise ValueError("The window is empty")
+
+        return len(self._pairs)
+
+    def cohen_kappa(self):
+        r"""Evaluate Cohen's :math:`\kappa` on the window
+
+        :returns: The Cohen's :math:`\kappa` of the rating pairs in the
+                  window
+        :rtype: :class:`float`
+        :raises: :class:`ValueError`
+        """
+        total = self._total()
+
+        p_a = self._diagonal/total
+        p_e = self._margin_products/(total*total)
+
+        if p_e == 1:
+            raise ValueError("The agreement probability by chance " +
+                             "of the matrix is 1")
+
+        return (p_a-p_e)/(1-p_e)
+
+    def scott_pi(self):
+        r"""Evaluate Scott's :math:`\pi` on the window
+
+        :returns: The Scott's :math:`\pi` of the rating pairs in the window
+        :rtype: :class:`float`
+        :raises: :class:`ValueError`
+        """
+        total = self._total()
+
+        p_a = self._diagonal/total
+        p_e = self._joint_squares/(4*total*total)
+
+        if p_e == 1:
+            raise ValueError("The sum of the squared joint " +
+                             "proportions of the matrix is 1")
+
+        return (p_a-p_e)/(1-p_e)
+
+    def ia_c(self):
+        r"""Evaluate *extension-by-continuity of Information Agreement*
+
+        :returns: The extension-by-continuity of Information Agreement of
+                  the rating pairs in the window
+        :rtype: :class:`float`
+        :raises: :class:`ValueError`
+        """
+        self._total()
+
+        if self._ia_c_state is None:
+            raise ValueError("The matrix has less than 2 rows and columns")
+
+        return self._ia_c_state.value()
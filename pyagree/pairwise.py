@@ -0,0 +1,103 @@
+"""This file contains the functions which evaluate the agreement between all
+   the pairs of raters of a dataset.
+
+.. moduleauthor:: Alberto Casagrande <acasagrande@units.it>
+
+"""
+
+from numpy import asarray, arange, zeros, put_along_axis, rint
+from numpy import ascontiguousarray
+
+from .ratings import _encode_ratings
+from .standard import cohen_kappa
+
+
+def pairwise_agreement_matrices(ratings, labels=None, block_size=None):
+    r"""Build the agreement matrices of all the pairs of raters
+
+    Build the :math:`R \times R \times n \times n`-stack :math:`A` of the
+    agreement matrices of the :math:`N \times R`-array ratings, whose
+    element in position :math:`(i, j)` is the rating given by the
+    :math:`j`-th rater to the :math:`i`-th item, i.e., :math:`A[r, s]` is
+    the agreement matrix of the :math:`r`-th and the :math:`s`-th raters
+    (see :func:`pyagree.agreement_matrix_from_ratings`).
+
+    The ratings are one-hot encoded in the :math:`N \times (R \cdot n)`
+    matrix :math:`X` and the whole stack is the single matrix product
+    :math:`X^T X`. The product is accumulated over blocks of block_size
+    items, so that :math:`X` is never built for the whole dataset; by
+    default, each block contains at most :math:`2^{22}` elements.
+
+    The meaning of labels is the same as in
+    :func:`pyagree.agreement_matrix_from_ratings`.
+
+    :param ratings: An :math:`N \times R`-array of ratings
+    :type ratings: :class:`numpy.ndarray`
+    :param labels: The sequence of labels or a label vocabulary
+    :type labels: Iterable object or :class:`pyagree.LabelVocabulary`
+    :param block_size: The number of items per block
+    :type block_size: :class:`int`
+    :returns: The stack of the agreement matrices of all the pairs of
+              raters
+    :rtype: :class:`numpy.ndarray`
+    :raises: :class:`ValueError`
+    """
+    ratings = asarray(ratings)
+
+    if ratings.ndim != 2:
+        raise ValueError("The ratings must be an N x R-array")
+
+    (codes, ), k = _encode_ratings([ratings], labels)
+
+    dataset_size, num_of_raters = codes.shape
+    width = num_of_raters*k
+
+    if block_size is None:
+        block_size = max(1, 2**22//max(1, width))
+
+    # the one-hot column of the h-th label of the r-th rater is r*k+h
+    codes = codes+arange(num_of_raters)*k
+
+    products = zeros((width, width))
+    for begin in range(0, dataset_size, block_size):
+        block = codes[begin:begin+block_size]
+        one_hot = zeros((len(block), width))
+        put_along_axis(one_hot, block, 1, axis=1)
+
+        products += one_hot.T @ one_hot
+
+    products = rint(products).astype(int)
+
+    return ascontiguousarray(products.reshape(num_of_raters, k,
+                                              num_of_raters, k)
+                             .transpose(0, 2, 1, 3))
+
+
+def pairwise_agreement(ratings, measure=cohen_kappa, labels=None,
+                       block_size=None):
+    r"""Evaluate an agreement measure on all the pairs of raters
+
+    Compute the :math:`R \times R`-array whose element in position
+    :math:`(r, s)` is the value of measure on the agreement matrix of the
+    :math:`r`-th and the :math:`s`-th raters of the
+    :math:`N \times R`-array ratings. All the agreement matrices are built
+    at once by :func:`pairwise_agreement_matrices` and measure evaluates
+    the whole stack at once, so measure must accept stacks of agreement
+    matrices, e.g., :func:`pyagree.cohen_kappa`,
+    :func:`pyagree.scott_pi`, or :func:`pyagree.ia_c`. As in stacks, the
+    pairs whose agreement matrix is out of the measure domain are
+    evaluated as :data:`numpy.nan`.
+
+    :param ratings: An :math:`N \times R`-array of ratings
+    :type ratings: :class:`numpy.ndarray`
+    :param measure: A measure accepting stacks of agreement matrices
+    :type measure: Callable object
+    :param labels: The sequence of labels or a label vocabulary
+    :type labels: Iterable object or :class:`pyagree.LabelVocabulary`
+    :param block_size: The number of items per block
+    :type block_size: :class:`int`
+    :returns: The :math:`R \times R`-array of the measure values
+    :rtype: :class:`numpy.ndarray`
+    :raises: :class:`ValueError`
+    """
+    return measure(pairwise_agreement_matrices(ratings, labels, block_size))
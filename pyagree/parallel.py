@@ -0,0 +1,66 @@
+"""This file contains the multi-threaded evaluation of the agreement
+   measures on stacks of agreement matrices.
+
+.. moduleauthor:: Alberto Casagrande <acasagrande@units.it>
+
+"""
+
+from numpy import concatenate
+
+from .common import as_count_array, _thread_map
+
+
+def evaluate_stack(measure, matrices, n_jobs=None, chunk_size=None,
+                   **parameters):
+    r"""Evaluate an agreement measure on a stack of matrices by chunks
+
+    Split the stack matrices of agreement matrices, e.g., a
+    :math:`T \times n \times n`-array, in chunks of chunk_size matrices
+    along its leading axes, evaluate measure, together with the keyword
+    arguments in parameters, on each chunk, and join the results. Since
+    the value of a measure on a matrix of a stack does not depend on the
+    other matrices, the result is the same as that of measure on the whole
+    stack.
+
+    Whenever n_jobs is greater than 1, the chunks are evaluated
+    concurrently by n_jobs threads, which run in parallel because NumPy
+    releases the GIL during the reductions, so that neither the matrices
+    nor measure are pickled; by default, the stack is split in n_jobs
+    chunks. Otherwise, the chunks are evaluated in the calling thread and,
+    by default, the stack is a single chunk.
+
+    :param measure: A measure accepting stacks of agreement matrices
+    :type measure: Callable object
+    :param matrices: A stack of :math:`n \times n`-agreement matrices
+    :type matrices: :class:`numpy.ndarray`
+    :param n_jobs: The number of threads
+    :type n_jobs: :class:`int`
+    :param chunk_size: The number of matrices per chunk
+    :type chunk_size: :class:`int`
+    :param parameters: The keyword arguments of measure
+    :returns: The array of the values of measure on the matrices
+    :rtype: :class:`numpy.ndarray`
+    :raises: :class:`ValueError`
+    """
+    matrices = as_count_array(matrices)
+
+    if matrices.ndim < 3:
+        raise ValueError("A stack of agreement matrices is required")
+
+    shape = matrices.shape[:-2]
+    matrices = matrices.reshape((-1,)+matrices.shape[-2:])
+
+    if chunk_size is None:
+        chunk_size = max(1, -(-len(matrices)//max(1, n_jobs or 1)))
+
+    if chunk_size < 1:
+        raise ValueError("The chunks must contain at least one matrix")
+
+    def evaluate_chunk(begin):
+        return measure(matrices[begin:begin+chunk_size], **parameters)
+
+    # an empty stack is evaluated as a single empty chunk
+    begins = list(range(0, max(1, len(matrices)), chunk_size))
+
+    return concatenate(_thread_map(evaluate_chunk, begins,
+                                   n_jobs)).reshape(shape)
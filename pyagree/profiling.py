@@ -0,0 +1,346 @@
+"""This file contains the implementation of the opt-in profiling of the
+   package functions.
+
+.. moduleauthor:: Alberto Casagrande <acasagrande@units.it>
+
+"""
+
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+from threading import Lock
+from time import perf_counter
+
+from numpy import ndarray, percentile
+
+# the profiler recording the calls or None whenever profiling is disabled
+_active_profiler = None
+
+_QUANTILES = (0.5, 0.9, 0.99)
+
+
+class _Record:
+    r"""The statistics of the calls of a function or stage
+
+    :param window: The number of latest latencies kept for the percentiles
+    :type window: :class:`int`
+    """
+
+    __slots__ = ('calls', 'total_time', 'max_time', 'input_size',
+                 'latencies')
+
+    def __init__(self, window):
+        self.calls = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.input_size = 0
+        self.latencies = deque(maxlen=window)
+
+
+class Profiler:
+    r"""A registry of the latencies of the package functions
+
+    A profiler records, for each profiled function and internal stage, the
+    number of calls, the cumulative and the maximum latency, the overall
+    number of elements in the inputs, and the latencies of the latest
+    window calls, from which the latency percentiles are evaluated.
+
+    The calls are recorded only while the profiler is active (see
+    :func:`profile` and :func:`enable_profiling`). The latencies of a
+    function include those of the profiled functions and stages it calls,
+    and the calls performed by worker processes are not recorded.
+
+    :param window: The number of latest latencies kept per function
+    :type window: :class:`int`
+    :raises: :class:`ValueError`
+    """
+
+    def __init__(self, window=10000):
+        if window < 1:
+            raise ValueError("The window must contain at least one latency")
+
+        self._window = window
+        self._records = {}
+        self._lock = Lock()
+
+    def record(self, name, latency, input_size=None):
+        r"""Record a call
+
+        :param name: The name of the function or stage
+        :type name: :class:`str`
+        :param latency: The latency of the call in seconds
+        :type latency: :class:`float`
+        :param input_size: The number of elements in the input
+        :type input_size: :class:`int`
+        """
+        with self._lock:
+            record = self._records.get(name)
+            if record is None:
+                record = _Record(self._window)
+                self._records[name] = record
+
+            record.calls += 1
+            record.total_time += latency
+            record.max_time = max(record.max_time, latency)
+            if input_size is not None:
+                record.input_size += input_size
+            record.latencies.append(latency)
+
+    def reset(self):
+        r"""Forget all the recorded calls
+        """
+        with self._lock:
+            self._records = {}
+
+    def as_dict(self):
+        r"""Summarize the recorded calls
+
+        The result maps the name of each function and stage into a
+        dictionary whose keys are `'calls'`, `'total_time'`, `'mean_time'`,
+        `'max_time'`, `'input_size'`, `'p50'`, `'p90'`, and `'p99'`. The
+        times are in seconds and the percentiles refer to the latest
+        window calls.
+
+        :returns: A dictionary mapping the names into their statistics
+        :rtype: :class:`dict`
+        """
+        with self._lock:
+            records = list(self._records.items())
+            latencies = [list(record.latencies) for _, record in records]
+
+        summary = {}
+        for (name, record), values in zip(records, latencies):
+            quantiles = percentile(values, [100*q for q in _QUANTILES])
+            summary[name] = {'calls': record.calls,
+                             'total_time': record.total_time,
+                             'mean_time': record.total_time/record.calls,
+                             'max_time': record.max_time,
+                             'input_size': record.input_size,
+                             'p50': float(quantiles[0]),
+                             'p90': float(quantiles[1]),
+                             'p99': float(quantiles[2])}
+
+        return summary
+
+    def to_prometheus(self, prefix='pyagree'):
+        r"""Export the recorded calls in the Prometheus text format
+
+        The latencies are exported as the summary `<prefix>_seconds` and
+        the input sizes as the counter `<prefix>_input_elements_total`,
+        both labelled by the function name.
+
+        :param prefix: The prefix of the metric names
+        :type prefix: :class:`str`
+        :returns: The Prometheus exposition of the recorded calls
+        :rtype: :class:`str`
+        """
+        summary = self.as_dict()
+
+        lines = ['# HELP {}_seconds The latencies of the pyagree '
+                 'functions.'.format(prefix),
+                 '# TYPE {}_seconds summary'.format(prefix)]
+        for name, stats in sorted(summary.items()):
+            for quantile in _QUANTILES:
+                lines.append('{}_seconds{{function="{}",quantile="{}"}} '
+                             '{!r}'.format(prefix, name, quantile,
+                                           stats['p{}'.format(
+                                               round(100*quantile))]))
+            lines.append('{}_seconds_sum{{function="{}"}} '
+                         '{!r}'.format(prefix, name, stats['total_time']))
+            lines.append('{}_seconds_count{{function="{}"}} '
+                         '{}'.format(prefix, name, stats['calls']))
+
+        lines += ['# HELP {}_input_elements_total The number of input '
+                  'elements of the pyagree functions.'.format(prefix),
+                  '# TYPE {}_input_elements_total counter'.format(prefix)]
+        for name, stats in sorted(summary.items()):
+            lines.append('{}_input_elements_total{{function="{}"}} '
+                         '{}'.format(prefix, name, stats['input_size']))
+
+        return '\n'.join(lines)+'\n'
+
+
+def enable_profiling(profiler=None):
+    r"""Start recording the calls of the package functions
+
+    :param profiler: The profiler recording the calls or `None` for a new
+                     one
+    :type profiler: :class:`Profiler`
+    :returns: The active profiler
+    :rtype: :class:`Profiler`
+    """
+    global _active_profiler
+
+    if profiler is None:
+        profiler = Profiler()
+
+    _active_profiler = profiler
+
+    return profiler
+
+
+def disable_profiling():
+    r"""Stop recording the calls of the package functions
+
+    :returns: The profiler which was active, if any, or `None`
+    :rtype: :class:`Profiler`
+    """
+    global _active_profiler
+
+    profiler = _active_profiler
+    _active_profiler = None
+
+    return profiler
+
+
+@contextmanager
+def profile(profiler=None):
+    r"""Record the calls of the package functions within a `with` block
+
+    The previously active profiler, if any, is restored at the end of
+    the block, e.g.,
+
+    .. code:: python
+
+        with profile() as profiler:
+            cohen_kappa(A)
+
+        print(profiler.to_prometheus())
+
+    :param profiler: The profiler recording the calls or `None` for a new
+                     one
+    :type profiler: :class:`Profiler`
+    :returns: The active profiler
+    :rtype: :class:`Profiler`
+    """
+    global _active_profiler
+
+    previous = _active_profiler
+    profiler = enable_profiling(profiler)
+    try:
+        yield profiler
+    finally:
+        _active_profiler = previous
+
+
+def _input_size(value):
+    r"""Evaluate the number of elements in an input
+
+    Only array-like inputs, i.e., agreement tables and objects having
+    both a size and a shape, e.g., NumPy arrays and SciPy sparse
+    matrices, have a size, so that, for instance, the length of the
+    path of a `.npy` file is not recorded as its size.
+
+    :param value: An input of a profiled function
+    :returns: The number of elements of array-like inputs and `None`
+              otherwise
+    :rtype: :class:`int`
+    """
+    if isinstance(value, ndarray):
+        return value.size
+
+    from .table import AgreementTable
+
+    if isinstance(value, AgreementTable):
+        return value._num_of_elements()
+
+    if hasattr(value, 'size') and hasattr(value, 'shape'):
+        return int(value.size)
+
+    return None
+
+
+def profiled(name=None):
+    r"""Decorate a function so that the active profiler records its calls
+
+    Whenever profiling is disabled, the decorated function only adds a
+    test to the call of the original one.
+
+    :param name: The name of the recorded calls or `None` for the
+                 function name
+    :type name: :class:`str`
+    :returns: The decorator
+    :rtype: Callable object
+    """
+    def decorator(function):
+        record_name = function.__name__ if name is None else name
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            profiler = _active_profiler
+            if profiler is None:
+                return function(*args, **kwargs)
+
+            begin = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                profiler.record(record_name, perf_counter()-begin,
+                                _input_size(args[0]) if args else None)
+
+        return wrapper
+
+    return decorator
+
+
+class _Stage:
+    r"""A `with` block whose latency is recorded by a profiler
+
+    :param profiler: The profiler recording the block
+    :type profiler: :class:`Profiler`
+    :param name: The name of the stage
+    :type name: :class:`str`
+    :param input_size: The number of elements processed by the stage
+    :type input_size: :class:`int`
+    """
+
+    __slots__ = ('_profiler', '_name', '_input_size', '_begin')
+
+    def __init__(self, profiler, name, input_size):
+        self._profiler = profiler
+        self._name = name
+        self._input_size = input_size
+        self._begin = None
+
+    def __enter__(self):
+        self._begin = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._profiler.record(self._name, perf_counter()-self._begin,
+                              self._input_size)
+        return False
+
+
+class _NullStage:
+    r"""A `with` block which is not profiled
+    """
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+def profile_stage(name, input_size=None):
+    r"""Record the latency of a `with` block as an internal stage
+
+    :param name: The name of the stage
+    :type name: :class:`str`
+    :param input_size: The number of elements processed by the stage
+    :type input_size: :class:`int`
+    :returns: A context manager recording the block whenever profiling
+              is enabled
+    :rtype: Context manager
+    """
+    profiler = _active_profiler
+    if profiler is None:
+        return _NULL_STAGE
+
+    return _Stage(profiler, name, input_size)
@@ -0,0 +1,339 @@
+"""This file contains the functions which build agreement and classification
+   matrices from the ratings of the raters.
+
+.. moduleauthor:: Alberto Casagrande <acasagrande@units.it>
+
+"""
+
+from numpy import asarray, unique, argsort, searchsorted, bincount
+from numpy import concatenate, arange, not_equal, nonzero, zeros, where
+from numpy import errstate, count_nonzero
+from numpy import all as np_all
+from numpy.ma import MaskedArray, getmaskarray
+
+from .profiling import profiled
+
+
+class LabelVocabulary:
+    r"""A vocabulary of rating labels
+
+    A label vocabulary associates each label in a sequence to its
+    position in the sequence, i.e., to the index of the corresponding row
+    and column in the agreement matrices. The labels can be any
+    comparable objects, e.g., integers or strings. The vocabulary sorts
+    the labels once, when it is built, and caches the sorted labels, so
+    that encoding ratings only requires a binary search per rating.
+    Hence, a vocabulary can be built once and reused for many rating
+    arrays.
+
+    :param labels: A sequence of pairwise different labels
+    :type labels: Iterable object
+    :raises: :class:`ValueError`
+    """
+
+    __slots__ = ('_labels', '_sorter', '_sorted')
+
+    def __init__(self, labels):
+        labels = asarray(labels)
+        if labels.ndim != 1:
+            raise ValueError("The labels must be a sequence")
+
+        sorter = argsort(labels, kind='stable')
+        sorted_labels = labels[sorter]
+
+        if len(labels) > 1 and not np_all(sorted_labels[1:] !=
+                                          sorted_labels[:-1]):
+            raise ValueError("The labels are not pairwise different")
+
+        self._labels = labels
+        self._sorter = sorter
+        self._sorted = sorted_labels
+
+    @classmethod
+    def from_ratings(cls, *ratings):
+        r"""Build the vocabulary of the labels occurring in some ratings
+
+        The labels of the resulting vocabulary are sorted.
+
+        :param ratings: Some arrays of ratings
+        :type ratings: :class:`numpy.ndarray`
+        :returns: The vocabulary of the labels occurring in ratings
+        :rtype: :class:`LabelVocabulary`
+        """
+        return cls(unique(concatenate([asarray(rating).ravel()
+                                       for rating in ratings])))
+
+    @property
+    def labels(self):
+        r"""The labels of the vocabulary
+
+        :rtype: :class:`numpy.ndarray`
+        """
+        return self._labels
+
+    def __len__(self):
+        return len(self._labels)
+
+    def encode(self, ratings):
+        r"""Encode some ratings as label indices
+
+        Replace every rating by the position of its label in the
+        vocabulary.
+
+        :param ratings: An array of ratings
+        :type ratings: :class:`numpy.ndarray`
+        :returns: The array of the label indices of ratings
+        :rtype: :class:`numpy.ndarray`
+        :raises: :class:`ValueError`
+        """
+        ratings = asarray(ratings)
+        flat_ratings = ratings.ravel()
+
+        positions = searchsorted(self._sorted, flat_ratings)
+        positions[positions == len(self._sorted)] = 0
+
+        if len(flat_ratings) > 0 and \
+                (len(self._sorted) == 0 or
+                 not np_all(self._sorted[positions] == flat_ratings)):
+            raise ValueError("Some ratings are not in the label vocabulary")
+
+        return self._sorter[positions].reshape(ratings.shape)
+
+
+def as_label_vocabulary(labels):
+    r"""Build a label vocabulary
+
+    Return labels itself whenever it already is a
+    :class:`LabelVocabulary` and a new vocabulary of the labels in labels
+    otherwise.
+
+    :param labels: A sequence of pairwise different labels or a vocabulary
+    :type labels: Iterable object or :class:`LabelVocabulary`
+    :returns: A vocabulary of labels
+    :rtype: :class:`LabelVocabulary`
+    :raises: :class:`ValueError`
+    """
+    if isinstance(labels, LabelVocabulary):
+        return labels
+
+    return LabelVocabulary(labels)
+
+
+def _encode_ratings(ratings, labels):
+    r"""Encode some arrays of ratings by using a label vocabulary
+
+    :param ratings: A list of arrays of ratings
+    :type ratings: :class:`list`
+    :param labels: A sequence of labels, a label vocabulary or `None`
+    :type labels: Iterable object or :class:`LabelVocabulary`
+    :returns: The list of the arrays of label indices of ratings and the
+              number of labels
+    :rtype: :class:`tuple`
+    """
+    ratings = [asarray(rating) for rating in ratings]
+
+    if labels is None:
+        values, codes = unique(concatenate([rating.ravel()
+                                            for rating in ratings]),
+                               return_inverse=True)
+        num_of_labels = len(values)
+
+        encoded = []
+        begin = 0
+        for rating in ratings:
+            encoded.append(codes[begin:begin+rating.size]
+                           .reshape(rating.shape))
+            begin += rating.size
+
+        return encoded, num_of_labels
+
+    vocabulary = as_label_vocabulary(labels)
+
+    return [vocabulary.encode(rating) for rating in ratings], len(vocabulary)
+
+
+@profiled()
+def agreement_matrix_from_ratings(ratings_a, ratings_b, labels=None,
+                                  weights=None):
+    r"""Build the agreement matrix of two raters
+
+    Build the agreement matrix :math:`A` of the two raters whose ratings
+    are ratings_a and ratings_b, i.e., :math:`A[i, j]` is the number of
+    items that the first rater classified as labels[i] and the second rater
+    classified as labels[j]. Whenever weights is provided, each item
+    contributes to :math:`A` with its weight rather than with 1.
+
+    The matrix is built by a single :func:`numpy.bincount` over the
+    combined label indices. If labels is `None`, the labels are the sorted
+    labels occurring in the ratings; thus, the labels which no rater
+    used are not represented in the matrix. Passing labels, possibly as
+    a :class:`LabelVocabulary`, fixes both the label order and the matrix
+    size.
+
+    :param ratings_a: The ratings of the first rater
+    :type ratings_a: :class:`numpy.ndarray`
+    :param ratings_b: The ratings of the second rater
+    :type ratings_b: :class:`numpy.ndarray`
+    :param labels: The sequence of labels or a label vocabulary
+    :type labels: Iterable object or :class:`LabelVocabulary`
+    :param weights: The weights of the items
+    :type weights: :class:`numpy.ndarray`
+    :returns: The agreement matrix of the two raters
+    :rtype: :class:`numpy.ndarray`
+    :raises: :class:`ValueError`
+    """
+    ratings_a = asarray(ratings_a)
+    ratings_b = asarray(ratings_b)
+
+    if ratings_a.ndim != 1 or ratings_a.shape != ratings_b.shape:
+        raise ValueError("The ratings must be two sequences having the " +
+                         "same length")
+
+    if weights is not None:
+        weights = asarray(weights)
+        if weights.shape != ratings_a.shape:
+            raise ValueError("The weights and the ratings must have the " +
+                             "same length")
+
+    (codes_a, codes_b), k = _encode_ratings([ratings_a, ratings_b], labels)
+
+    return bincount(codes_a*k+codes_b, weights=weights,
+                    minlength=k*k).reshape(k, k)
+
+
+@profiled()
+def classification_matrix_from_ratings(ratings, labels=None):
+    r"""Build the classification matrix of some raters
+
+    Build the classification matrix :math:`C` of the
+    :math:`N \times n`-array ratings, whose element in position
+    :math:`(i, j)` is the rating given by the :math:`j`-th rater to the
+    :math:`i`-th item, i.e., :math:`C[i, h]` is the number of raters that
+    classified the :math:`i`-th item as labels[h].
+
+    The matrix is built by a single :func:`numpy.bincount` over the
+    combined item and label indices. The meaning of labels is the same as
+    in :func:`agreement_matrix_from_ratings`.
+
+    :param ratings: An :math:`N \times n`-array of ratings
+    :type ratings: :class:`numpy.ndarray`
+    :param labels: The sequence of labels or a label vocabulary
+    :type labels: Iterable object or :class:`LabelVocabulary`
+    :returns: The classification matrix of ratings
+    :rtype: :class:`numpy.ndarray`
+    :raises: :class:`ValueError`
+    """
+    ratings = asarray(ratings)
+
+    if ratings.ndim != 2:
+        raise ValueError("The ratings must be an N x n-array")
+
+    (codes, ), k = _encode_ratings([ratings], labels)
+
+    dataset_size = ratings.shape[0]
+    items = arange(dataset_size)[:, None]
+
+    return bincount((items*k+codes).ravel(),
+                    minlength=dataset_size*k).reshape(dataset_size, k)
+
+
+def _observed_ratings(ratings):
+    r"""Collect the observed ratings of an array of ratings
+
+    A rating is missing whenever it is masked, it is :data:`numpy.nan`,
+    or it is `None`.
+
+    :param ratings: An :math:`N \times n`-array of ratings, possibly masked
+    :type ratings: :class:`numpy.ndarray` or :class:`numpy.ma.MaskedArray`
+    :returns: The item indices and the values of the observed ratings
+    :rtype: :class:`tuple`
+    :raises: :class:`ValueError`
+    """
+    if isinstance(ratings, MaskedArray):
+        observed = ~getmaskarray(ratings)
+        ratings = ratings.data
+    else:
+        ratings = asarray(ratings)
+        observed = None
+
+    if ratings.ndim != 2:
+        raise ValueError("The ratings must be an N x n-array")
+
+    if ratings.dtype.kind in 'fcO':
+        present = ratings == ratings
+        if ratings.dtype.kind == 'O':
+            present &= not_equal(ratings, None)
+        observed = present if observed is None else observed & present
+
+    if observed is None:
+        items = arange(ratings.shape[0]).repeat(ratings.shape[1])
+        return items, ratings.ravel()
+
+    items, raters = nonzero(observed)
+
+    return items, ratings[items, raters]
+
+
+@profiled()
+def coincidence_matrix_from_ratings(ratings, labels=None):
+    r"""Build the coincidence matrix of some raters with missing ratings
+
+    Build the coincidence matrix :math:`O` of the :math:`N \times n`-array
+    ratings, whose element in position :math:`(i, j)` is the rating given
+    by the :math:`j`-th rater to the :math:`i`-th item, or a missing value,
+    i.e., a masked element, :data:`numpy.nan`, or `None`, whenever the
+    rater did not rate the item. The element :math:`O[c, h]` counts the
+    ordered pairs of ratings of the same item whose values are labels[c]
+    and labels[h], respectively, where the pairs of an item rated
+    :math:`m_i` times are weighted :math:`1/(m_i-1)`. The items rated
+    less than twice do not contribute to :math:`O`.
+
+    The observed ratings of each item are packed in the leftmost columns
+    of an :math:`N \times n`-array of label indices and, for each pair of
+    these columns, the pairs of ratings of the items rated in both of them
+    are counted by a single weighted :func:`numpy.bincount` over their
+    indices :math:`c \cdot k+h`. Hence, :math:`O` costs
+    :math:`O(N \cdot n^2)` time and memory linear in the number of
+    ratings, whatever the number :math:`k` of labels. The meaning of
+    labels is the same as in :func:`agreement_matrix_from_ratings`.
+
+    :param ratings: An :math:`N \times n`-array of ratings, possibly masked
+    :type ratings: :class:`numpy.ndarray` or :class:`numpy.ma.MaskedArray`
+    :param labels: The sequence of labels or a label vocabulary
+    :type labels: Iterable object or :class:`LabelVocabulary`
+    :returns: The coincidence matrix of ratings
+    :rtype: :class:`numpy.ndarray`
+    :raises: :class:`ValueError`
+    """
+    items, values = _observed_ratings(ratings)
+
+    (codes, ), k = _encode_ratings([values], labels)
+
+    # the observed ratings are sorted by item: pack those of each item in
+    # the leftmost columns, the items having more ratings first
+    num_of_ratings = bincount(items)
+    positions = arange(len(items))-searchsorted(items, items)
+    num_of_columns = positions.max()+1 if len(items) > 0 else 0
+
+    packed = zeros((len(num_of_ratings), num_of_columns), dtype=codes.dtype)
+    packed[items, positions] = codes
+
+    order = argsort(-num_of_ratings, kind='stable')
+    packed = packed[order]
+    num_of_ratings = num_of_ratings[order]
+    with errstate(divide='ignore'):
+        weights = where(num_of_ratings > 1, 1/(num_of_ratings-1), 0)
+
+    coincidences = zeros(k*k)
+    for second in range(1, num_of_columns):
+        # the items rated at least second+1 times
+        rated = count_nonzero(num_of_ratings > second)
+        second_codes = packed[:rated, second]
+        for first in range(second):
+            coincidences += bincount(packed[:rated, first]*k+second_codes,
+                                     weights=weights[:rated],
+                                     minlength=k*k)
+
+    coincidences = coincidences.reshape(k, k)
+
+    return coincidences+coincidences.T
@@ -0,0 +1,61 @@
+"""This file contains the functions which evaluate many agreement measures
+   at once.
+
+.. moduleauthor:: Alberto Casagrande <acasagrande@units.it>
+
+"""
+
+from numpy import nan
+
+from .table import as_agreement_table
+from .standard import bennett_s, bangdiwala_b, cohen_kappa, scott_pi
+from .standard import yule_y
+from .inf_agreement import ia_c
+from .profiling import profiled
+
+
+@profiled()
+def agreement_report(table):
+    r"""Evaluate all the agreement measures applicable to an agreement matrix
+
+    Compute all the agreement measures that are applicable to the size of
+    table by sharing among them the statistics cached in a single
+    :class:`AgreementTable`. Hence, the matrix is validated once and its
+    total, diagonal, marginals, and entropies are evaluated once.
+
+    The result is a dictionary mapping the name of each applicable
+    measure function into its value. A measure is applicable whenever the
+    size of the matrix is in the domain of the measure, e.g., Yule's
+    :math:`Y` is reported only for :math:`2 \times 2`-agreement matrices.
+    If the matrix is out of the domain of an applicable measure, the
+    corresponding value is :data:`numpy.nan`. Fleiss's :math:`\kappa` is
+    not reported because on the two raters described by an agreement
+    matrix it coincides with Scott's :math:`\pi`.
+
+    Whenever table wraps a stack of agreement matrices, the values in the
+    result are the arrays of the measures on the matrices in the stack.
+
+    :param table: An agreement matrix, a stack of them, or an agreement
+                  table
+    :type table: :class:`numpy.ndarray` or :class:`AgreementTable`
+    :returns: A dictionary mapping the names of the applicable measures
+              into their values on table
+    :rtype: :class:`dict`
+    :raises: :class:`ValueError`
+    """
+    table = as_agreement_table(table)
+
+    measures = [bangdiwala_b, cohen_kappa, scott_pi]
+    if table.size > 1:
+        measures = [bennett_s] + measures + [ia_c]
+    if table.size == 2:
+        measures.append(yule_y)
+
+    report = {}
+    for measure in measures:
+        try:
+            report[measure.__name__] = measure(table)
+        except ValueError:
+            report[measure.__name__] = nan
+
+    return report
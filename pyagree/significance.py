@@ -0,0 +1,286 @@
+"""This file contains the implementation of the significance tests of the
+   agreement measures under the hypothesis of rater independence.
+
+.. moduleauthor:: Alberto Casagrande <acasagrande@units.it>
+
+"""
+
+from collections import namedtuple
+from math import lgamma, exp
+
+from numpy import asarray, zeros, tile, full, arange, stack, isfinite
+from numpy import abs as np_abs
+from numpy.random import default_rng
+
+from .table import AgreementTable
+from .inf_agreement import ia_c
+from .bootstrap import _seed_sequences, _map_batches
+
+SignificanceTest = namedtuple('SignificanceTest', ['statistic', 'p_value'])
+SignificanceTest.__doc__ = r"""The outcome of a significance test
+
+:param statistic: The value of the measure on the observed data
+:param p_value: The p-value of the observed value
+"""
+
+_ALTERNATIVES = ('greater', 'less', 'two-sided')
+
+
+def _test_integer_counts(agreement_matrix):
+    r"""Test whether an agreement matrix is a single matrix of counts
+
+    :param agreement_matrix: An agreement matrix
+    :type agreement_matrix: :class:`numpy.ndarray`
+    :raises: :class:`ValueError`
+    """
+    if agreement_matrix.ndim > 2:
+        raise ValueError("A single agreement matrix is required")
+
+    if (agreement_matrix != agreement_matrix.astype(int)).any():
+        raise ValueError("The matrix does not contain integer counts")
+
+
+def independence_tables(row_sums, col_sums, num_of_samples, seed=None):
+    r"""Sample random agreement matrices having fixed margins
+
+    Draw num_of_samples agreement matrices whose row and column sums are
+    row_sums and col_sums, respectively, uniformly among the
+    arrangements of the items that preserve the margins, i.e., from the
+    distribution of the agreement matrices under the hypothesis of rater
+    independence. As R's `r2dtable`, every row is drawn from a
+    multivariate hypergeometric distribution over the column sums left by
+    the previous rows, one element at a time. Each draw involves all the
+    num_of_samples matrices at once, so the number of Python-level
+    operations only depends on the size of the matrices.
+
+    :param row_sums: The integer row sums of the matrices
+    :type row_sums: :class:`numpy.ndarray`
+    :param col_sums: The integer column sums of the matrices
+    :type col_sums: :class:`numpy.ndarray`
+    :param num_of_samples: The number of matrices :math:`B`
+    :type num_of_samples: :class:`int`
+    :param seed: A seed or a random generator
+    :type seed: :class:`int`, :class:`numpy.random.SeedSequence`, or
+                :class:`numpy.random.Generator`
+    :returns: The :math:`B \times n \times m`-array of the sampled matrices
+    :rtype: :class:`numpy.ndarray`
+    :raises: :class:`ValueError`
+    """
+    row_sums = asarray(row_sums).astype(int)
+    col_sums = asarray(col_sums).astype(int)
+
+    if row_sums.ndim != 1 or col_sums.ndim != 1:
+        raise ValueError("The margins must be sequences")
+
+    if (row_sums < 0).any() or (col_sums < 0).any() or \
+            row_sums.sum() != col_sums.sum():
+        raise ValueError("The margins must be non-negative and have the " +
+                         "same total")
+
+    rng = default_rng(seed)
+    tables = zeros((num_of_samples, len(row_sums), len(col_sums)), dtype=int)
+
+    # remaining[:, j] is the part of the j-th column sum not yet placed
+    remaining = tile(col_sums, (num_of_samples, 1))
+    for i, row_sum in enumerate(row_sums[:-1]):
+        to_place = full(num_of_samples, row_sum)
+        later = remaining.sum(axis=1)
+        for j in range(len(col_sums)-1):
+            later = later-remaining[:, j]
+            tables[:, i, j] = rng.hypergeometric(remaining[:, j], later,
+                                                 to_place)
+            to_place -= tables[:, i, j]
+        tables[:, i, -1] = to_place
+        remaining -= tables[:, i]
+
+    if len(row_sums) > 0:
+        tables[:, -1] = remaining
+
+    return tables
+
+
+def _independence_batch(measure, row_sums, col_sums, num_of_samples, seed):
+    r"""Evaluate a measure on a batch of matrices having fixed margins
+
+    :param measure: A measure accepting stacks of agreement matrices
+    :type measure: Callable object
+    :param row_sums: The row sums of the matrices
+    :type row_sums: :class:`numpy.ndarray`
+    :param col_sums: The column sums of the matrices
+    :type col_sums: :class:`numpy.ndarray`
+    :param num_of_samples: The number of matrices
+    :type num_of_samples: :class:`int`
+    :param seed: A seed sequence
+    :type seed: :class:`numpy.random.SeedSequence`
+    :returns: The array of the measure values on the matrices
+    :rtype: :class:`numpy.ndarray`
+    """
+    return measure(independence_tables(row_sums, col_sums, num_of_samples,
+                                       seed))
+
+
+def _extreme_weight(statistic, values, weights, alternative):
+    r"""Evaluate the weight of the values at least as extreme as a statistic
+
+    The values which are equal to statistic up to a relative tolerance
+    of :math:`10^{-7}` count as being as extreme as statistic, so that
+    rounding errors do not hide the ties. In the two-sided case, the
+    weight is twice the smallest of the two one-sided weights, but it
+    never exceeds the overall weight.
+
+    :param statistic: The observed value
+    :type statistic: :class:`float`
+    :param values: The values of the null distribution
+    :type values: :class:`numpy.ndarray`
+    :param weights: The weights, i.e., probabilities or counts, of values
+    :type weights: :class:`numpy.ndarray`
+    :param alternative: The alternative hypothesis
+    :type alternative: :class:`str`
+    :returns: The weight of the values at least as extreme as statistic
+    :rtype: :class:`float`
+    """
+    tolerance = 1e-7*max(abs(statistic), 1)
+    tied = np_abs(values-statistic) <= tolerance
+
+    greater = weights[tied | (values > statistic)].sum()
+    less = weights[tied | (values < statistic)].sum()
+
+    if alternative == 'greater':
+        return greater
+    if alternative == 'less':
+        return less
+
+    return min(weights.sum(), 2*min(greater, less))
+
+
+def _log_binomial(n, k):
+    r"""Evaluate the natural logarithm of a binomial coefficient
+
+    :param n: A non-negative integer
+    :type n: :class:`int`
+    :param k: An integer in :math:`[0, n]`
+    :type k: :class:`int`
+    :returns: The natural logarithm of :math:`\binom{n}{k}`
+    :rtype: :class:`float`
+    """
+    return lgamma(n+1)-lgamma(k+1)-lgamma(n-k+1)
+
+
+def _exact_2x2(measure, agreement_matrix):
+    r"""Enumerate the matrices having the margins of a 2 x 2-matrix
+
+    :param measure: A measure accepting stacks of agreement matrices
+    :type measure: Callable object
+    :param agreement_matrix: A :math:`2 \times 2`-agreement matrix of counts
+    :type agreement_matrix: :class:`numpy.ndarray`
+    :returns: The values of measure on the matrices and their
+              probabilities under the hypothesis of rater independence
+    :rtype: :class:`tuple`
+    """
+    (a_00, a_01), (a_10, a_11) = agreement_matrix.astype(int).tolist()
+    row_0, col_0 = a_00+a_01, a_00+a_10
+    total = a_00+a_01+a_10+a_11
+
+    first = arange(max(0, row_0+col_0-total), min(row_0, col_0)+1)
+    matrices = stack([stack([first, row_0-first], axis=-1),
+                      stack([col_0-first, total-row_0-col_0+first],
+                            axis=-1)], axis=1)
+
+    log_total = _log_binomial(total, row_0)
+    probabilities = asarray([exp(_log_binomial(col_0, a) +
+                                 _log_binomial(total-col_0, row_0-a) -
+                                 log_total) for a in first.tolist()])
+
+    return measure(matrices), probabilities
+
+
+def independence_test(agreement_matrix, measure=ia_c, num_of_samples=10000,
+                      alternative='greater', exact=None, seed=None,
+                      n_jobs=None, batch_size=1000):
+    r"""Test an agreement measure against the hypothesis of rater independence
+
+    Evaluate the p-value of the value of measure on agreement_matrix
+    under the null hypothesis that the two raters are independent given
+    their rating frequencies, i.e., given the row and column sums of
+    agreement_matrix. The null distribution of the measure is estimated
+    by Monte Carlo on num_of_samples random agreement matrices having the
+    margins of agreement_matrix (see :func:`independence_tables`), so
+    that the ratings never need to be shuffled, and the p-value is
+    :math:`(1+E)/(1+B)`, where :math:`E` is the number of sampled
+    matrices whose measure value is at least as extreme as the observed
+    one and :math:`B` is the number of sampled matrices in the measure
+    domain.
+
+    The matrices are sampled and evaluated in batches of batch_size
+    matrices as in :func:`pyagree.bootstrap_replicates`: the result only
+    depends on seed and batch_size and, whenever n_jobs is greater than
+    1, the batches are shared among n_jobs worker processes.
+
+    The :math:`2 \times 2`-matrices having fixed margins are at most as
+    many as the items, so for :math:`2 \times 2`-agreement matrices the
+    test can enumerate all of them and evaluate the exact p-value, as
+    Fisher's exact test does. This is the default behaviour, i.e., when
+    exact is `None`, whenever the total of agreement_matrix is at most
+    num_of_samples.
+
+    The alternative can be `'greater'`, `'less'`, or `'two-sided'`; in
+    the last case, the p-value is twice the smallest of the two
+    one-sided p-values.
+
+    :param agreement_matrix: An :math:`n \times n`-agreement matrix of
+                             integer counts
+    :type agreement_matrix: :class:`numpy.ndarray`
+    :param measure: A measure accepting stacks of agreement matrices
+    :type measure: Callable object
+    :param num_of_samples: The number of sampled matrices :math:`B`
+    :type num_of_samples: :class:`int`
+    :param alternative: The alternative hypothesis
+    :type alternative: :class:`str`
+    :param exact: Whether the p-value must be evaluated by enumeration
+    :type exact: :class:`bool`
+    :param seed: A seed
+    :type seed: :class:`int` or :class:`numpy.random.SeedSequence`
+    :param n_jobs: The number of worker processes
+    :type n_jobs: :class:`int`
+    :param batch_size: The number of sampled matrices per batch
+    :type batch_size: :class:`int`
+    :returns: The value of measure on agreement_matrix and its p-value
+    :rtype: :class:`SignificanceTest`
+    :raises: :class:`ValueError`
+    """
+    if alternative not in _ALTERNATIVES:
+        raise ValueError("Unknown alternative hypothesis " +
+                         "{}".format(alternative))
+
+    table = AgreementTable(agreement_matrix)
+    _test_integer_counts(table.matrix)
+
+    statistic = measure(table)
+
+    if exact is None:
+        exact = table.size == 2 and table.total <= num_of_samples
+
+    if exact:
+        if table.size != 2:
+            raise ValueError("Exact tests require 2 x 2-agreement matrices")
+
+        values, probabilities = _exact_2x2(measure, table.matrix)
+        finite = isfinite(values)
+
+        probabilities = probabilities[finite]
+        p_value = _extreme_weight(statistic, values[finite], probabilities,
+                                  alternative)/probabilities.sum()
+
+        return SignificanceTest(statistic, p_value)
+
+    batches = [(measure, table.row_sums, table.col_sums, size, batch_seed)
+               for size, batch_seed in _seed_sequences(seed, num_of_samples,
+                                                       batch_size)]
+
+    values = _map_batches(_independence_batch, batches, n_jobs)
+    values = values[isfinite(values)]
+
+    count = _extreme_weight(statistic, values, full(len(values), 1),
+                            alternative)
+
+    return SignificanceTest(statistic, (1+count)/(1+len(values)))
@@ -4,204 +4,870 @@
 
 """
 
-from math import sqrt
+from functools import lru_cache
+from math import sqrt as math_sqrt, nan
+from os import PathLike
 
-from numpy import multiply, matrix
+from numpy import multiply, asarray, errstate, sqrt, arange, einsum
+from numpy import cumsum, triu, issubdtype, number, load, memmap
+from numpy import abs as np_abs
 from numpy import any as np_any
 
-from .common import test_agreement_matrix
+from .common import restrict_to_domain, as_count_array, _may_be_negative
+from .common import _thread_map, _wide_type, _small_matrix_rows
+from .common import _small_statistics
+from .profiling import profiled
+from .table import as_agreement_table
+from .ratings import agreement_matrix_from_ratings
+from .ratings import classification_matrix_from_ratings
+from .ratings import coincidence_matrix_from_ratings, LabelVocabulary
+from .ratings import as_label_vocabulary, _observed_ratings
 
 
-def bennett_s(agreement_matrix):
+@profiled()
+def bennett_s(agreement_matrix, validate=True):
     r"""Evaluate Bennett, Alpert and Goldstein's :math:`S`
 
     Compute the :ref:`BennettS_theory` of agreement_matrix.
 
-    :param agreement_matrix: An :math:`n \times n`-agreement matrix
-    :type agreement_matrix: :class:`numpy.ndarray`
+    Whenever agreement_matrix is a :math:`T \times n \times n`-array,
+    i.e., a stack of :math:`T` agreement matrices, the measure is
+    evaluated on all of them at once and the :math:`T`-array of the
+    results is returned. The matrices out of the measure domain, null
+    matrices included, are evaluated as :data:`numpy.nan`.
+
+    :param agreement_matrix: An :math:`n \times n`-agreement matrix or a
+                             stack of them
+    :type agreement_matrix: :class:`numpy.ndarray` or
+                            :class:`pyagree.AgreementTable`
+    :param validate: Whether agreement_matrix must be validated
+    :type validate: :class:`bool`
     :returns: The Bennett, Alpert and Goldstein's :math:`S` of agreement_matrix
-    :rtype: :class:`float`
+    :rtype: :class:`float` or :class:`numpy.ndarray`
     :raises: :class:`ValueError`
     """
 
-    if isinstance(agreement_matrix, list):
-        agreement_matrix = matrix(agreement_matrix)
-
-    test_agreement_matrix(agreement_matrix)
+    rows = _small_matrix_rows(agreement_matrix, validate)
+    if rows is None:
+        table = as_agreement_table(agreement_matrix, validate=validate)
+        k = table.size
+    else:
+        k = len(rows)
 
-    if agreement_matrix.shape[0] < 2:
+    if k < 2:
         raise ValueError("The matrix has less than 2 rows and columns")
 
-    k = agreement_matrix.shape[0]
-
-    p_a = sum(agreement_matrix[i, i] for i in range(k))/agreement_matrix.sum()
+    if rows is None:
+        with errstate(divide='ignore', invalid='ignore'):
+            p_a = table.diagonal.sum(axis=-1)/table.total
+    else:
+        total, diagonal, _, _ = _small_statistics(rows)
+        p_a = sum(diagonal)/total
 
     return (k*p_a-1)/(k-1)
 
 
-def bangdiwala_b(agreement_matrix):
+def bennett_s_from_ratings(ratings_a, ratings_b, labels=None,
+                           weights=None):
+    r"""Evaluate Bennett, Alpert and Goldstein's :math:`S` from ratings
+
+    Compute the :ref:`BennettS_theory` of the agreement matrix of the
+    ratings ratings_a and ratings_b of two raters (see
+    :func:`pyagree.agreement_matrix_from_ratings`).
+
+    Since :math:`S` depends on the number of categories, labels should
+    list all the categories whenever some of them may not be used by
+    the raters.
+
+    :param ratings_a: The ratings of the first rater
+    :type ratings_a: :class:`numpy.ndarray`
+    :param ratings_b: The ratings of the second rater
+    :type ratings_b: :class:`numpy.ndarray`
+    :param labels: The sequence of labels or a label vocabulary
+    :type labels: Iterable object or :class:`pyagree.LabelVocabulary`
+    :param weights: The weights of the items
+    :type weights: :class:`numpy.ndarray`
+    :returns: The Bennett, Alpert and Goldstein's :math:`S` of the ratings
+    :rtype: :class:`float`
+    :raises: :class:`ValueError`
+    """
+
+    agreement_matrix = agreement_matrix_from_ratings(ratings_a, ratings_b,
+                                                     labels, weights)
+
+    return bennett_s(agreement_matrix)
+
+
+@profiled()
+def bangdiwala_b(agreement_matrix, validate=True):
     r"""Evaluate Bangdiwala's :math:`B`
 
     Compute the :ref:`BangdiwalaB_theory` of agreement_matrix.
 
-    :param agreement_matrix: An :math:`n \times n`-agreement matrix
-    :type agreement_matrix: :class:`numpy.ndarray`
+    Whenever agreement_matrix is a :math:`T \times n \times n`-array,
+    i.e., a stack of :math:`T` agreement matrices, the measure is
+    evaluated on all of them at once and the :math:`T`-array of the
+    results is returned. The matrices out of the measure domain, null
+    matrices included, are evaluated as :data:`numpy.nan`.
+
+    :param agreement_matrix: An :math:`n \times n`-agreement matrix or a
+                             stack of them
+    :type agreement_matrix: :class:`numpy.ndarray` or
+                            :class:`pyagree.AgreementTable`
+    :param validate: Whether agreement_matrix must be validated
+    :type validate: :class:`bool`
     :returns: The Bangdiwala's :math:`B` of agreement_matrix
-    :rtype: :class:`float`
+    :rtype: :class:`float` or :class:`numpy.ndarray`
     :raises: :class:`ValueError`
     """
 
-    if isinstance(agreement_matrix, list):
-        agreement_matrix = matrix(agreement_matrix)
+    rows = _small_matrix_rows(agreement_matrix, validate)
+    if rows is None:
+        table = as_agreement_table(agreement_matrix, validate=validate)
 
-    test_agreement_matrix(agreement_matrix)
+        p_a = (table.diagonal**2).sum(axis=-1)
 
-    k = agreement_matrix.shape[0]
+        p_e = (table.row_sums*table.col_sums).sum(axis=-1)
 
-    p_a = sum(agreement_matrix[i, i]**2 for i in range(k))
+        with errstate(divide='ignore', invalid='ignore'):
+            value = p_a/p_e
+    else:
+        _, diagonal, row_sums, col_sums = _small_statistics(rows)
 
-    p_e = sum(agreement_matrix[i, :].sum()*agreement_matrix[:, i].sum()
-              for i in range(k))
+        p_a = sum(value**2 for value in diagonal)
 
-    if p_e == 0:
-        raise ValueError("This matrix is out of the domain of Bangdiwala's B")
+        p_e = sum(row_sum*col_sum
+                  for row_sum, col_sum in zip(row_sums, col_sums))
 
-    return p_a/p_e
+        value = p_a/p_e if p_e != 0 else nan
 
+    return restrict_to_domain(value, p_e != 0,
+                              "This matrix is out of the domain of " +
+                              "Bangdiwala's B")
 
-def cohen_kappa(agreement_matrix):
+
+def bangdiwala_b_from_ratings(ratings_a, ratings_b, labels=None,
+                              weights=None):
+    r"""Evaluate Bangdiwala's :math:`B` from the ratings of two raters
+
+    Compute the :ref:`BangdiwalaB_theory` of the agreement matrix of the
+    ratings ratings_a and ratings_b of two raters (see
+    :func:`pyagree.agreement_matrix_from_ratings`).
+
+    :param ratings_a: The ratings of the first rater
+    :type ratings_a: :class:`numpy.ndarray`
+    :param ratings_b: The ratings of the second rater
+    :type ratings_b: :class:`numpy.ndarray`
+    :param labels: The sequence of labels or a label vocabulary
+    :type labels: Iterable object or :class:`pyagree.LabelVocabulary`
+    :param weights: The weights of the items
+    :type weights: :class:`numpy.ndarray`
+    :returns: The Bangdiwala's :math:`B` of the ratings
+    :rtype: :class:`float`
+    :raises: :class:`ValueError`
+    """
+
+    agreement_matrix = agreement_matrix_from_ratings(ratings_a, ratings_b,
+                                                     labels, weights)
+
+    return bangdiwala_b(agreement_matrix)
+
+
+@profiled()
+def cohen_kappa(agreement_matrix, validate=True):
     r"""Evaluate Cohen's :math:`\kappa`
 
     Compute :ref:`CohenKappa_theory` of agreement_matrix.
 
-    :param agreement_matrix: An :math:`n \times n`-agreement matrix
-    :type agreement_matrix: :class:`numpy.ndarray`
+    Whenever agreement_matrix is a :math:`T \times n \times n`-array,
+    i.e., a stack of :math:`T` agreement matrices, the measure is
+    evaluated on all of them at once and the :math:`T`-array of the
+    results is returned. The matrices out of the measure domain, null
+    matrices included, are evaluated as :data:`numpy.nan`.
+
+    :param agreement_matrix: An :math:`n \times n`-agreement matrix or a
+                             stack of them
+    :type agreement_matrix: :class:`numpy.ndarray` or
+                            :class:`pyagree.AgreementTable`
+    :param validate: Whether agreement_matrix must be validated
+    :type validate: :class:`bool`
     :returns: The Cohen's :math:`\kappa` of agreement_matrix
+    :rtype: :class:`float` or :class:`numpy.ndarray`
+    :raises: :class:`ValueError`
+    """
+
+    rows = _small_matrix_rows(agreement_matrix, validate)
+    if rows is None:
+        table = as_agreement_table(agreement_matrix, validate=validate)
+
+        sum_am = table.total.astype(float)
+
+        with errstate(divide='ignore', invalid='ignore'):
+            p_a = table.diagonal.sum(axis=-1)/sum_am
+
+            p_e = (table.row_sums*table.col_sums).sum(axis=-1)/(sum_am**2)
+
+            value = (p_a-p_e)/(1-p_e)
+    else:
+        sum_am, diagonal, row_sums, col_sums = _small_statistics(rows)
+        sum_am = float(sum_am)
+
+        p_a = sum(diagonal)/sum_am
+
+        p_e = sum(row_sum*col_sum
+                  for row_sum, col_sum in zip(row_sums, col_sums))/sum_am**2
+
+        value = (p_a-p_e)/(1-p_e) if p_e != 1 else nan
+
+    return restrict_to_domain(value, p_e != 1,
+                              "The agreement probability by chance " +
+                              "of the matrix is 1")
+
+
+def cohen_kappa_from_ratings(ratings_a, ratings_b, labels=None,
+                             weights=None):
+    r"""Evaluate Cohen's :math:`\kappa` from the ratings of two raters
+
+    Compute the :ref:`CohenKappa_theory` of the agreement matrix of the
+    ratings ratings_a and ratings_b of two raters (see
+    :func:`pyagree.agreement_matrix_from_ratings`).
+
+    :param ratings_a: The ratings of the first rater
+    :type ratings_a: :class:`numpy.ndarray`
+    :param ratings_b: The ratings of the second rater
+    :type ratings_b: :class:`numpy.ndarray`
+    :param labels: The sequence of labels or a label vocabulary
+    :type labels: Iterable object or :class:`pyagree.LabelVocabulary`
+    :param weights: The weights of the items
+    :type weights: :class:`numpy.ndarray`
+    :returns: The Cohen's :math:`\kappa` of the ratings
     :rtype: :class:`float`
     :raises: :class:`ValueError`
     """
 
-    if isinstance(agreement_matrix, list):
-        agreement_matrix = matrix(agreement_matrix)
+    agreement_matrix = agreement_matrix_from_ratings(ratings_a, ratings_b,
+                                                     labels, weights)
+
+    return cohen_kappa(agreement_matrix)
+
+
+def _scheme_distances(k, scheme, differences):
+    r"""Evaluate the disagreement weights of a weighting scheme
+
+    The disagreement weight of two categories is 1 minus their agreement
+    weight.
+
+    :param k: The number of categories
+    :type k: :class:`int`
+    :param scheme: Either `'linear'` or `'quadratic'`
+    :type scheme: :class:`str`
+    :param differences: The differences between the category indices
+    :type differences: :class:`numpy.ndarray`
+    :returns: The disagreement weights of differences
+    :rtype: :class:`numpy.ndarray`
+    :raises: :class:`ValueError`
+    """
+    distances = np_abs(differences)/(k-1)
+
+    if scheme == 'linear':
+        return distances
 
-    test_agreement_matrix(agreement_matrix)
+    if scheme == 'quadratic':
+        return distances**2
 
-    k = agreement_matrix.shape[0]
+    raise ValueError("Unknown weighting scheme {}".format(scheme))
 
-    sum_am = agreement_matrix.sum()
 
-    p_a = sum(agreement_matrix[i, i] for i in range(k))/sum_am
+@lru_cache(maxsize=32)
+def _agreement_weights(k, scheme):
+    r"""Build the agreement weights of a weighting scheme
 
-    p_e = sum(agreement_matrix[i, :].sum()*agreement_matrix[:, i].sum()
-              for i in range(k))/(sum_am**2)
+    The weight matrices of the last 32 pairs of k and scheme are cached
+    and shared, hence, they are read-only.
 
-    if p_e == 1:
-        raise ValueError("The agreement probability by chance of the " +
-                         "matrix is 1")
+    :param k: The number of categories
+    :type k: :class:`int`
+    :param scheme: Either `'linear'` or `'quadratic'`
+    :type scheme: :class:`str`
+    :returns: The :math:`k \times k`-matrix of the agreement weights
+    :rtype: :class:`numpy.ndarray`
+    :raises: :class:`ValueError`
+    """
+    weights = 1-_scheme_distances(k, scheme,
+                                  arange(k)[:, None]-arange(k)[None, :])
 
-    return (p_a-p_e)/(1-p_e)
+    weights.flags.writeable = False
 
+    return weights
 
-def scott_pi(agreement_matrix):
+
+def _expected_distance(scheme, row_sums, col_sums):
+    r"""Evaluate the disagreement weighted sum of the products of the margins
+
+    Compute :math:`\sum_{i,j} D[i,j]*r_i*c_j`, where :math:`D` is the
+    matrix of the disagreement weights of scheme, in linear time in the
+    number of categories by means of the moments of the margins.
+
+    :param scheme: Either `'linear'` or `'quadratic'`
+    :type scheme: :class:`str`
+    :param row_sums: The row sums :math:`r` of an agreement matrix
+    :type row_sums: :class:`numpy.ndarray`
+    :param col_sums: The column sums :math:`c` of an agreement matrix
+    :type col_sums: :class:`numpy.ndarray`
+    :returns: The weighted sum of the products of the margins
+    :rtype: :class:`float`
+    """
+    k = len(row_sums)
+    positions = arange(k, dtype=float)
+
+    if scheme == 'quadratic':
+        return (row_sums.sum()*(col_sums*positions**2).sum() +
+                col_sums.sum()*(row_sums*positions**2).sum() -
+                2*(row_sums*positions).sum() *
+                (col_sums*positions).sum())/(k-1)**2
+
+    # sum_j |i-j|*c_j splits into the columns below and above the i-th one
+    counts = cumsum(col_sums)
+    moments = cumsum(col_sums*positions)
+    below = positions*(counts-col_sums)-(moments-col_sums*positions)
+    above = (moments[-1]-moments)-positions*(counts[-1]-counts)
+
+    return (row_sums*(below+above)).sum()/(k-1)
+
+
+@profiled()
+def weighted_kappa(agreement_matrix, scheme='linear', validate=True):
+    r"""Evaluate the weighted Cohen's :math:`\kappa`
+
+    Compute the :ref:`WeightedKappa_theory` of agreement_matrix, whose
+    rows and columns must follow the order of the categories. The scheme
+    is either `'linear'`, `'quadratic'`, or an :math:`n \times n`-matrix
+    of agreement weights :math:`W`. The linear and quadratic weight
+    matrices are built once per number of categories and cached, but for
+    sparse matrices (see :class:`pyagree.AgreementTable`), which are
+    evaluated in time linear in the number of their non-null elements
+    and rows without building any weight matrix.
+
+    Whenever agreement_matrix is a :math:`T \times n \times n`-array,
+    i.e., a stack of :math:`T` agreement matrices, the measure is
+    evaluated on all of them at once by contracting the whole stack
+    with :math:`W` and the :math:`T`-array of the results is returned.
+    The matrices out of the measure domain, null matrices included, are
+    evaluated as :data:`numpy.nan`.
+
+    :param agreement_matrix: An :math:`n \times n`-agreement matrix or a
+                             stack of them
+    :type agreement_matrix: :class:`numpy.ndarray` or
+                            :class:`pyagree.AgreementTable`
+    :param scheme: The weighting scheme or the matrix of the weights
+    :type scheme: :class:`str` or :class:`numpy.ndarray`
+    :param validate: Whether agreement_matrix must be validated
+    :type validate: :class:`bool`
+    :returns: The weighted Cohen's :math:`\kappa` of agreement_matrix
+    :rtype: :class:`float` or :class:`numpy.ndarray`
+    :raises: :class:`ValueError`
+    """
+
+    table = as_agreement_table(agreement_matrix, validate=validate)
+
+    k = table.size
+
+    sum_am = table.total.astype(float)
+
+    if isinstance(scheme, str) and k < 2:
+        raise ValueError("The matrix has less than 2 rows and columns")
+
+    if isinstance(scheme, str) and table.is_sparse:
+        rows, cols, values = table.cells
+        observed = sum_am-(_scheme_distances(k, scheme, rows-cols) *
+                           values).sum()
+        expected = sum_am**2-_expected_distance(scheme, table.row_sums,
+                                                table.col_sums)
+    else:
+        if isinstance(scheme, str):
+            weights = _agreement_weights(k, scheme)
+        else:
+            weights = asarray(scheme)
+            if weights.shape != (k, k):
+                raise ValueError("The weight matrix and the agreement " +
+                                 "matrix must have the same shape")
+
+        observed = table.weighted_sum(weights)
+        expected = einsum('...i,ij,...j->...', table.row_sums, weights,
+                          table.col_sums)
+
+    with errstate(divide='ignore', invalid='ignore'):
+        p_a = observed/sum_am
+
+        p_e = expected/(sum_am**2)
+
+        return restrict_to_domain((p_a-p_e)/(1-p_e), p_e != 1,
+                                  "The weighted agreement probability by " +
+                                  "chance of the matrix is 1")
+
+
+def weighted_kappa_from_ratings(ratings_a, ratings_b, labels=None,
+                                weights=None, scheme='linear'):
+    r"""Evaluate the weighted Cohen's :math:`\kappa` from ratings
+
+    Compute the :ref:`WeightedKappa_theory` of the agreement matrix of
+    the ratings ratings_a and ratings_b of two raters (see
+    :func:`pyagree.agreement_matrix_from_ratings`). The meaning of
+    scheme is the same as in :func:`weighted_kappa`.
+
+    Since the weights depend on the order of the categories, labels
+    should list all the categories in their order whenever the sorted
+    labels used by the raters do not.
+
+    :param ratings_a: The ratings of the first rater
+    :type ratings_a: :class:`numpy.ndarray`
+    :param ratings_b: The ratings of the second rater
+    :type ratings_b: :class:`numpy.ndarray`
+    :param labels: The sequence of labels or a label vocabulary
+    :type labels: Iterable object or :class:`pyagree.LabelVocabulary`
+    :param weights: The weights of the items
+    :type weights: :class:`numpy.ndarray`
+    :param scheme: The weighting scheme or the matrix of the weights
+    :type scheme: :class:`str` or :class:`numpy.ndarray`
+    :returns: The weighted Cohen's :math:`\kappa` of the ratings
+    :rtype: :class:`float`
+    :raises: :class:`ValueError`
+    """
+
+    agreement_matrix = agreement_matrix_from_ratings(ratings_a, ratings_b,
+                                                     labels, weights)
+
+    return weighted_kappa(agreement_matrix, scheme)
+
+
+@profiled()
+def scott_pi(agreement_matrix, validate=True):
     r"""Evaluate Scott's :math:`\pi`
 
     Compute the :ref:`ScottPi_theory` of agreement_matrix.
 
-    :param agreement_matrix: An :math:`n \times n`-agreement matrix
-    :type agreement_matrix: :class:`numpy.ndarray`
+    Whenever agreement_matrix is a :math:`T \times n \times n`-array,
+    i.e., a stack of :math:`T` agreement matrices, the measure is
+    evaluated on all of them at once and the :math:`T`-array of the
+    results is returned. The matrices out of the measure domain, null
+    matrices included, are evaluated as :data:`numpy.nan`.
+
+    :param agreement_matrix: An :math:`n \times n`-agreement matrix or a
+                             stack of them
+    :type agreement_matrix: :class:`numpy.ndarray` or
+                            :class:`pyagree.AgreementTable`
+    :param validate: Whether agreement_matrix must be validated
+    :type validate: :class:`bool`
 
     :returns: The Scott's :math:`\pi` of agreement_matrix
-    :rtype: :class:`float`
+    :rtype: :class:`float` or :class:`numpy.ndarray`
     :raises: :class:`ValueError`
     """
 
-    if isinstance(agreement_matrix, list):
-        agreement_matrix = matrix(agreement_matrix)
+    rows = _small_matrix_rows(agreement_matrix, validate)
+    if rows is None:
+        table = as_agreement_table(agreement_matrix, validate=validate)
+
+        sum_am2 = 2*table.total.astype(float)
+
+        with errstate(divide='ignore', invalid='ignore'):
+            p_e = (((table.row_sums+table.col_sums) /
+                    sum_am2[..., None])**2).sum(axis=-1)
+            p_a = 2*table.diagonal.sum(axis=-1)/sum_am2
+
+            value = (p_a-p_e)/(1-p_e)
+    else:
+        sum_am2, diagonal, row_sums, col_sums = _small_statistics(rows)
+        sum_am2 = 2*float(sum_am2)
+
+        p_e = sum(((row_sum+col_sum)/sum_am2)**2
+                  for row_sum, col_sum in zip(row_sums, col_sums))
+        p_a = 2*sum(diagonal)/sum_am2
+
+        value = (p_a-p_e)/(1-p_e) if p_e != 1 else nan
+
+    return restrict_to_domain(value, p_e != 1,
+                              "The sum of the squared joint " +
+                              "proportions of the matrix is 1")
+
+
+def scott_pi_from_ratings(ratings_a, ratings_b, labels=None,
+                          weights=None):
+    r"""Evaluate Scott's :math:`\pi` from the ratings of two raters
 
-    test_agreement_matrix(agreement_matrix)
+    Compute the :ref:`ScottPi_theory` of the agreement matrix of the
+    ratings ratings_a and ratings_b of two raters (see
+    :func:`pyagree.agreement_matrix_from_ratings`).
 
-    sum_am2 = 2*agreement_matrix.sum()
-    p_e = sum(((agreement_matrix[i, :].sum() +
-                agreement_matrix[:, i].sum()) / sum_am2)**2
-              for i in range(agreement_matrix.shape[0]))
-    p_a = 2*sum(agreement_matrix[i, i]
-                for i in range(agreement_matrix.shape[0]))/sum_am2
+    :param ratings_a: The ratings of the first rater
+    :type ratings_a: :class:`numpy.ndarray`
+    :param ratings_b: The ratings of the second rater
+    :type ratings_b: :class:`numpy.ndarray`
+    :param labels: The sequence of labels or a label vocabulary
+    :type labels: Iterable object or :class:`pyagree.LabelVocabulary`
+    :param weights: The weights of the items
+    :type weights: :class:`numpy.ndarray`
+    :returns: The Scott's :math:`\pi` of the ratings
+    :rtype: :class:`float`
+    :raises: :class:`ValueError`
+    """
 
-    if p_e == 1:
-        raise ValueError("The sum of the squared joint proportions of " +
-                         "the matrix is 1")
+    agreement_matrix = agreement_matrix_from_ratings(ratings_a, ratings_b,
+                                                     labels, weights)
 
-    return (p_a-p_e)/(1-p_e)
+    return scott_pi(agreement_matrix)
 
 
-def yule_y(agreement_matrix):
+@profiled()
+def yule_y(agreement_matrix, validate=True):
     r"""Evaluate Yule's :math:`Y`
 
     Compute the :ref:`YuleY_theory` of a :math:`2 \times 2`-agreement
     matrix agreement_matrix.
 
-    :param agreement_matrix: A :math:`2 \times 2`-agreement matrix
-    :type agreement_matrix: :class:`numpy.ndarray`
+    Whenever agreement_matrix is a :math:`T \times 2 \times 2`-array,
+    i.e., a stack of :math:`T` agreement matrices, the measure is
+    evaluated on all of them at once and the :math:`T`-array of the
+    results is returned. The matrices out of the measure domain, null
+    matrices included, are evaluated as :data:`numpy.nan`.
+
+    :param agreement_matrix: A :math:`2 \times 2`-agreement matrix or a
+                             stack of them
+    :type agreement_matrix: :class:`numpy.ndarray` or
+                            :class:`pyagree.AgreementTable`
+    :param validate: Whether agreement_matrix must be validated
+    :type validate: :class:`bool`
 
     :returns: The Yule :math:`Y` of agreement_matrix
+    :rtype: :class:`float` or :class:`numpy.ndarray`
+    :raises: :class:`ValueError`
+    """
+
+    rows = _small_matrix_rows(agreement_matrix, validate)
+    if rows is None:
+        table = as_agreement_table(agreement_matrix, validate=validate)
+
+        if table.size != 2:
+            raise ValueError("The agreement matrix must be a 2x2-matrix")
+
+        a_00 = table.diagonal[..., 0]
+        a_11 = table.diagonal[..., 1]
+        a_01 = table.row_sums[..., 0]-a_00
+        a_10 = table.row_sums[..., 1]-a_11
+
+        with errstate(divide='ignore', invalid='ignore'):
+            sqrt_odd_r = sqrt(a_00/a_01/a_10*a_11)
+            value = (sqrt_odd_r-1)/(sqrt_odd_r+1)
+
+        domain = (a_01 != 0) & (a_10 != 0)
+    else:
+        if len(rows) != 2:
+            raise ValueError("The agreement matrix must be a 2x2-matrix")
+
+        (a_00, a_01), (a_10, a_11) = rows
+
+        domain = a_01 != 0 and a_10 != 0
+        if domain:
+            sqrt_odd_r = math_sqrt(a_00/a_01/a_10*a_11)
+            value = (sqrt_odd_r-1)/(sqrt_odd_r+1)
+        else:
+            value = nan
+
+    return restrict_to_domain(value, domain,
+                              "Some elements outside the main " +
+                              "diagonal are 0")
+
+
+def yule_y_from_ratings(ratings_a, ratings_b, labels=None,
+                        weights=None):
+    r"""Evaluate Yule's :math:`Y` from the ratings of two raters
+
+    Compute the :ref:`YuleY_theory` of the agreement matrix of the
+    ratings ratings_a and ratings_b of two raters (see
+    :func:`pyagree.agreement_matrix_from_ratings`).
+
+    The ratings must use exactly two labels.
+
+    :param ratings_a: The ratings of the first rater
+    :type ratings_a: :class:`numpy.ndarray`
+    :param ratings_b: The ratings of the second rater
+    :type ratings_b: :class:`numpy.ndarray`
+    :param labels: The sequence of labels or a label vocabulary
+    :type labels: Iterable object or :class:`pyagree.LabelVocabulary`
+    :param weights: The weights of the items
+    :type weights: :class:`numpy.ndarray`
+    :returns: The Yule :math:`Y` of the ratings
     :rtype: :class:`float`
     :raises: :class:`ValueError`
     """
 
-    if isinstance(agreement_matrix, list):
-        agreement_matrix = matrix(agreement_matrix)
+    agreement_matrix = agreement_matrix_from_ratings(ratings_a, ratings_b,
+                                                     labels, weights)
+
+    return yule_y(agreement_matrix)
+
+
+def _fleiss_statistics(classification_matrix, validate, block_size,
+                       n_jobs):
+    r"""Reduce a classification matrix to the totals of the categories and
+    the sum of its squared elements block by block
+
+    :param classification_matrix: An :math:`N \times k`-classification matrix
+    :type classification_matrix: class:`numpy.ndarray`
+    :param validate: Whether classification_matrix must be validated
+    :type validate: :class:`bool`
+    :param block_size: The number of rows per block
+    :type block_size: :class:`int`
+    :param n_jobs: The number of threads reducing the blocks
+    :type n_jobs: :class:`int`
+    :returns: The totals of the categories and the sum of the squared
+              elements of classification_matrix
+    :rtype: :class:`tuple`
+    :raises: :class:`ValueError`
+    """
+    validate = validate and _may_be_negative(classification_matrix)
+
+    def reduce_block(begin):
+        block = classification_matrix[begin:begin+block_size]
 
-    test_agreement_matrix(agreement_matrix)
+        if validate and np_any(block < 0):
+            raise ValueError("The matrix contains some negative values")
 
-    if agreement_matrix.shape[0] != 2:
-        raise ValueError("The agreement matrix must be a 2x2-matrix")
+        return block.sum(axis=0), multiply(block, block,
+                                           dtype=_wide_type(block)).sum()
 
-    odd_r = 1
-    for i in range(agreement_matrix.shape[0]):
-        for j in range(agreement_matrix.shape[1]):
-            if i == j:
-                odd_r *= agreement_matrix[i, j]
-            else:
-                if agreement_matrix[i, j] == 0:
-                    raise ValueError("Some elements outside the main " +
-                                     "diagonal are 0")
-                odd_r /= agreement_matrix[i, j]
+    statistics = _thread_map(reduce_block,
+                             list(range(0, classification_matrix.shape[0],
+                                        block_size)), n_jobs)
 
-    sqrt_odd_r = sqrt(odd_r)
+    # the blocks are merged in order, whatever thread reduced them
+    category_totals = 0
+    sum_of_squares = 0
+    for block_totals, block_squares in statistics:
+        category_totals = category_totals + block_totals
+        sum_of_squares = sum_of_squares + block_squares
 
-    return (sqrt_odd_r-1)/(sqrt_odd_r+1)
+    return category_totals, sum_of_squares
 
 
-def fleiss_kappa(classification_matrix):
+@profiled()
+def fleiss_kappa(classification_matrix, validate=True, block_size=None,
+                 n_jobs=None):
     r"""Evaluate Fleiss's :math:`\kappa`
 
     Compute the :ref:`FleissKappa_theory` of a classification
     matrix classification_matrix.
 
-    :param classification_matrix: An :math:`N \times k`-classification matrix
-    :type classification_matrix: class:`numpy.ndarray`
+    The classification matrix can also be a :class:`numpy.memmap` or the
+    path of a `.npy` file, which is memory-mapped. In these cases, the
+    matrix is reduced to the sufficient statistics of Fleiss's
+    :math:`\kappa` (see :func:`fleiss_kappa_from_statistics`) over blocks
+    of block_size rows, so that at most one block is loaded in memory at
+    any time; by default, each block contains at most :math:`2^{22}`
+    elements. The blocks are used for in-memory matrices too whenever
+    block_size is provided. On integer counts, the result does not depend
+    on the blocks.
+
+    Whenever n_jobs is greater than 1, the blocks are reduced
+    concurrently by n_jobs threads, which run in parallel because NumPy
+    reductions release the GIL, and their statistics are merged in the
+    block order; by default, in-memory matrices are split in n_jobs
+    blocks. The result only depends on the blocks, not on n_jobs.
+
+    :param classification_matrix: An :math:`N \times k`-classification
+                                  matrix or the path of a `.npy` file
+                                  storing it
+    :type classification_matrix: class:`numpy.ndarray` or :class:`str`
+    :param validate: Whether classification_matrix must be validated
+    :type validate: :class:`bool`
+    :param block_size: The number of rows per block
+    :type block_size: :class:`int`
+    :param n_jobs: The number of threads
+    :type n_jobs: :class:`int`
 
     :returns: The Fleiss's :math:`\kappa` of classification_matrix
     :rtype: :class:`float`
     :raises: :class:`ValueError`
     """
 
-    if isinstance(classification_matrix, list):
-        classification_matrix = matrix(classification_matrix)
+    if isinstance(classification_matrix, (str, PathLike)):
+        classification_matrix = load(classification_matrix, mmap_mode='r')
+
+    is_mapped = isinstance(classification_matrix, memmap)
+    classification_matrix = as_count_array(classification_matrix)
+
+    if classification_matrix.ndim != 2:
+        raise ValueError("The classification matrix must be an N x k-matrix")
+
+    dataset_size, num_of_categories = classification_matrix.shape
+
+    if block_size is None:
+        if is_mapped:
+            block_size = max(1, 2**22//max(1, num_of_categories))
+        else:
+            block_size = max(1, dataset_size)
+
+        if n_jobs is not None and n_jobs > 1:
+            block_size = min(block_size, max(1, -(-dataset_size//n_jobs)))
 
-    if np_any(classification_matrix < 0):
-        raise ValueError("The matrix contains some negative values")
+    if block_size < 1:
+        raise ValueError("The blocks must contain at least one row")
+
+    category_totals, sum_of_squares = _fleiss_statistics(
+        classification_matrix, validate, block_size, n_jobs)
 
-    dataset_size = classification_matrix.shape[0]
-    num_of_classes = classification_matrix.shape[1]
     num_of_raters = classification_matrix[0, :].sum()
 
+    return fleiss_kappa_from_statistics(category_totals, sum_of_squares,
+                                        dataset_size, num_of_raters)
+
+
+def fleiss_kappa_from_statistics(category_totals, sum_of_squares,
+                                 dataset_size, num_of_raters):
+    r"""Evaluate Fleiss's :math:`\kappa` from its sufficient statistics
+
+    Compute the :ref:`FleissKappa_theory` of a classification matrix
+    :math:`C` from its sufficient statistics, i.e., the totals of the
+    categories :math:`\sum_{i} C[i,j]`, the sum of the squared elements
+    :math:`\sum_{i} \sum_{j} C[i,j]^2`, the number of items :math:`N`, and
+    the number of raters :math:`n`. These statistics are additive over the
+    rows of :math:`C` and, thus, they can be collected without building
+    :math:`C` at all.
+
+    The statistics can also be arrays whose elements refer to different
+    classification matrices, e.g., resamples of the same data; in such a
+    case, the category totals are stored along the last axis of
+    category_totals and the array of Fleiss's :math:`\kappa` is returned.
+
+    :param category_totals: The totals of the categories
+    :type category_totals: :class:`numpy.ndarray`
+    :param sum_of_squares: The sum of the squared elements of the matrix
+    :type sum_of_squares: :class:`int` or :class:`numpy.ndarray`
+    :param dataset_size: The number of items :math:`N`
+    :type dataset_size: :class:`int` or :class:`numpy.ndarray`
+    :param num_of_raters: The number of raters :math:`n`
+    :type num_of_raters: :class:`int`
+    :returns: The Fleiss's :math:`\kappa` of the statistics
+    :rtype: :class:`float` or :class:`numpy.ndarray`
+    """
+
     d_n = dataset_size*num_of_raters
 
-    p_0 = (multiply(classification_matrix,
-                    classification_matrix).sum()-d_n)/(d_n*(num_of_raters-1))
+    p_0 = (sum_of_squares-d_n)/(d_n*(num_of_raters-1))
 
-    p_e = sum((classification_matrix[:, j].sum()/d_n)**2
-              for j in range(num_of_classes))
+    p_e = ((asarray(category_totals)/d_n)**2).sum(axis=-1)
 
     return (p_0-p_e)/(1-p_e)
+
+
+def fleiss_kappa_from_ratings(ratings, labels=None):
+    r"""Evaluate Fleiss's :math:`\kappa` from the ratings of some raters
+
+    Compute the :ref:`FleissKappa_theory` of the classification matrix of
+    the :math:`N \times n`-array ratings, whose element in position
+    :math:`(i, j)` is the rating given by the :math:`j`-th rater to the
+    :math:`i`-th item (see
+    :func:`pyagree.classification_matrix_from_ratings`).
+
+    :param ratings: An :math:`N \times n`-array of ratings
+    :type ratings: :class:`numpy.ndarray`
+    :param labels: The sequence of labels or a label vocabulary
+    :type labels: Iterable object or :class:`pyagree.LabelVocabulary`
+    :returns: The Fleiss's :math:`\kappa` of the ratings
+    :rtype: :class:`float`
+    :raises: :class:`ValueError`
+    """
+
+    return fleiss_kappa(classification_matrix_from_ratings(ratings, labels))
+
+
+def _krippendorff_distances(metric, category_totals, labels):
+    r"""Build the squared distances of a Krippendorff's metric
+
+    :param metric: Either `'nominal'`, `'ordinal'`, or `'interval'`
+    :type metric: :class:`str`
+    :param category_totals: The row sums of the coincidence matrix
+    :type category_totals: :class:`numpy.ndarray`
+    :param labels: The labels of the categories
+    :type labels: :class:`numpy.ndarray`
+    :returns: The matrix of the squared distances between the categories
+    :rtype: :class:`numpy.ndarray`
+    :raises: :class:`ValueError`
+    """
+    k = len(category_totals)
+
+    if metric == 'nominal':
+        return 1-(arange(k)[:, None] == arange(k)[None, :])
+
+    if metric == 'ordinal':
+        # the number of values from the c-th to the h-th category, c <= h,
+        # minus half of the c-th and of the h-th ones
+        cumulative = cumsum(category_totals)
+        spans = (cumulative[None, :]-cumulative[:, None] +
+                 (category_totals[:, None]-category_totals[None, :])/2)
+        spans = triu(spans)
+        return (spans+spans.T)**2
+
+    if metric == 'interval':
+        if not issubdtype(labels.dtype, number):
+            raise ValueError("The interval metric requires numeric labels")
+        values = labels.astype(float)
+        return (values[:, None]-values[None, :])**2
+
+    raise ValueError("Unknown metric {}".format(metric))
+
+
+@profiled()
+def krippendorff_alpha(ratings, metric='nominal', labels=None):
+    r"""Evaluate Krippendorff's :math:`\alpha`
+
+    Compute the :ref:`KrippendorffAlpha_theory` of the
+    :math:`N \times n`-array ratings, whose element in position
+    :math:`(i, j)` is the rating given by the :math:`j`-th rater to the
+    :math:`i`-th item, or a missing value, i.e., a masked element,
+    :data:`numpy.nan`, or `None`, whenever the rater did not rate the
+    item. Hence, the raters may rate different numbers of items and the
+    items may be rated by different numbers of raters.
+
+    The metric is either `'nominal'`, `'ordinal'`, or `'interval'`. The
+    ordinal and interval metrics rely on the order of the labels: the
+    sorted labels occurring in ratings whenever labels is `None` and the
+    order of labels otherwise. The interval metric also requires numeric
+    labels.
+
+    The measure is evaluated on the coincidence matrix of ratings (see
+    :func:`pyagree.coincidence_matrix_from_ratings`), which is built in
+    linear time in the number of observed ratings.
+
+    :param ratings: An :math:`N \times n`-array of ratings, possibly masked
+    :type ratings: :class:`numpy.ndarray` or :class:`numpy.ma.MaskedArray`
+    :param metric: The metric of the ratings
+    :type metric: :class:`str`
+    :param labels: The sequence of labels or a label vocabulary
+    :type labels: Iterable object or :class:`pyagree.LabelVocabulary`
+    :returns: The Krippendorff's :math:`\alpha` of ratings
+    :rtype: :class:`float`
+    :raises: :class:`ValueError`
+    """
+
+    if labels is None:
+        labels = LabelVocabulary.from_ratings(_observed_ratings(ratings)[1])
+    else:
+        labels = as_label_vocabulary(labels)
+
+    coincidences = coincidence_matrix_from_ratings(ratings, labels)
+
+    category_totals = coincidences.sum(axis=1)
+    total = category_totals.sum()
+
+    distances = _krippendorff_distances(metric, category_totals,
+                                        labels.labels)
+
+    disagreement = (coincidences*distances).sum()
+    expected = (category_totals[:, None]*category_totals[None, :] *
+                distances).sum()
+
+    if expected == 0:
+        raise ValueError("The expected disagreement of the ratings is 0")
+
+    return 1-(total-1)*disagreement/expected
@@ -0,0 +1,408 @@
+"""This file contains the implementation of agreement tables, i.e., agreement
+   matrices equipped with their sufficient statistics.
+
+.. moduleauthor:: Alberto Casagrande <acasagrande@units.it>
+
+"""
+
+from numpy import asarray, errstate, bincount, zeros, fromiter, einsum, add
+from numpy import any as np_any
+
+from .common import test_agreement_matrix, test_agreement_matrices
+from .common import as_count_array, _wide_type
+from .inf_theory import entropy_array
+from .profiling import profile_stage
+
+
+def _sparse_cells(agreement_matrix, size, validate):
+    r"""Collect the non-null cells of a sparse agreement matrix
+
+    :param agreement_matrix: A SciPy sparse matrix or a dictionary mapping
+                             the pairs :math:`(i, j)` to the values of the
+                             corresponding elements
+    :type agreement_matrix: :class:`dict` or :mod:`scipy.sparse` matrix
+    :param size: The number of rows and columns of the matrix or `None`
+    :type size: :class:`int`
+    :param validate: Whether the cells must be validated
+    :type validate: :class:`bool`
+    :returns: The rows, the columns, and the values of the cells and the
+              number of rows and columns of the matrix
+    :rtype: :class:`tuple`
+    :raises: :class:`ValueError`
+    """
+    if isinstance(agreement_matrix, dict):
+        num_of_cells = len(agreement_matrix)
+        rows = fromiter((i for i, _ in agreement_matrix), dtype=int,
+                        count=num_of_cells)
+        cols = fromiter((j for _, j in agreement_matrix), dtype=int,
+                        count=num_of_cells)
+        values = asarray(list(agreement_matrix.values()))
+        if size is None:
+            size = max(rows.max(initial=-1), cols.max(initial=-1))+1
+    else:
+        cells = agreement_matrix.tocoo(copy=True)
+        cells.sum_duplicates()
+        rows, cols, values = cells.row, cells.col, cells.data
+        if cells.shape[0] != cells.shape[1] or \
+                (size is not None and size != cells.shape[0]):
+            raise ValueError("The matrix is not a square matrix")
+        size = cells.shape[0]
+
+    if size == 0:
+        raise ValueError("The matrix is empty")
+
+    if not validate:
+        return (rows, cols, values), size
+
+    if np_any(rows < 0) or np_any(cols < 0) or \
+            np_any(rows >= size) or np_any(cols >= size):
+        raise ValueError("Some cells are out of the matrix")
+
+    if np_any(values < 0):
+        raise ValueError("The matrix contains some negative values")
+
+    if not np_any(values):
+        raise ValueError("The matrix is null")
+
+    return (rows, cols, values), size
+
+
+class AgreementTable:
+    r"""An agreement matrix together with its sufficient statistics
+
+    An agreement table wraps either an :math:`n \times n`-agreement matrix
+    or a :math:`T \times n \times n`-stack of agreement matrices. The
+    wrapped object is validated once, when the table is built, and the
+    statistics required by the agreement measures, i.e., the total, the
+    diagonal, the row and column sums, and the row, column and cell
+    entropies, are lazily evaluated and cached on their first use. Hence,
+    evaluating many measures on the same table does not repeat this work.
+
+    Whenever the table wraps a stack of matrices, all the statistics are
+    arrays indexed by the position of the matrices in the stack.
+
+    The table can also wrap a sparse agreement matrix, i.e., either a
+    SciPy sparse matrix, in any format, or a dictionary mapping the pairs
+    :math:`(i, j)` to the values of the non-null elements. In the latter
+    case, size is the number of rows and columns of the matrix and, when
+    it is `None`, the matrix is the smallest one containing all the
+    cells. The statistics of a sparse matrix are evaluated in time
+    linear in the number of its non-null elements and rows, and the
+    dense matrix is only built when :attr:`matrix` is accessed.
+
+    The wrapped matrix is exposed as a read-only array and it must not be
+    modified through other references after the table has been built.
+    Dense matrices are accessed without copies whenever they are arrays or
+    objects supporting the buffer protocol, e.g., read-only
+    :class:`memoryview` objects, and the type of their elements is
+    preserved.
+
+    Whenever validate is `False`, the matrix is trusted to be an
+    agreement matrix, or a stack of them, and the validation scans are
+    skipped. Trusting an invalid matrix leads to meaningless results.
+
+    :param agreement_matrix: An :math:`n \times n`-agreement matrix, a
+                             stack of them, or a sparse agreement matrix
+    :type agreement_matrix: :class:`numpy.ndarray`, :class:`dict`, or
+                            :mod:`scipy.sparse` matrix
+    :param size: The number of rows and columns of a sparse matrix
+    :type size: :class:`int`
+    :param validate: Whether the matrix must be validated
+    :type validate: :class:`bool`
+    :raises: :class:`ValueError`
+    """
+
+    __slots__ = ('_matrix', '_cells', '_size', '_total', '_diagonal',
+                 '_row_sums', '_col_sums', '_row_entropy', '_col_entropy',
+                 '_cell_entropy')
+
+    def __init__(self, agreement_matrix, size=None, validate=True):
+        if isinstance(agreement_matrix, dict) or \
+                hasattr(agreement_matrix, 'tocoo'):
+            self._cells, self._size = _sparse_cells(agreement_matrix, size,
+                                                    validate)
+            self._matrix = None
+        else:
+            agreement_matrix = as_count_array(agreement_matrix).view()
+
+            if validate:
+                if agreement_matrix.ndim > 2:
+                    test_agreement_matrices(agreement_matrix)
+                else:
+                    test_agreement_matrix(agreement_matrix)
+
+            agreement_matrix.flags.writeable = False
+
+            self._cells = None
+            self._size = agreement_matrix.shape[-1]
+            self._matrix = agreement_matrix
+
+        self._total = None
+        self._diagonal = None
+        self._row_sums = None
+        self._col_sums = None
+        self._row_entropy = None
+        self._col_entropy = None
+        self._cell_entropy = None
+
+    @property
+    def matrix(self):
+        r"""The wrapped agreement matrix or stack of agreement matrices
+
+        Sparse matrices are converted into dense arrays on the first
+        access.
+
+        :rtype: :class:`numpy.ndarray`
+        """
+        if self._matrix is None:
+            rows, cols, values = self._cells
+            matrix = zeros((self._size, self._size), dtype=values.dtype)
+            matrix[rows, cols] = values
+            matrix.flags.writeable = False
+
+            self._matrix = matrix
+
+        return self._matrix
+
+    @property
+    def size(self):
+        r"""The number of rows and columns of the agreement matrices
+
+        :rtype: :class:`int`
+        """
+        return self._size
+
+    @property
+    def is_stack(self):
+        r"""Whether the table wraps a stack of agreement matrices
+
+        :rtype: :class:`bool`
+        """
+        return self._cells is None and self._matrix.ndim > 2
+
+    @property
+    def is_sparse(self):
+        r"""Whether the table wraps a sparse agreement matrix
+
+        :rtype: :class:`bool`
+        """
+        return self._cells is not None
+
+    @property
+    def cells(self):
+        r"""The non-null elements of the agreement matrix
+
+        The non-null elements are represented by the arrays of their rows,
+        of their columns, and of their values. Stacks of matrices have no
+        cells.
+
+        :rtype: :class:`tuple`
+        :raises: :class:`ValueError`
+        """
+        if self._cells is not None:
+            return self._cells
+
+        if self.is_stack:
+            raise ValueError("Stacks of agreement matrices have no cells")
+
+        rows, cols = self._matrix.nonzero()
+
+        return rows, cols, self._matrix[rows, cols]
+
+    @property
+    def total(self):
+        r"""The sum of all the elements of the agreement matrices
+
+        :rtype: :class:`int` or :class:`numpy.ndarray`
+        """
+        if self._total is None:
+            self._total = self.row_sums.sum(axis=-1)
+
+        return self._total
+
+    @property
+    def diagonal(self):
+        r"""The main diagonal of the agreement matrices
+
+        :rtype: :class:`numpy.ndarray`
+        """
+        if self._diagonal is None:
+            if self.is_sparse:
+                rows, cols, values = self._cells
+                on_diagonal = rows == cols
+                self._diagonal = self._cell_sums(rows[on_diagonal],
+                                                 values[on_diagonal])
+            else:
+                self._diagonal = self._matrix.diagonal(axis1=-2, axis2=-1)
+
+        return self._diagonal
+
+    @property
+    def row_sums(self):
+        r"""The sums of the rows of the agreement matrices
+
+        :rtype: :class:`numpy.ndarray`
+        """
+        if self._row_sums is None:
+            with profile_stage('AgreementTable.row_sums',
+                               self._num_of_elements()):
+                if self.is_sparse:
+                    self._row_sums = self._cell_sums(self._cells[0],
+                                                     self._cells[2])
+                else:
+                    self._row_sums = self._matrix.sum(axis=-1)
+
+        return self._row_sums
+
+    @property
+    def col_sums(self):
+        r"""The sums of the columns of the agreement matrices
+
+        :rtype: :class:`numpy.ndarray`
+        """
+        if self._col_sums is None:
+            with profile_stage('AgreementTable.col_sums',
+                               self._num_of_elements()):
+                if self.is_sparse:
+                    self._col_sums = self._cell_sums(self._cells[1],
+                                                     self._cells[2])
+                else:
+                    self._col_sums = self._matrix.sum(axis=-2)
+
+        return self._col_sums
+
+    @property
+    def row_entropy(self):
+        r"""The entropy of the probability distribution of the rows
+
+        This is the entropy of the distribution yielded by
+        :func:`pyagree.inf_theory.p_y`.
+
+        :rtype: :class:`float` or :class:`numpy.ndarray`
+        """
+        if self._row_entropy is None:
+            self._row_entropy = self._entropy(self.row_sums, -1)
+
+        return self._row_entropy
+
+    @property
+    def col_entropy(self):
+        r"""The entropy of the probability distribution of the columns
+
+        This is the entropy of the distribution yielded by
+        :func:`pyagree.inf_theory.p_x`.
+
+        :rtype: :class:`float` or :class:`numpy.ndarray`
+        """
+        if self._col_entropy is None:
+            self._col_entropy = self._entropy(self.col_sums, -1)
+
+        return self._col_entropy
+
+    @property
+    def cell_entropy(self):
+        r"""The entropy of the probability distribution of the elements
+
+        This is the entropy of the distribution yielded by
+        :func:`pyagree.inf_theory.p_xy`.
+
+        :rtype: :class:`float` or :class:`numpy.ndarray`
+        """
+        if self._cell_entropy is None:
+            if self.is_sparse:
+                self._cell_entropy = self._entropy(self._cells[2], -1)
+            else:
+                self._cell_entropy = self._entropy(self._matrix, (-2, -1))
+
+        return self._cell_entropy
+
+    def weighted_sum(self, weights):
+        r"""Evaluate the weighted sum of the elements of the agreement matrices
+
+        :param weights: An :math:`n \times n`-matrix of weights
+        :type weights: :class:`numpy.ndarray`
+        :returns: The sum of the elements of the agreement matrices
+                  multiplied by the corresponding weights
+        :rtype: :class:`float` or :class:`numpy.ndarray`
+        """
+        if self.is_sparse:
+            rows, cols, values = self._cells
+            return (weights[rows, cols]*values).sum()
+
+        return einsum('...ij,ij->...', self._matrix, weights)
+
+    def _num_of_elements(self):
+        r"""Return the number of stored elements of the agreement matrices
+
+        :returns: The number of non-null cells of sparse matrices and the
+                  number of elements of dense ones
+        :rtype: :class:`int`
+        """
+        if self.is_sparse:
+            return len(self._cells[2])
+
+        return self._matrix.size
+
+    def _cell_sums(self, indices, values):
+        r"""Sum the values of some sparse cells by index
+
+        :param indices: The row, or column, indices of the cells
+        :type indices: :class:`numpy.ndarray`
+        :param values: The values of the cells
+        :type values: :class:`numpy.ndarray`
+        :returns: The array of the sums of the values having the same index
+        :rtype: :class:`numpy.ndarray`
+        """
+        if values.dtype.kind in 'iub':
+            # integer counts are summed exactly, without float rounding
+            sums = zeros(self._size, dtype=_wide_type(values))
+            add.at(sums, indices, values)
+
+            return sums
+
+        return bincount(indices, weights=values, minlength=self._size)
+
+    def _entropy(self, counts, axis):
+        r"""Evaluate the entropies of some counts normalized by the total
+
+        :param counts: An array of counts
+        :type counts: :class:`numpy.ndarray`
+        :param axis: The axis, or the tuple of axes, along which the
+                     counts are normalized
+        :type axis: :class:`int` or :class:`tuple`
+        :returns: The entropies of the normalized counts
+        :rtype: :class:`float` or :class:`numpy.ndarray`
+        """
+        total = self.total
+        if self.is_stack:
+            total = total.reshape(total.shape + (1,)*(counts.ndim-total.ndim))
+
+        with profile_stage('AgreementTable.entropy', counts.size), \
+                errstate(divide='ignore', invalid='ignore'):
+            return entropy_array(counts/total, axis=axis)
+
+
+def as_agreement_table(agreement_matrix, size=None, validate=True):
+    r"""Wrap an agreement matrix in an agreement table
+
+    Return agreement_matrix itself whenever it already is an
+    :class:`AgreementTable` and a new :class:`AgreementTable` wrapping it
+    otherwise.
+
+    :param agreement_matrix: An agreement matrix, a stack of them, a
+                             sparse agreement matrix, or an agreement table
+    :type agreement_matrix: :class:`numpy.ndarray`, :class:`dict`,
+                            :mod:`scipy.sparse` matrix, or
+                            :class:`AgreementTable`
+    :param size: The number of rows and columns of a sparse matrix
+    :type size: :class:`int`
+    :param validate: Whether the matrix must be validated
+    :type validate: :class:`bool`
+    :returns: An agreement table for agreement_matrix
+    :rtype: :class:`AgreementTable`
+    :raises: :class:`ValueError`
+    """
+    if isinstance(agreement_matrix, AgreementTable):
+        return agreement_matrix
+
+    return AgreementTable(agreement_matrix, size, validate)
@@ -5,11 +5,48 @@ r"""This file contains the tests for the `pyagree` package.
 """
 
 import unittest
+from io import StringIO
+from contextlib import redirect_stdout, redirect_stderr
+from json import loads
+from os import path
+from tempfile import TemporaryDirectory
 
-from numpy import array
+from numpy import array, isnan, repeat, arange, array_equal, eye, nan
+from numpy import concatenate, zeros, allclose
+from numpy import shares_memory, save, load, matrix as np_matrix
+from numpy.ma import masked_invalid
 
 from pyagree import fleiss_kappa, yule_y, bangdiwala_b, bennett_s
-from pyagree import cohen_kappa, scott_pi, ia_c
+from pyagree import cohen_kappa, scott_pi, ia_c, weighted_kappa
+from pyagree import AgreementTable, agreement_report
+from pyagree import LabelVocabulary, agreement_matrix_from_ratings
+from pyagree import cohen_kappa_from_ratings, ia_c_from_ratings
+from pyagree import fleiss_kappa_from_ratings, AgreementAccumulator
+from pyagree import FleissAccumulator, fleiss_kappa_from_triples
+from pyagree import bootstrap_tables, bootstrap_replicates
+from pyagree import bootstrap_interval, fleiss_kappa_bootstrap_interval
+from pyagree import fleiss_kappa_bootstrap_replicates
+from pyagree import independence_tables, independence_test
+from pyagree import pairwise_agreement_matrices, pairwise_agreement
+from pyagree import krippendorff_alpha, coincidence_matrix_from_ratings
+from pyagree import AgreementMonitor, IAcState
+from pyagree import grouped_agreement, grouped_agreement_matrices
+from pyagree import Profiler, profile, enable_profiling, disable_profiling
+from pyagree import evaluate_stack, MeasureCache
+from pyagree import dichotomous_bennett_s, dichotomous_bangdiwala_b
+from pyagree import dichotomous_cohen_kappa, dichotomous_scott_pi
+from pyagree import dichotomous_yule_y, dichotomous_ia_c, dichotomous_report
+from pyagree.standard import _agreement_weights
+from pyagree.inf_theory import p_x, p_y, p_xy, entropy, p_x_array
+from pyagree.inf_theory import p_y_array, p_xy_array, joint_entropy
+from pyagree.inf_theory import conditional_entropy, mutual_information
+from pyagree.inf_theory import normalized_mutual_information
+from pyagree.cli import main, score_ratings, score_table
+
+try:
+    from scipy import sparse
+except ImportError:
+    sparse = None
 
 
 class TestFleissKappa(unittest.TestCase):
@@ -39,6 +76,41 @@ class TestFleissKappa(unittest.TestCase):
             self.assertAlmostEqual(fleiss_kappa(matrix),
                                    res, places=7)
 
+            result = fleiss_kappa(np_matrix(matrix))
+            self.assertIsInstance(result, float)
+            self.assertAlmostEqual(result, res, places=7)
+
+    def test_fleiss_kappa_out_of_core(self):
+        """Measure evaluations on memory-mapped matrices
+        """
+        with TemporaryDirectory() as directory:
+            for index, (matrix, res) in enumerate(self.tests):
+                name = path.join(directory, '{}.npy'.format(index))
+                save(name, matrix)
+
+                for block_size in [None, 1, 3, 100]:
+                    self.assertEqual(fleiss_kappa(name,
+                                                  block_size=block_size),
+                                     fleiss_kappa(matrix))
+                    self.assertEqual(fleiss_kappa(matrix,
+                                                  block_size=block_size),
+                                     fleiss_kappa(matrix))
+                    self.assertEqual(fleiss_kappa(name,
+                                                  block_size=block_size,
+                                                  n_jobs=3),
+                                     fleiss_kappa(matrix))
+
+                mapped = load(name, mmap_mode='r')
+                self.assertAlmostEqual(fleiss_kappa(mapped, block_size=4),
+                                       res, places=7)
+                del mapped
+
+                # the squares of compact counts overflow their type
+                compact = 2*matrix
+                save(name, compact.astype('uint8'))
+                self.assertAlmostEqual(fleiss_kappa(name, block_size=3),
+                                       fleiss_kappa(compact), places=7)
+
     def test_fleiss_kappa_domain(self):
         """Test out-of-domain matrices
         """
@@ -46,6 +118,13 @@ class TestFleissKappa(unittest.TestCase):
             with self.assertRaises(err_type):
                 fleiss_kappa(matrix)
 
+        with self.assertRaises(ValueError):
+            fleiss_kappa(array([2, 2, 2]))
+        with self.assertRaises(ValueError):
+            fleiss_kappa(array([[2, 0], [3, -1]]), block_size=1)
+        with self.assertRaises(ValueError):
+            fleiss_kappa(self.tests[0][0], block_size=0)
+
 
 class TestYuleY(unittest.TestCase):
     r"""This class implements the tests for Yule's Y
@@ -385,6 +464,139 @@ class TestCohenKappa(unittest.TestCase):
                 cohen_kappa(matrix)
 
 
+class TestWeightedKappa(unittest.TestCase):
+    r"""This class implements the tests for the weighted Cohen's Kappa
+    """
+
+    def setUp(self):
+        """Setup the tests
+        """
+        self.tests = [(array([[1, 2, 3],
+                              [4, 5, 6],
+                              [7, 8, 9]]),
+                       -0.06382978723404253, -0.08695652173913038),
+                      (array([[21, 5],
+                              [3, 21]]),
+                       0.6805111821086262, 0.6805111821086262),
+                      (array([[51, 4, 0, 1, 1],
+                              [3, 78, 1, 0, 0],
+                              [0, 0, 13, 4, 0],
+                              [0, 1, 1, 16, 7],
+                              [0, 0, 0, 0, 5]]),
+                       0.8678653667140267, 0.8974272401917752),
+                      ]
+        self.errors = [(array([[1]]), 'linear', ValueError),
+                       (array([[1, 2],
+                               [3, -4]]), 'linear', ValueError),
+                       (array([[0, 0],
+                               [0, 0]]), 'linear', ValueError),
+                       (array([[1, 2],
+                               [3, 4]]), 'cubic', ValueError),
+                       (array([[1, 2],
+                               [3, 4]]), array([[1]]), ValueError)
+                       ]
+
+    def test_weighted_kappa(self):
+        """Measure evaluations
+        """
+        for matrix, linear, quadratic in self.tests:
+            self.assertAlmostEqual(weighted_kappa(matrix), linear, places=7)
+            self.assertAlmostEqual(weighted_kappa(matrix, 'quadratic'),
+                                   quadratic, places=7)
+            self.assertAlmostEqual(weighted_kappa(matrix,
+                                                  eye(len(matrix))),
+                                   cohen_kappa(matrix), places=7)
+
+        matrices = array([matrix, matrix.T, 0*matrix])
+        values = weighted_kappa(matrices, 'quadratic')
+        self.assertAlmostEqual(values[0], quadratic, places=7)
+        self.assertAlmostEqual(values[1], quadratic, places=7)
+        self.assertTrue(isnan(values[2]))
+
+        # the cached weights are bounded in number and read-only
+        for k in range(2, 50):
+            weighted_kappa(eye(k), 'linear')
+        self.assertEqual(_agreement_weights.cache_info().currsize, 32)
+        with self.assertRaises(ValueError):
+            _agreement_weights(3, 'linear')[0, 0] = 2
+
+    def test_weighted_kappa_domain(self):
+        """Test out-of-domain matrices
+        """
+        for matrix, scheme, err_type in self.errors:
+            with self.assertRaises(err_type):
+                weighted_kappa(matrix, scheme)
+
+
+class TestKrippendorffAlpha(unittest.TestCase):
+    r"""This class implements the tests for Krippendorff's Alpha
+    """
+
+    def setUp(self):
+        """Setup the tests
+        """
+        self.ratings = array([[1, 1, nan, 1],
+                              [2, 2, 3, 2],
+                              [3, 3, 3, 3],
+                              [3, 3, 3, 3],
+                              [2, 2, 2, 2],
+                              [1, 2, 3, 4],
+                              [4, 4, 4, 4],
+                              [1, 1, 2, 1],
+                              [2, 2, 2, 2],
+                              [nan, 5, 5, 5],
+                              [nan, nan, 1, 1],
+                              [nan, 3, nan, nan]])
+        self.tests = [('nominal', 0.743421052631579),
+                      ('ordinal', 0.8153875037548813),
+                      ('interval', 0.8491071428571428)]
+        self.errors = [(self.ratings, {'metric': 'ratio'}, ValueError),
+                       (array([[1, 1], [2, 2]]), {'labels': [1]},
+                        ValueError),
+                       (array([['a', 'b'], ['b', 'a']]),
+                        {'metric': 'interval'}, ValueError),
+                       (array([[1, 1], [1, 1]]), {}, ValueError),
+                       (array([1, 1]), {}, ValueError)]
+
+    def test_krippendorff_alpha(self):
+        """Measure evaluations
+        """
+        for metric, res in self.tests:
+            self.assertAlmostEqual(krippendorff_alpha(self.ratings, metric),
+                                   res, places=7)
+
+        masked = masked_invalid(self.ratings)
+        self.assertAlmostEqual(krippendorff_alpha(masked), self.tests[0][1],
+                               places=7)
+
+        ratings = self.ratings.astype(object)
+        ratings[isnan(self.ratings)] = None
+        self.assertAlmostEqual(krippendorff_alpha(ratings), self.tests[0][1],
+                               places=7)
+
+        coincidences = coincidence_matrix_from_ratings(self.ratings)
+        self.assertAlmostEqual(coincidences.sum(), 40, places=7)
+        self.assertAlmostEqual(coincidences[0, 0], 7, places=7)
+
+        # every item contributes its ordered pairs of distinct raters
+        labels = sorted(set(self.ratings[~isnan(self.ratings)].tolist()))
+        expected = zeros((len(labels), len(labels)))
+        for row in self.ratings:
+            observed = [labels.index(value) for value in row[~isnan(row)]]
+            for first, c in enumerate(observed):
+                for second, h in enumerate(observed):
+                    if first != second:
+                        expected[c, h] += 1/(len(observed)-1)
+        self.assertTrue(allclose(coincidences, expected))
+
+    def test_krippendorff_alpha_domain(self):
+        """Test out-of-domain ratings
+        """
+        for ratings, parameters, err_type in self.errors:
+            with self.assertRaises(err_type):
+                krippendorff_alpha(ratings, **parameters)
+
+
 class TestIAeps(unittest.TestCase):
     r"""This class implements the tests for IAeps
     """
@@ -453,5 +665,1211 @@ class TestIAeps(unittest.TestCase):
                 ia_c(matrix)
 
 
+class TestInfTheory(unittest.TestCase):
+    r"""This class implements the tests for the information-theoretic arrays
+    """
+
+    def setUp(self):
+        """Setup the tests
+        """
+        self.matrix = array([[51, 4, 0, 1, 1],
+                             [3, 78, 1, 0, 0],
+                             [0, 0, 13, 4, 0],
+                             [0, 1, 1, 16, 7],
+                             [0, 0, 0, 0, 5]])
+        self.errors = [(array([1, 2]), {}, ValueError),
+                       (self.matrix, {'method': 'unknown'}, ValueError)]
+
+    def test_inf_theory(self):
+        """Measure evaluations
+        """
+        for array_function, function in [(p_x_array, p_x), (p_y_array, p_y),
+                                         (p_xy_array, p_xy)]:
+            for value, expected in zip(array_function(self.matrix).ravel(),
+                                       function(self.matrix)):
+                self.assertAlmostEqual(value, expected, places=7)
+
+        h_x = entropy(p for p in p_x(self.matrix) if p > 0)
+        h_y = entropy(p for p in p_y(self.matrix) if p > 0)
+        h_xy = entropy(p for p in p_xy(self.matrix) if p > 0)
+
+        self.assertAlmostEqual(joint_entropy(self.matrix), h_xy, places=7)
+        self.assertAlmostEqual(conditional_entropy(self.matrix), h_xy-h_y,
+                               places=7)
+        self.assertAlmostEqual(conditional_entropy(self.matrix, 'x'),
+                               h_xy-h_x, places=7)
+        self.assertAlmostEqual(mutual_information(self.matrix),
+                               h_x+h_y-h_xy, places=7)
+        self.assertAlmostEqual(normalized_mutual_information(self.matrix),
+                               2*(h_x+h_y-h_xy)/(h_x+h_y), places=7)
+
+        matrices = array([self.matrix, self.matrix.T, 0*self.matrix])
+        values = normalized_mutual_information(matrices, 'min')
+        self.assertAlmostEqual(values[0], ia_c(self.matrix), places=7)
+        self.assertAlmostEqual(values[1], ia_c(self.matrix), places=7)
+        self.assertTrue(isnan(values[2]))
+
+    def test_inf_theory_domain(self):
+        """Test out-of-domain parameters
+        """
+        for matrix, parameters, err_type in self.errors:
+            with self.assertRaises(err_type):
+                normalized_mutual_information(matrix, **parameters)
+
+
+class TestIAcState(unittest.TestCase):
+    r"""This class implements the tests for the incremental IAc state
+    """
+
+    def setUp(self):
+        """Setup the tests
+        """
+        self.tests = [array([[51, 4, 0, 1, 1],
+                             [3, 78, 1, 0, 0],
+                             [0, 0, 13, 4, 0],
+                             [0, 1, 1, 16, 7],
+                             [0, 0, 0, 0, 5]]),
+                      array([[0, 0, 0],
+                             [0, 0, 0],
+                             [3, 4, 0]]),
+                      array([[0, 3, 0],
+                             [0, 5, 0],
+                             [0, 0, 0]])]
+        self.errors = [(IAcState(3), (0, 0, -1), ValueError),
+                       (IAcState(3), (3, 0, 1), ValueError)]
+
+    def test_ia_c_state(self):
+        """Measure evaluations
+        """
+        for matrix in self.tests:
+            self.assertAlmostEqual(IAcState.from_matrix(matrix).value(),
+                                   ia_c(matrix), places=7)
+
+            state = IAcState(len(matrix))
+            rows, cols = matrix.nonzero()
+            for row, col in zip(rows, cols):
+                state.update(row, col, int(matrix[row, col]))
+                self.assertAlmostEqual(state.value(),
+                                       ia_c(state.agreement_matrix),
+                                       places=7)
+            self.assertTrue(array_equal(state.agreement_matrix, matrix))
+
+            rows, cols, values = state.leave_one_out()
+            for row, col, value in zip(rows, cols, values):
+                reduced = matrix.copy()
+                reduced[row, col] -= 1
+                if reduced.sum() > 0:
+                    self.assertAlmostEqual(value, ia_c(reduced), places=7)
+                else:
+                    self.assertTrue(isnan(value))
+
+    def test_ia_c_state_domain(self):
+        """Test out-of-domain updates
+        """
+        with self.assertRaises(ValueError):
+            IAcState(1)
+
+        with self.assertRaises(ValueError):
+            IAcState(2).value()
+
+        for state, update, err_type in self.errors:
+            with self.assertRaises(err_type):
+                state.update(*update)
+
+
+class TestStacks(unittest.TestCase):
+    r"""This class implements the tests for stacks of agreement matrices
+    """
+
+    def setUp(self):
+        """Setup the tests
+        """
+        self.measures = [bennett_s, bangdiwala_b, cohen_kappa, scott_pi,
+                         ia_c]
+        self.stack = array([[[3600, 2595],
+                             [65, 3740]],
+                            [[9901, 64],
+                             [2, 33]],
+                            [[21, 5],
+                             [3, 21]],
+                            [[136, 3],
+                             [1, 46]],
+                            [[7, 0],
+                             [3, 0]],
+                            [[7, 3],
+                             [0, 0]]])
+        self.errors = [(array([[[1, 2],
+                                [4, 5],
+                                [7, 8]]]),
+                        ValueError),
+                       (array([[[1, 2],
+                                [3, -4]]]),
+                        ValueError)
+                       ]
+
+    def test_stacks(self):
+        """Measure evaluations
+        """
+        for measure in self.measures:
+            results = measure(self.stack)
+            self.assertEqual(results.shape, (self.stack.shape[0],))
+            for matrix, res in zip(self.stack, results):
+                self.assertAlmostEqual(measure(matrix), res, places=7)
+
+            self.assertAlmostEqual(measure(self.stack.tolist())[0],
+                                   results[0], places=7)
+
+    def test_stacks_by_chunks(self):
+        """Measure evaluations on chunks of stacks
+        """
+        stack = self.stack.reshape(2, 3, 2, 2)
+        for measure in self.measures:
+            results = measure(stack)
+            for n_jobs, chunk_size in [(None, None), (None, 4), (2, None),
+                                       (3, 1)]:
+                self.assertTrue(array_equal(evaluate_stack(measure, stack,
+                                                           n_jobs,
+                                                           chunk_size),
+                                            results, equal_nan=True))
+
+        for parameters in [(self.stack[0], ), (self.stack, None, 0)]:
+            with self.assertRaises(ValueError):
+                evaluate_stack(cohen_kappa, *parameters)
+
+    def test_stacks_domain(self):
+        """Test out-of-domain matrices
+        """
+        stack = array([[[0, 0], [0, 0]], [[21, 5], [3, 21]]])
+        for measure in self.measures:
+            results = measure(stack)
+            self.assertTrue(isnan(results[0]))
+            self.assertAlmostEqual(results[1], measure(stack[1]), places=7)
+
+            for matrix, err_type in self.errors:
+                with self.assertRaises(err_type):
+                    measure(matrix)
+
+
+class TestAgreementTable(unittest.TestCase):
+    r"""This class implements the tests for agreement tables and reports
+    """
+
+    def setUp(self):
+        """Setup the tests
+        """
+        self.tests = [array([[1, 2, 3],
+                             [4, 5, 6],
+                             [7, 8, 9]]),
+                      array([[40, 5],
+                             [3, 2]]),
+                      array([[51, 4, 0, 1, 1],
+                             [3, 78, 1, 0, 0],
+                             [0, 0, 13, 4, 0],
+                             [0, 1, 1, 16, 7],
+                             [0, 0, 0, 0, 5]])]
+        self.errors = [(array([[1, 2],
+                               [4, 5],
+                               [7, 8]]),
+                        ValueError),
+                       (array([[0, 0],
+                               [0, 0]]),
+                        ValueError)
+                       ]
+
+    def test_agreement_report(self):
+        """Measure evaluations
+        """
+        for matrix in self.tests:
+            table = AgreementTable(matrix)
+            report = agreement_report(table)
+
+            names = ['bennett_s', 'bangdiwala_b', 'cohen_kappa',
+                     'scott_pi', 'ia_c']
+            if matrix.shape[0] == 2:
+                names.append('yule_y')
+            self.assertEqual(sorted(report.keys()), sorted(names))
+
+            for measure in [bennett_s, bangdiwala_b, cohen_kappa,
+                            scott_pi, ia_c]:
+                self.assertAlmostEqual(report[measure.__name__],
+                                       measure(matrix), places=7)
+                self.assertAlmostEqual(measure(table),
+                                       measure(matrix), places=7)
+
+            self.assertIs(table.row_sums, table.row_sums)
+            self.assertEqual(table.total, matrix.sum())
+
+            view = memoryview(matrix.astype('uint16')).toreadonly()
+            table = AgreementTable(view)
+            self.assertEqual(table.matrix.dtype, matrix.astype('uint16').dtype)
+            self.assertTrue(shares_memory(table.matrix, view))
+            for measure in [cohen_kappa, ia_c]:
+                self.assertAlmostEqual(measure(view, validate=False),
+                                       measure(matrix), places=7)
+
+            measures = [bennett_s, bangdiwala_b, cohen_kappa, scott_pi,
+                        weighted_kappa, ia_c]
+            if matrix.shape[0] == 2:
+                measures.append(yule_y)
+            for measure in measures:
+                result = measure(np_matrix(matrix))
+                self.assertIsInstance(result, float)
+                self.assertAlmostEqual(result, measure(matrix), places=7)
+
+                # small arrays of any type agree with their tables
+                for dtype in ['uint8', 'float32']:
+                    self.assertAlmostEqual(measure(matrix.astype(dtype)),
+                                           measure(table), places=5)
+
+        self.assertTrue(isnan(agreement_report([[1]])['cohen_kappa']))
+
+    def test_agreement_table_domain(self):
+        """Test out-of-domain matrices
+        """
+        for matrix, err_type in self.errors:
+            with self.assertRaises(err_type):
+                AgreementTable(matrix)
+
+        # small arrays and tables share their domains and messages
+        for matrix in [array([[0, 1], [0, 0]]), array([[1, 0], [0, 0]]),
+                       array([[2, 0], [1, 3]]), array([[1]]),
+                       array([[1, -1], [0, 2]]), array([[1, 2, 3]])]:
+            for measure in [bennett_s, bangdiwala_b, cohen_kappa, scott_pi,
+                            yule_y, ia_c]:
+                try:
+                    expected = measure(AgreementTable(matrix))
+                except ValueError as error:
+                    with self.assertRaisesRegex(ValueError, str(error)):
+                        measure(matrix)
+                    continue
+                self.assertAlmostEqual(measure(matrix), expected, places=7)
+
+
+class TestSparseTables(unittest.TestCase):
+    r"""This class implements the tests for sparse agreement matrices
+    """
+
+    def setUp(self):
+        """Setup the tests
+        """
+        self.matrix = array([[51, 4, 0, 1, 1],
+                             [3, 78, 1, 0, 0],
+                             [0, 0, 13, 4, 0],
+                             [0, 1, 1, 16, 7],
+                             [0, 0, 0, 0, 5]])
+        self.cells = {(int(i), int(j)): int(self.matrix[i, j])
+                      for i, j in zip(*self.matrix.nonzero())}
+        self.errors = [({}, None, ValueError),
+                       ({(0, 0): 1, (1, -1): 2}, None, ValueError),
+                       ({(0, 0): 1, (1, 1): -2}, None, ValueError),
+                       ({(0, 0): 1, (4, 1): 2}, 4, ValueError),
+                       ({(0, 0): 0, (1, 1): 0}, None, ValueError)]
+
+    def test_sparse_tables(self):
+        """Measure evaluations
+        """
+        table = AgreementTable(self.cells)
+        self.assertTrue(table.is_sparse)
+        self.assertEqual(table.size, 5)
+        self.assertTrue(array_equal(table.diagonal, self.matrix.diagonal()))
+        self.assertTrue(array_equal(table.row_sums, self.matrix.sum(axis=1)))
+        self.assertTrue(array_equal(table.col_sums, self.matrix.sum(axis=0)))
+        self.assertTrue(array_equal(table.matrix, self.matrix))
+
+        for measure in [bennett_s, bangdiwala_b, cohen_kappa, scott_pi,
+                        ia_c, weighted_kappa]:
+            self.assertAlmostEqual(measure(self.cells), measure(self.matrix),
+                                   places=7)
+
+        self.assertAlmostEqual(weighted_kappa(self.cells, 'quadratic'),
+                               weighted_kappa(self.matrix, 'quadratic'),
+                               places=7)
+
+        padded = AgreementTable(self.cells, size=8)
+        self.assertEqual(padded.size, 8)
+        self.assertAlmostEqual(bennett_s(padded),
+                               bennett_s(padded.matrix), places=7)
+
+        # the sums of integer counts are exact beyond 2**53
+        large = AgreementTable({(0, 0): 2**53+1, (0, 1): 2**53, (1, 1): 1})
+        self.assertEqual(large.row_sums.tolist(), [2**54+1, 1])
+        self.assertEqual(large.col_sums.tolist(), [2**53+1, 2**53+1])
+
+    @unittest.skipUnless(sparse, "SciPy is not installed")
+    def test_scipy_sparse_tables(self):
+        """Measure evaluations on SciPy sparse matrices
+        """
+        rows, cols = self.matrix.nonzero()
+        values = self.matrix[rows, cols]
+
+        # the duplicated cells of COO matrices are summed
+        duplicated = sparse.coo_matrix((concatenate((values, values)),
+                                        (concatenate((rows, rows)),
+                                         concatenate((cols, cols)))),
+                                       shape=self.matrix.shape)
+        for matrix in [sparse.csr_matrix(self.matrix),
+                       sparse.csc_matrix(self.matrix),
+                       sparse.coo_matrix(self.matrix)]:
+            table = AgreementTable(matrix)
+            self.assertTrue(table.is_sparse)
+            self.assertTrue(array_equal(table.matrix, self.matrix))
+            for measure in [bennett_s, bangdiwala_b, cohen_kappa, scott_pi,
+                            ia_c]:
+                self.assertAlmostEqual(measure(matrix), measure(self.matrix),
+                                       places=7)
+                self.assertAlmostEqual(measure(duplicated),
+                                       measure(2*self.matrix), places=7)
+
+        for matrix, size in [(sparse.csr_matrix(self.matrix[:3]), None),
+                             (sparse.csr_matrix(self.matrix), 4),
+                             (sparse.csr_matrix((3, 3), dtype=int), None)]:
+            with self.assertRaises(ValueError):
+                AgreementTable(matrix, size)
+
+    def test_sparse_tables_domain(self):
+        """Test out-of-domain matrices
+        """
+        for cells, size, err_type in self.errors:
+            with self.assertRaises(err_type):
+                AgreementTable(cells, size)
+
+        for measure in [cohen_kappa, ia_c]:
+            with self.assertRaises(ValueError):
+                measure({(0, 0): 0, (1, 1): 0})
+
+
+class TestRatings(unittest.TestCase):
+    r"""This class implements the tests for the rating-based builders
+    """
+
+    def setUp(self):
+        """Setup the tests
+        """
+        self.ratings_a = array(['low', 'mid', 'high', 'mid', 'low', 'mid'])
+        self.ratings_b = array(['low', 'high', 'high', 'mid', 'mid', 'mid'])
+        self.labels = ['low', 'mid', 'high']
+        self.matrix = array([[1, 1, 0],
+                             [0, 2, 1],
+                             [0, 0, 1]])
+        self.classifications = array([[0, 0, 0, 0, 14],
+                                      [0, 2, 6, 4, 2],
+                                      [0, 0, 3, 5, 6],
+                                      [0, 3, 9, 2, 0],
+                                      [2, 2, 8, 1, 1],
+                                      [7, 7, 0, 0, 0],
+                                      [3, 2, 6, 3, 0],
+                                      [2, 5, 3, 2, 2],
+                                      [6, 5, 2, 1, 0],
+                                      [0, 2, 2, 3, 7]])
+        self.errors = [(['low', 'mid'], ['low'], ValueError),
+                       (['low', 'top'], ['low', 'mid'], ValueError)]
+
+    def test_agreement_matrix_from_ratings(self):
+        """Agreement matrix constructions
+        """
+        vocabulary = LabelVocabulary(self.labels)
+        for labels in [self.labels, vocabulary]:
+            matrix = agreement_matrix_from_ratings(self.ratings_a,
+                                                   self.ratings_b, labels)
+            self.assertTrue(array_equal(matrix, self.matrix))
+
+        matrix = agreement_matrix_from_ratings(self.ratings_a,
+                                               self.ratings_b,
+                                               weights=[1, 1, 1, 1, 2, 1])
+        self.assertTrue(array_equal(matrix, [[1, 0, 0],
+                                             [0, 1, 2],
+                                             [1, 0, 2]]))
+
+        self.assertAlmostEqual(cohen_kappa_from_ratings(self.ratings_a,
+                                                        self.ratings_b,
+                                                        vocabulary),
+                               cohen_kappa(self.matrix), places=7)
+        self.assertAlmostEqual(ia_c_from_ratings(self.ratings_a,
+                                                 self.ratings_b,
+                                                 vocabulary),
+                               ia_c(self.matrix), places=7)
+
+    def test_fleiss_kappa_from_ratings(self):
+        """Measure evaluations
+        """
+        ratings = array([repeat(arange(5), row)
+                         for row in self.classifications])
+        self.assertAlmostEqual(fleiss_kappa_from_ratings(ratings),
+                               fleiss_kappa(self.classifications),
+                               places=7)
+
+    def test_ratings_domain(self):
+        """Test out-of-domain ratings
+        """
+        for ratings_a, ratings_b, err_type in self.errors:
+            with self.assertRaises(err_type):
+                agreement_matrix_from_ratings(ratings_a, ratings_b,
+                                              self.labels)
+
+
+class TestGroupedAgreement(unittest.TestCase):
+    r"""This class implements the tests for the grouped agreement
+    """
+
+    def setUp(self):
+        """Setup the tests
+        """
+        self.groups = ['w2', 'w1', 'w1', 'w3', 'w2', 'w1', 'w2', 'w3', 'w1',
+                       'w2', 'w3']
+        self.ratings_a = ['low', 'mid', 'high', 'mid', 'low', 'low', 'high',
+                          'mid', 'mid', 'high', 'mid']
+        self.ratings_b = ['low', 'mid', 'mid', 'mid', 'low', 'high', 'high',
+                          'mid', 'mid', 'high', 'mid']
+        self.errors = [((self.groups[1:], self.ratings_a, self.ratings_b),
+                        ValueError),
+                       ((self.groups, self.ratings_a, self.ratings_b,
+                         cohen_kappa, ['low', 'mid']), ValueError)]
+
+    def test_grouped_agreement(self):
+        """Measure evaluations
+        """
+        group_ids, matrices = grouped_agreement_matrices(
+            self.groups, self.ratings_a, self.ratings_b)
+        self.assertEqual(list(group_ids), ['w1', 'w2', 'w3'])
+        self.assertEqual(matrices.shape, (3, 3, 3))
+
+        for measure in [cohen_kappa, scott_pi, ia_c]:
+            result = grouped_agreement(self.groups, self.ratings_a,
+                                       self.ratings_b, measure)
+            for group, value, error, matrix in zip(result.groups,
+                                                   result.values,
+                                                   result.errors, matrices):
+                selection = [i for i, item_group in enumerate(self.groups)
+                             if item_group == group]
+                expected = agreement_matrix_from_ratings(
+                    [self.ratings_a[i] for i in selection],
+                    [self.ratings_b[i] for i in selection],
+                    labels=['high', 'low', 'mid'])
+                self.assertTrue(array_equal(matrix, expected))
+
+                try:
+                    self.assertAlmostEqual(value, measure(expected),
+                                           places=7)
+                    self.assertFalse(error)
+                except ValueError:
+                    self.assertTrue(error)
+
+        # all the pairs of w3 agree on 'mid', so Cohen's kappa is undefined
+        self.assertTrue(grouped_agreement(self.groups, self.ratings_a,
+                                          self.ratings_b).errors[2])
+
+    def test_grouped_agreement_domain(self):
+        """Test out-of-domain parameters
+        """
+        for parameters, err_type in self.errors:
+            with self.assertRaises(err_type):
+                grouped_agreement(*parameters)
+
+
+class TestAgreementAccumulator(unittest.TestCase):
+    r"""This class implements the tests for agreement accumulators
+    """
+
+    def setUp(self):
+        """Setup the tests
+        """
+        self.ratings_a = array([0, 1, 2, 1, 0, 1, 2, 2, 0, 1])
+        self.ratings_b = array([0, 2, 2, 1, 1, 1, 2, 0, 0, 1])
+        self.labels = [0, 1, 2]
+
+    def test_accumulator(self):
+        """Measure evaluations
+        """
+        matrix = agreement_matrix_from_ratings(self.ratings_a,
+                                               self.ratings_b)
+
+        first = AgreementAccumulator()
+        second = AgreementAccumulator()
+        for begin in range(0, 4, 2):
+            first.update(self.ratings_a[begin:begin+2],
+                         self.ratings_b[begin:begin+2])
+        second.update(self.ratings_a[4:], self.ratings_b[4:])
+        first.merge(second)
+
+        order = first.labels
+        self.assertTrue(array_equal(first.agreement_matrix,
+                                    matrix[order][:, order]))
+
+        report = first.report()
+        for name, value in agreement_report(matrix).items():
+            self.assertAlmostEqual(report[name], value, places=7)
+        self.assertAlmostEqual(first.ia_c(), ia_c(matrix), places=7)
+        self.assertAlmostEqual(first.fleiss_kappa(), scott_pi(matrix),
+                               places=7)
+
+        # the labels are ordered by first occurrence whatever the chunks
+        ratings_a = ['z', 'y', 'b', 'z']
+        ratings_b = ['y', 'x', 'a', 'x']
+        for chunk_size in [1, 2, 4]:
+            accumulator = AgreementAccumulator()
+            for begin in range(0, 4, chunk_size):
+                accumulator.update(ratings_a[begin:begin+chunk_size],
+                                   ratings_b[begin:begin+chunk_size])
+            self.assertEqual(accumulator.labels, ['z', 'y', 'x', 'b', 'a'])
+
+    def test_accumulator_domain(self):
+        """Test out-of-domain ratings
+        """
+        accumulator = AgreementAccumulator(self.labels)
+        with self.assertRaises(ValueError):
+            accumulator.cohen_kappa()
+        with self.assertRaises(ValueError):
+            accumulator.update([0, 3], [1, 1])
+
+
+class TestAgreementMonitor(unittest.TestCase):
+    r"""This class implements the tests for sliding-window monitors
+    """
+
+    def setUp(self):
+        """Setup the tests
+        """
+        self.ratings_a = ['low', 'mid', 'high', 'mid', 'low', 'low', 'high',
+                          'mid', 'mid', 'high', 'low', 'mid', 'high', 'low']
+        self.ratings_b = ['low', 'mid', 'mid', 'mid', 'low', 'high', 'high',
+                          'low', 'mid', 'high', 'low', 'high', 'high', 'mid']
+        self.labels = ['low', 'mid', 'high']
+        self.errors = [((self.labels, 0), ValueError),
+                       ((['low', 'low'], 3), ValueError)]
+
+    def test_agreement_monitor(self):
+        """Measure evaluations
+        """
+        window = 5
+        monitor = AgreementMonitor(self.labels, window)
+        for end, (rating_a, rating_b) in enumerate(zip(self.ratings_a,
+                                                       self.ratings_b)):
+            monitor.add(rating_a, rating_b)
+
+            begin = max(0, end+1-window)
+            matrix = agreement_matrix_from_ratings(
+                self.ratings_a[begin:end+1], self.ratings_b[begin:end+1],
+                labels=self.labels)
+            self.assertEqual(len(monitor), end+1-begin)
+            self.assertTrue(array_equal(monitor.agreement_matrix, matrix))
+
+            for measure in [cohen_kappa, scott_pi, ia_c]:
+                try:
+                    expected = measure(matrix)
+                except ValueError:
+                    with self.assertRaises(ValueError):
+                        getattr(monitor, measure.__name__)()
+                    continue
+                self.assertAlmostEqual(getattr(monitor, measure.__name__)(),
+                                       expected, places=7)
+
+        for _ in range(window):
+            monitor.evict()
+        with self.assertRaises(ValueError):
+            monitor.cohen_kappa()
+
+    def test_agreement_monitor_domain(self):
+        """Test out-of-domain parameters
+        """
+        for parameters, err_type in self.errors:
+            with self.assertRaises(err_type):
+                AgreementMonitor(*parameters)
+
+        monitor = AgreementMonitor(self.labels, 3)
+        with self.assertRaises(ValueError):
+            monitor.add('low', 'unknown')
+        with self.assertRaises(ValueError):
+            monitor.evict()
+
+
+class TestFleissAccumulator(unittest.TestCase):
+    r"""This class implements the tests for Fleiss accumulators
+    """
+
+    def setUp(self):
+        """Setup the tests
+        """
+        classifications = array([[0, 0, 0, 0, 14],
+                                 [0, 2, 6, 4, 2],
+                                 [0, 0, 3, 5, 6],
+                                 [0, 3, 9, 2, 0],
+                                 [2, 2, 8, 1, 1],
+                                 [7, 7, 0, 0, 0],
+                                 [3, 2, 6, 3, 0],
+                                 [2, 5, 3, 2, 2],
+                                 [6, 5, 2, 1, 0],
+                                 [0, 2, 2, 3, 7]])
+        self.triples = [(item, rater, 'abcde'[label])
+                        for item, row in enumerate(classifications)
+                        for rater, label in enumerate(repeat(arange(5),
+                                                             row))]
+        self.result = fleiss_kappa(classifications)
+
+    def test_fleiss_accumulator(self):
+        """Measure evaluations
+        """
+        for chunk_size in [1, 7, 14, 1000]:
+            self.assertAlmostEqual(fleiss_kappa_from_triples(self.triples,
+                                                             chunk_size),
+                                   self.result, places=7)
+
+    def test_fleiss_accumulator_domain(self):
+        """Test out-of-domain ratings
+        """
+        accumulator = FleissAccumulator()
+        with self.assertRaises(ValueError):
+            accumulator.fleiss_kappa()
+        with self.assertRaises(ValueError):
+            accumulator.update([0, 1, 0], ['a', 'b', 'a'])
+        with self.assertRaises(ValueError):
+            fleiss_kappa_from_triples(self.triples[1:])
+
+        # non-contiguous ratings are detected only inside a chunk
+        accumulator = FleissAccumulator()
+        accumulator.update([0, 0, 1], ['a', 'a', 'a'])
+        accumulator.update([1, 0, 0], ['b', 'b', 'b'])
+        self.assertEqual(accumulator.statistics()[2], 3)
+
+
+class TestBootstrap(unittest.TestCase):
+    r"""This class implements the tests for bootstrap intervals
+    """
+
+    def setUp(self):
+        """Setup the tests
+        """
+        self.matrix = array([[51, 4, 0, 1, 1],
+                             [3, 78, 1, 0, 0],
+                             [0, 0, 13, 4, 0],
+                             [0, 1, 1, 16, 7],
+                             [0, 0, 0, 0, 5]])
+        self.errors = [(array([[1.5, 2],
+                               [4, 5]]),
+                        {}, ValueError),
+                       (self.matrix, {'method': 'unknown'}, ValueError),
+                       (self.matrix, {'confidence': 1.5}, ValueError),
+                       (self.matrix, {'num_of_samples': 0}, ValueError),
+                       (self.matrix, {'batch_size': 0}, ValueError),
+                       (self.matrix, {'batch_size': -1}, ValueError)]
+
+    def test_bootstrap(self):
+        """Measure evaluations
+        """
+        tables = bootstrap_tables(self.matrix, 10, seed=0)
+        self.assertEqual(tables.shape, (10, 5, 5))
+        self.assertTrue((tables.sum(axis=(1, 2)) == self.matrix.sum()).all())
+
+        replicates = bootstrap_replicates(self.matrix, ia_c, 300, seed=1,
+                                          batch_size=100)
+        self.assertTrue(array_equal(replicates,
+                                    bootstrap_replicates(self.matrix, ia_c,
+                                                         300, seed=1,
+                                                         n_jobs=2,
+                                                         batch_size=100)))
+
+        for measure in [cohen_kappa, ia_c]:
+            for method in ['percentile', 'bca']:
+                interval = bootstrap_interval(self.matrix, measure, 500,
+                                              method=method, seed=2)
+                self.assertAlmostEqual(interval.estimate,
+                                       measure(self.matrix), places=7)
+                self.assertLess(interval.lower, interval.estimate)
+                self.assertGreater(interval.upper, interval.estimate)
+
+    def test_fleiss_kappa_bootstrap(self):
+        """Measure evaluations on item-level resamples
+        """
+        classifications = array([[0, 0, 0, 0, 14],
+                                 [0, 2, 6, 4, 2],
+                                 [0, 0, 3, 5, 6],
+                                 [0, 3, 9, 2, 0],
+                                 [2, 2, 8, 1, 1],
+                                 [7, 7, 0, 0, 0],
+                                 [3, 2, 6, 3, 0],
+                                 [2, 5, 3, 2, 2],
+                                 [6, 5, 2, 1, 0],
+                                 [0, 2, 2, 3, 7]])
+        constant = repeat(classifications[1:2], 4, axis=0)
+        replicates = fleiss_kappa_bootstrap_replicates(constant, 20, seed=0)
+        for replicate in replicates:
+            self.assertAlmostEqual(replicate, fleiss_kappa(constant),
+                                   places=7)
+
+        replicates = fleiss_kappa_bootstrap_replicates(classifications, 50,
+                                                       seed=3, batch_size=7)
+        self.assertTrue(array_equal(
+            replicates,
+            fleiss_kappa_bootstrap_replicates(classifications, 50, seed=3,
+                                              n_jobs=2, batch_size=7)))
+
+        compact = 2*classifications
+        self.assertTrue(array_equal(
+            fleiss_kappa_bootstrap_replicates(compact.astype('uint8'), 50,
+                                              seed=3),
+            fleiss_kappa_bootstrap_replicates(compact, 50, seed=3)))
+
+        for method in ['percentile', 'bca']:
+            interval = fleiss_kappa_bootstrap_interval(classifications, 500,
+                                                       method=method,
+                                                       seed=4)
+            self.assertAlmostEqual(interval.estimate,
+                                   fleiss_kappa(classifications), places=7)
+            self.assertLess(interval.lower, interval.estimate)
+            self.assertGreater(interval.upper, interval.estimate)
+
+    def test_bootstrap_domain(self):
+        """Test out-of-domain parameters
+        """
+        for matrix, parameters, err_type in self.errors:
+            with self.assertRaises(err_type):
+                bootstrap_interval(matrix, **parameters)
+
+        classifications = array([[2, 0], [1, 1], [0, 2]])
+        for parameters in [{'num_of_samples': 0}, {'batch_size': 0}]:
+            with self.assertRaises(ValueError):
+                fleiss_kappa_bootstrap_replicates(classifications,
+                                                  **parameters)
+
+
+class TestSignificance(unittest.TestCase):
+    r"""This class implements the tests for the independence tests
+    """
+
+    def setUp(self):
+        """Setup the tests
+        """
+        self.matrix = array([[51, 4, 0, 1, 1],
+                             [3, 78, 1, 0, 0],
+                             [0, 0, 13, 4, 0],
+                             [0, 1, 1, 16, 7],
+                             [0, 0, 0, 0, 5]])
+        self.tests = [(array([[3, 2],
+                              [1, 4]]),
+                       {'greater': 0.26190476190476190,
+                        'less': 0.97619047619047619,
+                        'two-sided': 0.52380952380952380})]
+        self.errors = [(array([[1.5, 2],
+                               [4, 5]]),
+                        {}, ValueError),
+                       (self.matrix, {'alternative': 'unknown'}, ValueError),
+                       (self.matrix, {'exact': True}, ValueError),
+                       (self.matrix, {'batch_size': 0}, ValueError)]
+
+    def test_independence_test(self):
+        """Measure evaluations
+        """
+        tables = independence_tables(self.matrix.sum(axis=1),
+                                     self.matrix.sum(axis=0), 10, seed=0)
+        self.assertEqual(tables.shape, (10, 5, 5))
+        self.assertTrue((tables.sum(axis=1) == self.matrix.sum(axis=0)).all())
+        self.assertTrue((tables.sum(axis=2) == self.matrix.sum(axis=1)).all())
+
+        for matrix, p_values in self.tests:
+            for alternative, p_value in p_values.items():
+                outcome = independence_test(matrix, cohen_kappa,
+                                            alternative=alternative)
+                self.assertAlmostEqual(outcome.p_value, p_value, places=7)
+
+                outcome = independence_test(matrix, cohen_kappa, 20000,
+                                            alternative=alternative,
+                                            exact=False, seed=0)
+                self.assertAlmostEqual(outcome.p_value, p_value, places=1)
+
+        outcome = independence_test(self.matrix, ia_c, 500, seed=1,
+                                    batch_size=100)
+        self.assertEqual(outcome,
+                         independence_test(self.matrix, ia_c, 500, seed=1,
+                                           n_jobs=2, batch_size=100))
+        self.assertAlmostEqual(outcome.statistic, ia_c(self.matrix),
+                               places=7)
+        self.assertAlmostEqual(outcome.p_value, 1/501, places=7)
+
+    def test_independence_test_domain(self):
+        """Test out-of-domain parameters
+        """
+        for matrix, parameters, err_type in self.errors:
+            with self.assertRaises(err_type):
+                independence_test(matrix, **parameters)
+
+
+class TestPairwise(unittest.TestCase):
+    r"""This class implements the tests for the all-pairs agreement
+    """
+
+    def setUp(self):
+        """Setup the tests
+        """
+        self.ratings = array([['a', 'a', 'b'],
+                              ['b', 'b', 'b'],
+                              ['a', 'c', 'c'],
+                              ['c', 'c', 'c'],
+                              ['b', 'a', 'b'],
+                              ['a', 'a', 'a']])
+        self.errors = [(array(['a', 'b']), {}, ValueError),
+                       (self.ratings, {'labels': ['a', 'b']}, ValueError)]
+
+    def test_pairwise_agreement(self):
+        """Measure evaluations
+        """
+        matrices = pairwise_agreement_matrices(self.ratings, block_size=4)
+        self.assertEqual(matrices.shape, (3, 3, 3, 3))
+        for first in range(3):
+            for second in range(3):
+                matrix = agreement_matrix_from_ratings(self.ratings[:, first],
+                                                       self.ratings[:, second])
+                self.assertTrue(array_equal(matrices[first, second], matrix))
+
+        for measure in [cohen_kappa, scott_pi, ia_c]:
+            values = pairwise_agreement(self.ratings, measure)
+            for first in range(3):
+                for second in range(3):
+                    self.assertAlmostEqual(values[first, second],
+                                           measure(matrices[first, second]),
+                                           places=7)
+
+    def test_pairwise_agreement_domain(self):
+        """Test out-of-domain parameters
+        """
+        for ratings, parameters, err_type in self.errors:
+            with self.assertRaises(err_type):
+                pairwise_agreement(ratings, **parameters)
+
+
+class TestProfiling(unittest.TestCase):
+    r"""This class implements the tests for the profiling
+    """
+
+    def setUp(self):
+        """Setup the tests
+        """
+        self.matrix = array([[10, 1],
+                             [5, 10]])
+        self.stages = ['cohen_kappa', 'ia_c', 'test_agreement_matrix',
+                       'AgreementTable.row_sums', 'AgreementTable.entropy']
+
+    def test_profiling(self):
+        """Recorded calls
+        """
+        cohen_kappa(self.matrix)
+        with profile() as profiler:
+            for _ in range(3):
+                cohen_kappa(self.matrix)
+            # small arrays are evaluated without tables and their stages
+            ia_c(AgreementTable(self.matrix))
+            with self.assertRaises(ValueError):
+                cohen_kappa(array([[1, 2, 3]]))
+        cohen_kappa(self.matrix)
+
+        summary = profiler.as_dict()
+        for stage in self.stages:
+            self.assertIn(stage, summary)
+        self.assertEqual(summary['cohen_kappa']['calls'], 4)
+        self.assertEqual(summary['ia_c']['calls'], 1)
+        self.assertEqual(summary['ia_c']['input_size'], 4)
+        for stats in summary.values():
+            self.assertLessEqual(stats['p50'], stats['p99'])
+            self.assertLessEqual(stats['p99'], stats['max_time'])
+
+        exposition = profiler.to_prometheus()
+        self.assertIn('pyagree_seconds_count{function="cohen_kappa"} 4',
+                      exposition)
+        self.assertIn('pyagree_input_elements_total{function="ia_c"} 4',
+                      exposition)
+
+        profiler.reset()
+        self.assertEqual(profiler.as_dict(), {})
+
+        # the paths of the memory-mapped matrices have no size
+        with TemporaryDirectory() as directory:
+            name = path.join(directory, 'classifications.npy')
+            save(name, array([[2, 0], [1, 1], [0, 2]]))
+            with profile(profiler):
+                fleiss_kappa(name)
+        self.assertEqual(profiler.as_dict()['fleiss_kappa']['input_size'], 0)
+        profiler.reset()
+
+        self.assertIs(enable_profiling(profiler), profiler)
+        scott_pi(self.matrix)
+        self.assertIs(disable_profiling(), profiler)
+        scott_pi(self.matrix)
+        self.assertEqual(profiler.as_dict()['scott_pi']['calls'], 1)
+
+    def test_profiling_domain(self):
+        """Test out-of-domain parameters
+        """
+        with self.assertRaises(ValueError):
+            Profiler(0)
+
+
+class TestCommandLine(unittest.TestCase):
+    r"""This class implements the tests for the command-line tool
+    """
+
+    def setUp(self):
+        """Setup the tests
+        """
+        self.ratings = [['x', 'x', 'x'],
+                        ['x', 'y', 'x'],
+                        ['y', 'y', 'y'],
+                        ['y', 'y', 'y'],
+                        ['z', 'x', 'z']]
+        self.csv = 'id,a,b,c\n' + ''.join(
+            '{},{}\n'.format(item, ','.join(row))
+            for item, row in enumerate(self.ratings))
+        self.matrix = array([[10, 1],
+                             [5, 10]])
+        self.errors = [(['a', 'd'], ['cohen_kappa']),
+                       (['a'], ['cohen_kappa'])]
+
+    def test_command_line(self):
+        """Measure evaluations
+        """
+        matrix = agreement_matrix_from_ratings([row[0]
+                                                for row in self.ratings],
+                                               [row[1]
+                                                for row in self.ratings])
+        fleiss = fleiss_kappa_from_ratings(self.ratings)
+        for chunk_size in [1, 2, 10]:
+            values = score_ratings(StringIO(self.csv),
+                                   ['cohen_kappa', 'ia_c', 'yule_y',
+                                    'fleiss_kappa'], ['a', 'b', 'c'],
+                                   chunk_size=chunk_size)
+            self.assertAlmostEqual(values['cohen_kappa'],
+                                   cohen_kappa(matrix), places=7)
+            self.assertAlmostEqual(values['ia_c'], ia_c(matrix), places=7)
+            self.assertTrue(isnan(values['yule_y']))
+            self.assertAlmostEqual(values['fleiss_kappa'], fleiss, places=7)
+
+        missing = self.csv.replace('3,y,y,y', '3,y,,y')
+        complete = self.ratings[:3] + self.ratings[4:]
+        values = score_ratings(StringIO(missing), ['cohen_kappa',
+                                                   'fleiss_kappa'],
+                               ['a', 'b', 'c'], chunk_size=2)
+        self.assertAlmostEqual(values['cohen_kappa'],
+                               cohen_kappa_from_ratings(
+                                   [row[0] for row in complete],
+                                   [row[1] for row in complete]), places=7)
+        self.assertAlmostEqual(values['fleiss_kappa'],
+                               fleiss_kappa_from_ratings(complete), places=7)
+
+        table = '\n'.join(','.join(str(value) for value in row)
+                          for row in self.matrix)
+        for header in ['', 'x,y\n', '1,2\n']:
+            for chunk_size in [1, 10]:
+                values = score_table(StringIO(header+table), ['yule_y'],
+                                     chunk_size=chunk_size)
+                self.assertAlmostEqual(values['yule_y'],
+                                       yule_y(self.matrix), places=7)
+
+        with TemporaryDirectory() as directory:
+            files = [path.join(directory, 'ratings.csv'),
+                     path.join(directory, 'ratings.tsv')]
+            for name, delimiter in zip(files, [',', '\t']):
+                with open(name, 'w') as ratings_file:
+                    ratings_file.write(self.csv.replace(',', delimiter))
+
+            output = StringIO()
+            with redirect_stdout(output):
+                main(files + ['-r', 'a,b,c', '-m', 'fleiss_kappa,yule_y',
+                              '-j', '2'])
+
+            lines = output.getvalue().splitlines()
+            self.assertEqual(len(lines), 2)
+            for name, line in zip(files, lines):
+                self.assertEqual(loads(line),
+                                 {'file': name, 'fleiss_kappa': fleiss,
+                                  'yule_y': None})
+
+            with open(files[0], 'w') as ratings_file:
+                ratings_file.write(missing)
+
+            output = StringIO()
+            with redirect_stdout(output):
+                self.assertEqual(main([files[0], '-r', 'a,b,c']), 0)
+
+            values = loads(output.getvalue())
+            self.assertAlmostEqual(values['fleiss_kappa'],
+                                   fleiss_kappa_from_ratings(complete),
+                                   places=7)
+
+            # --header drops a numeric first row, --no-header keeps it
+            table_file = path.join(directory, 'table.csv')
+            with open(table_file, 'w') as matrix_file:
+                matrix_file.write('0,1\n'+table)
+
+            output = StringIO()
+            with redirect_stdout(output):
+                main([table_file, '-i', 'table', '-m', 'yule_y',
+                      '--header'])
+            self.assertAlmostEqual(loads(output.getvalue())['yule_y'],
+                                   yule_y(self.matrix), places=7)
+
+            # the kept first row makes the matrix a 3 x 2-matrix
+            with redirect_stderr(StringIO()):
+                with self.assertRaises(SystemExit):
+                    main([table_file, '-i', 'table', '-m', 'yule_y',
+                          '--no-header'])
+
+    def test_command_line_domain(self):
+        """Test out-of-domain parameters
+        """
+        for raters, measures in self.errors:
+            with self.assertRaises(ValueError):
+                score_ratings(StringIO(self.csv), measures, raters)
+
+        with self.assertRaises(ValueError):
+            score_table(StringIO('x,y\n10,1\n5,10'), ['yule_y'],
+                        header=False)
+
+
+class TestMeasureCache(unittest.TestCase):
+    r"""This class implements the tests for measure caches
+    """
+
+    def setUp(self):
+        """Setup the tests
+        """
+        self.matrix = array([[10, 1],
+                             [5, 10]])
+        self.stack = array([[[10, 1],
+                             [5, 10]],
+                            [[0, 0],
+                             [0, 0]]])
+
+    def test_measure_cache(self):
+        """Measure evaluations
+        """
+        cache = MeasureCache(3)
+        for matrix in [self.matrix, self.matrix.copy(), self.matrix.tolist(),
+                       AgreementTable(self.matrix)]:
+            self.assertEqual(cache.evaluate(ia_c, matrix), ia_c(self.matrix))
+        self.assertEqual(cache.cache_info(), (3, 1, 3, 1))
+
+        # the type of the elements is part of the key
+        cache.evaluate(ia_c, self.matrix.astype(float))
+        self.assertEqual(cache.cache_info().misses, 2)
+
+        cached_kappa = cache.cached(weighted_kappa)
+        self.assertEqual(cached_kappa.__name__, 'weighted_kappa')
+        for scheme in ['linear', 'quadratic', 'quadratic', eye(2), eye(2)]:
+            self.assertEqual(cached_kappa(self.matrix, scheme=scheme),
+                             weighted_kappa(self.matrix, scheme=scheme))
+        self.assertEqual(cache.cache_info(), (5, 5, 3, 3))
+
+        for _ in range(2):
+            self.assertEqual(cached_kappa(self.matrix, 'quadratic'),
+                             weighted_kappa(self.matrix, 'quadratic'))
+        self.assertEqual(cache.cache_info(), (6, 6, 3, 3))
+
+        values = cache.evaluate(cohen_kappa, self.stack)
+        self.assertTrue(array_equal(values, cohen_kappa(self.stack),
+                                    equal_nan=True))
+        self.assertFalse(values.flags.writeable)
+        self.assertIs(cache.evaluate(cohen_kappa, self.stack), values)
+
+        self.assertEqual(cache.invalidate(self.stack), 1)
+        self.assertEqual(cache.invalidate(measure=weighted_kappa), 2)
+        self.assertEqual(cache.cache_info().size, 0)
+
+        cache.cache_clear()
+        self.assertEqual(cache.cache_info(), (0, 0, 3, 0))
+
+        # equal sequences and equal sparse matrices share their keys
+        for scheme in [[[1, 0], [0, 1]], ((1, 0), (0, 1)), eye(2, dtype=int)]:
+            self.assertEqual(cache.evaluate(weighted_kappa, self.matrix,
+                                            scheme=scheme),
+                             weighted_kappa(self.matrix, scheme=eye(2)))
+        for cells in [{(0, 0): 10, (0, 1): 1, (1, 0): 5, (1, 1): 10},
+                      {(1, 1): 10, (1, 0): 5, (0, 1): 1, (0, 0): 10}]:
+            self.assertEqual(cache.evaluate(ia_c, cells), ia_c(self.matrix))
+        self.assertEqual(cache.cache_info(), (3, 2, 3, 2))
+
+        # the parameters which cannot be keyed are not cached
+        self.assertEqual(cache.evaluate(lambda matrix, options: 1.0,
+                                        self.matrix, options={}), 1.0)
+        self.assertEqual(cache.cache_info(), (3, 3, 3, 2))
+
+    def test_measure_cache_domain(self):
+        """Test out-of-domain parameters
+        """
+        with self.assertRaises(ValueError):
+            MeasureCache(0)
+
+        cache = MeasureCache()
+        with self.assertRaises(ValueError):
+            cache.evaluate(cohen_kappa, self.stack[1])
+        self.assertEqual(cache.cache_info().size, 0)
+
+
+class TestDichotomous(unittest.TestCase):
+    r"""This class implements the tests for the dichotomous measures
+    """
+
+    def setUp(self):
+        """Setup the tests
+        """
+        self.measures = [(dichotomous_bennett_s, bennett_s),
+                         (dichotomous_bangdiwala_b, bangdiwala_b),
+                         (dichotomous_cohen_kappa, cohen_kappa),
+                         (dichotomous_scott_pi, scott_pi),
+                         (dichotomous_yule_y, yule_y),
+                         (dichotomous_ia_c, ia_c)]
+        self.stack = array([[[3600, 2595],
+                             [65, 3740]],
+                            [[21, 5],
+                             [3, 21]],
+                            [[7, 0],
+                             [3, 0]],
+                            [[7, 3],
+                             [0, 0]],
+                            [[0, 0],
+                             [0, 4]],
+                            [[0, 2],
+                             [1, 0]],
+                            [[0, 0],
+                             [0, 0]]])
+        self.errors = [((1, -1, 2, 3), ValueError),
+                       ((0, 0, 0, 0), ValueError),
+                       (([1, 2], [1], [1, 2], [1, 2]), ValueError)]
+
+    def test_dichotomous(self):
+        """Measure evaluations
+        """
+        columns = [self.stack[:, 0, 0], self.stack[:, 0, 1],
+                   self.stack[:, 1, 0], self.stack[:, 1, 1]]
+        for dichotomous_measure, measure in self.measures:
+            results = dichotomous_measure(*columns)
+            for matrix, res in zip(self.stack, results):
+                if matrix.sum() == 0:
+                    self.assertTrue(isnan(res))
+                    continue
+                try:
+                    expected = measure(matrix)
+                except ValueError:
+                    self.assertTrue(isnan(res))
+                    with self.assertRaises(ValueError):
+                        dichotomous_measure(*matrix.ravel().tolist())
+                    continue
+                self.assertAlmostEqual(res, expected, places=7)
+                self.assertAlmostEqual(
+                    dichotomous_measure(*matrix.ravel().tolist()), expected,
+                    places=7)
+
+        report = dichotomous_report(*self.stack[2].ravel().tolist())
+        for name, value in agreement_report(self.stack[2]).items():
+            if isnan(value):
+                self.assertTrue(isnan(report[name]))
+            else:
+                self.assertAlmostEqual(report[name], value, places=7)
+
+    def test_dichotomous_domain(self):
+        """Test out-of-domain matrices
+        """
+        for dichotomous_measure, _ in self.measures:
+            for parameters, err_type in self.errors:
+                with self.assertRaises(err_type):
+                    dichotomous_measure(*parameters)
+
+
 if __name__ == '__main__':
     unittest.main()
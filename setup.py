@@ -21,6 +21,9 @@ setup(name='pyagree',
       install_requires=[
           'numpy',
       ],
+      entry_points={
+          'console_scripts': ['pyagree = pyagree.cli:main']
+      },
       extras_require={
           'doc': ['sphinxcontrib.bibtex', 'sphinxcontrib.katex', 'numpy']
       },